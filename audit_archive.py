@@ -0,0 +1,269 @@
+# Audit log retention: rows older than AUDIT_RETENTION_DAYS move out of the
+# audit_logs table into compressed monthly archive files.
+#
+#   python audit_archive.py archive                  # move rows older than the retention age
+#   python audit_archive.py archive --days 30
+#   python audit_archive.py search --since 2026-01-01 --until 2026-02-01 --admin Admin
+#
+# Layout, per month of the row's timestamp:
+#   audit-YYYY-MM.jsonl.gz    append-only; every archive run adds one gzip
+#                             member per block of rows (concatenated members
+#                             are still one valid .gz file)
+#   audit-YYYY-MM.idx.jsonl   one line per member: byte offset/length, row
+#                             count, id runs, time range and the admins in it
+# The index is the source of truth: search() reads it, skips every member
+# that can't match, and decompresses the rest one at a time, so memory stays
+# bounded by ARCHIVE_BLOCK_ROWS whatever the archive size.
+#
+# The hot table gets no extra index: the cutoff id comes from a binary search
+# on id (backend.first_id_at), so inserts cost the same as before.
+#
+# Crash safety: pending.json is written before a block touches any file.
+# On the next run, a block that made it into the index has its rows deleted
+# from the hot table; otherwise the archive file is truncated back to where
+# the block started and the rows are still in the table.
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sys
+
+import backend
+
+AUDIT_RETENTION_DAYS = 90
+AUDIT_ARCHIVE_DIR = None        # None = "audit_archive" next to the database
+ARCHIVE_BLOCK_ROWS = 5000
+ARCHIVE_INDEX_ADMINS = 64       # more distinct admins than this and a block lists none (matches any)
+ARCHIVE_ID_SLACK = datetime.timedelta(minutes=5)
+
+
+def archive_dir():
+    if AUDIT_ARCHIVE_DIR:
+        return AUDIT_ARCHIVE_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(backend.SQLITE_DB)), "audit_archive")
+
+
+def _paths(month, root=None):
+    root = root or archive_dir()
+    return (os.path.join(root, f"audit-{month}.jsonl.gz"), os.path.join(root, f"audit-{month}.idx.jsonl"))
+
+
+def _id_runs(ids):
+    runs = []
+    for i in ids:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return runs
+
+
+def _fsync_append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_index(idx_path):
+    if not os.path.exists(idx_path):
+        return []
+    with open(idx_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _delete_runs(conn, runs):
+    conn.executemany("DELETE FROM audit_logs WHERE id BETWEEN ? AND ?;", runs)
+
+
+# finish or undo a block interrupted by a crash
+def _recover(conn, root):
+    pending_path = os.path.join(root, "pending.json")
+    if not os.path.exists(pending_path):
+        return
+    with open(pending_path, encoding="utf-8") as f:
+        pending = json.load(f)
+    data_path, idx_path = _paths(pending["month"], root)
+    if any(e["offset"] == pending["offset"] for e in _read_index(idx_path)):
+        backend._begin_write(conn)
+        _delete_runs(conn, pending["runs"])
+        conn.commit()
+    elif os.path.exists(data_path):
+        with open(data_path, "r+b") as f:
+            f.truncate(pending["offset"])
+    os.remove(pending_path)
+
+
+def _archive_block(conn, root, month, rows):
+    data_path, idx_path = _paths(month, root)
+    offset = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+    runs = _id_runs([r[0] for r in rows])
+    pending_path = os.path.join(root, "pending.json")
+    with open(pending_path, "w", encoding="utf-8") as f:
+        json.dump({"month": month, "offset": offset, "runs": runs}, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    payload = "".join(json.dumps({"id": r[0], "admin": r[1], "action": r[2], "timestamp": r[3]}) + "\n"
+                      for r in rows).encode("utf-8")
+    member = gzip.compress(payload, compresslevel=6)
+    _fsync_append(data_path, member)
+    admins = sorted({r[1] for r in rows if r[1] is not None})
+    entry = {"offset": offset, "length": len(member), "rows": len(rows), "runs": runs,
+             "min_ts": min(r[3] for r in rows), "max_ts": max(r[3] for r in rows),
+             "admins": admins if len(admins) <= ARCHIVE_INDEX_ADMINS else None}
+    _fsync_append(idx_path, (json.dumps(entry) + "\n").encode("utf-8"))
+
+    backend._begin_write(conn)
+    _delete_runs(conn, runs)
+    conn.commit()
+    os.remove(pending_path)
+
+
+# Move audit rows older than days (default AUDIT_RETENTION_DAYS) into the
+# archive. Safe to run while the app is writing. Returns {month: rows}.
+def archive_audit_logs(days=None, now=None):
+    days = AUDIT_RETENTION_DAYS if days is None else days
+    now = now or datetime.datetime.utcnow()
+    cutoff = (now - datetime.timedelta(days=days)).isoformat()
+    root = archive_dir()
+    os.makedirs(root, exist_ok=True)
+    backend.flush_audit()
+    moved = {}
+    conn = backend.get_conn()
+    try:
+        _recover(conn, root)
+        cur = conn.cursor()
+        # rows past this id are all newer than the cutoff
+        upper = backend.first_id_at(cur, "audit_logs",
+                                    (now - datetime.timedelta(days=days) + ARCHIVE_ID_SLACK).isoformat())
+        last = 0
+        while True:
+            cur.execute("""SELECT id, admin, action, timestamp FROM audit_logs
+                           WHERE id > ? AND id < ? AND timestamp < ? ORDER BY id LIMIT ?;""",
+                        (last, upper, cutoff, ARCHIVE_BLOCK_ROWS))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            by_month = {}
+            for r in rows:
+                by_month.setdefault(r[3][:7], []).append(r)
+            for month, block in sorted(by_month.items()):
+                _archive_block(conn, root, month, block)
+                moved[month] = moved.get(month, 0) + len(block)
+    except Exception as e:
+        print("archive_audit_logs error:", e)
+        conn.rollback()
+    finally:
+        conn.close()
+    return moved
+
+
+def _archive_months(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(n[6:13] for n in os.listdir(root) if n.startswith("audit-") and n.endswith(".idx.jsonl"))
+
+
+# Stream audit rows with since <= timestamp < until (ISO strings, either
+# may be None) and optionally one admin, oldest first: archived rows, then
+# rows still in the hot table. Yields (id, admin, action, timestamp).
+def search_audit(since=None, until=None, admin=None, include_hot=True):
+    root = archive_dir()
+    for month in _archive_months(root):
+        if (since and month < since[:7]) or (until and month > until[:7]):
+            continue
+        data_path, idx_path = _paths(month, root)
+        entries = _read_index(idx_path)
+        if not entries:
+            continue
+        with open(data_path, "rb") as f:
+            for e in entries:
+                if since and e["max_ts"] < since:
+                    continue
+                if until and e["min_ts"] >= until:
+                    continue
+                if admin is not None and e["admins"] is not None and admin not in e["admins"]:
+                    continue
+                f.seek(e["offset"])
+                for line in gzip.decompress(f.read(e["length"])).splitlines():
+                    r = json.loads(line)
+                    if since and r["timestamp"] < since:
+                        continue
+                    if until and r["timestamp"] >= until:
+                        continue
+                    if admin is not None and r["admin"] != admin:
+                        continue
+                    yield (r["id"], r["admin"], r["action"], r["timestamp"])
+    if not include_hot:
+        return
+    conn = backend.get_conn()
+    try:
+        cur = conn.cursor()
+        lo = 0
+        if since:
+            start = datetime.datetime.fromisoformat(since) - ARCHIVE_ID_SLACK
+            lo = backend.first_id_at(cur, "audit_logs", start.isoformat())
+        where, params = ["id >= ?"], [lo]
+        if since:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            where.append("timestamp < ?")
+            params.append(until)
+        if admin is not None:
+            where.append("admin = ?")
+            params.append(admin)
+        cur.execute(f"SELECT id, admin, action, timestamp FROM audit_logs WHERE {' AND '.join(where)} ORDER BY id;",
+                    params)
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+# {month: (blocks, rows, compressed bytes)}
+def archive_stats():
+    root = archive_dir()
+    stats = {}
+    for month in _archive_months(root):
+        entries = _read_index(_paths(month, root)[1])
+        stats[month] = (len(entries), sum(e["rows"] for e in entries), sum(e["length"] for e in entries))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit log archival")
+    parser.add_argument("--db", help="SQLite database file (default: bank.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("archive", help="move old audit rows into the archive")
+    p.add_argument("--days", type=int, default=AUDIT_RETENTION_DAYS, help="keep this many days in the table")
+    p = sub.add_parser("search", help="print matching audit rows from archive and table")
+    p.add_argument("--since", help="ISO date/time, inclusive")
+    p.add_argument("--until", help="ISO date/time, exclusive")
+    p.add_argument("--admin")
+    p.add_argument("--archived-only", action="store_true")
+    sub.add_parser("stats", help="archive size per month")
+    args = parser.parse_args()
+    if args.db:
+        backend.SQLITE_DB = args.db
+    backend.init_db()
+    if args.command == "archive":
+        moved = archive_audit_logs(args.days)
+        for month, n in sorted(moved.items()):
+            print(f"{month}: {n} rows archived")
+        print(f"{sum(moved.values())} rows archived to {archive_dir()}")
+    elif args.command == "search":
+        n = 0
+        for row in search_audit(args.since, args.until, args.admin, include_hot=not args.archived_only):
+            print("\t".join(str(v) for v in row))
+            n += 1
+        print(f"{n} rows", file=sys.stderr)
+    else:
+        for month, (blocks, rows, size) in archive_stats().items():
+            print(f"{month}: {rows} rows in {blocks} blocks, {size:,} bytes")
@@ -2,6 +2,20 @@ import sqlite3
 import hashlib
 import datetime
 import os
+import threading
+import atexit
+import queue
+import time
+import random
+import functools
+import decimal
+import logging
+import collections
+import re
+import csv
+import gzip
+import json
+import array
 
 # === CONFIG ===
 USE_MYSQL = False  # set True if you want MySQL (you'll need mysql-connector)
@@ -14,13 +28,424 @@ MYSQL_CONFIG = {
 
 SQLITE_DB = "bank.db"
 
+# Connection pooling: every thread keeps one open connection instead of
+# reconnecting on each call. Set POOL_ENABLED = False for the old
+# connect-per-call behaviour (handy for comparing in bench.py).
+POOL_ENABLED = True
+MYSQL_POOL_SIZE = 8
+
+# Applied once when a pooled SQLite connection is opened.
+SQLITE_PRAGMAS = [
+    ("journal_mode", "WAL"),      # readers don't block the writer
+    ("synchronous", "NORMAL"),    # fsync on checkpoint, not on every commit (safe with WAL)
+    ("cache_size", -64000),       # negative = KiB, so ~64 MB page cache
+    ("mmap_size", 268435456),     # 256 MB memory-mapped reads
+    ("busy_timeout", 5000),       # ms to wait on a locked database before failing
+    ("temp_store", "MEMORY"),
+    ("journal_size_limit", 67108864),  # shrink the WAL back to 64 MB once a long reader (backup) lets it reset
+]
+
+# Audit durability:
+#   "inline" - the audit row commits in the same transaction as the change it
+#              describes; nothing is acknowledged without its audit row.
+#   "async"  - rows are queued to a background writer that group-commits them.
+#              Faster, but a crash can lose rows still in the queue (at most
+#              AUDIT_QUEUE_SIZE). flush_audit() waits until the queue is written.
+AUDIT_MODE = "inline"
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 500
+AUDIT_LINGER = 0.05  # seconds the writer waits for more rows before committing
+
+# Extra attempts when a write still hits SQLITE_BUSY after busy_timeout.
+BUSY_RETRIES = 5
+
+# Rows per transaction in add_transactions_bulk().
+BULK_CHUNK_SIZE = 5000
+
+# Account numbers reserved per round trip to the sequences table.
+ACCOUNT_NO_BLOCK = 100
+
+# Default page size for the get_*_page() functions.
+PAGE_SIZE = 200
+
+# Accounts kept in the in-process lookup cache (get_account); 0 disables it.
+# Only used with pooled SQLite connections, where PRAGMA data_version can
+# detect commits made by other processes.
+ACCOUNT_CACHE_SIZE = 10000
+
+# Loan terms: rate in basis points per year (1250 = 12.5%), term in months.
+#   "annuity"  - level monthly payment
+#   "straight" - equal principal each month, interest on the remaining balance
+LOAN_SCHEDULES = ("annuity", "straight")
+LOAN_STATUSES = ("pending", "approved", "paid")
+LOAN_MAX_TERM_MONTHS = 360
+LOAN_BATCH_SIZE = 200_000      # loans per chunk in run_loan_batch()
+
+# Import/export (import_accounts, import_transactions, export_table): rows per
+# write transaction / per fetchmany, and how many rejected rows are listed
+# by line in the import summary (the rest are only counted).
+IMPORT_CHUNK_SIZE = 20_000
+EXPORT_CHUNK_SIZE = 10_000
+IMPORT_MAX_ERRORS = 100
+
+# Account search (search_accounts): rows returned by default, and the shortest
+# word that is matched as a prefix ("jua" finds "juan"); shorter words must
+# match a whole word.
+SEARCH_LIMIT = 50
+SEARCH_MIN_PREFIX = 2
+# bm25 scores every matching row, so it's only used when a query matches at
+# most this many accounts; broader queries ("ju" on millions of accounts)
+# return account_no/name hits before email/phone hits, oldest first.
+SEARCH_RANK_MAX = 1000
+
+# Change feed (ChangeFeed): rows a poll returns per table before it tells the
+# consumer to reload instead, and how many change_log entries are kept.
+CHANGE_FEED_LIMIT = 500
+CHANGE_LOG_KEEP = 10000
+
+# Velocity limits, checked inside the write transaction before the balance
+# changes. A rule is (type, window seconds, max count, max total), None for
+# no cap on that side; type is "deposit", "withdraw" or "transfer" (the
+# sending account's leg). Empty = no limits and nothing is tracked.
+#   VELOCITY_RULES = [("withdraw", 3600, 10, 50_000), ("transfer", 86400, None, 200_000)]
+VELOCITY_RULES = []
+VELOCITY_BUCKETS = 12          # slices per window: a 1 h window moves in 5 min steps
+VELOCITY_SWEEP_SECONDS = 300   # how often accounts with nothing in any window are dropped
+
+# Money is stored as integer minor units: MINOR_UNITS per peso.
+MINOR_UNITS = 100
+MINOR_DIGITS = 2
+
+# Instrumentation: per-operation latency percentiles, row counts and lock-wait
+# time, shown in the Settings tab. When INSTRUMENT is False, instrumented
+# functions cost one flag check on top of the call.
+INSTRUMENT = False
+METRICS_SAMPLES = 2048   # latest latencies kept per operation for p50/p95/p99
+SLOW_QUERY_MS = 200      # calls slower than this go to the "bank.slow" logger
+SLOW_QUERY_LOG = None    # file for the slow-query log; None = logging defaults
+
 # helper: password hashing
 def hash_password(pw: str) -> str:
     return hashlib.sha256(pw.encode('utf-8')).hexdigest()
 
+# === Money ===
+# An amount in integer minor units (centavos). It is an int, so sums and
+# comparisons are exact, and str() gives the familiar 1234.56. Columns
+# declared MONEY are read back as Money automatically (see the converter
+# below), and Money values bind as plain INTEGERs.
+class Money(int):
+    __slots__ = ()
+
+    def __str__(self):
+        sign = "-" if self < 0 else ""
+        major, minor = divmod(abs(int(self)), MINOR_UNITS)
+        return f"{sign}{major}.{minor:0{MINOR_DIGITS}d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __add__(self, other):
+        if isinstance(other, int):
+            return Money(int(self) + int(other))
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, int):
+            return Money(int(self) - int(other))
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return Money(int(other) - int(self))
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __abs__(self):
+        return Money(abs(int(self)))
+
+# Amount in pesos (float, int, str or Decimal) -> Money, rounded half-up to
+# the nearest centavo. Money passes through untouched. Raises ValueError.
+def to_money(value):
+    if isinstance(value, Money):
+        return value
+    try:
+        d = decimal.Decimal(str(value).strip().replace(",", ""))
+    except decimal.InvalidOperation:
+        raise ValueError(f"invalid amount: {value!r}")
+    if not d.is_finite():
+        raise ValueError(f"invalid amount: {value!r}")
+    minor = int((d * MINOR_UNITS).to_integral_value(rounding=decimal.ROUND_HALF_UP))
+    if abs(minor) >= 2 ** 63:
+        raise ValueError(f"amount out of range: {value!r}")
+    return Money(minor)
+
+# to_money() for amounts that must be > 0; None if invalid.
+def _positive_money(value):
+    try:
+        amount = to_money(value)
+    except (TypeError, ValueError):
+        return None
+    return amount if amount > 0 else None
+
+def _convert_money(raw):
+    try:
+        return Money(int(raw))
+    except ValueError:
+        return Money(round(float(raw)))
+
+sqlite3.register_adapter(Money, int)
+sqlite3.register_converter("MONEY", _convert_money)
+
+# === Instrumentation ===
+class _OpStats:
+    __slots__ = ("calls", "errors", "total", "max", "rows", "lock_wait", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.lock_wait = 0.0
+        self.samples = collections.deque(maxlen=METRICS_SAMPLES)
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_metrics_local = threading.local()   # lock wait accumulated by the running call
+_slow_log = logging.getLogger("bank.slow")
+_slow_log_file = None
+
+def _percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p * (len(sorted_vals) - 1))))]
+
+def _row_count(result):
+    if isinstance(result, list):
+        return len(result)
+    return 0
+
+# Record one call. Also used by the frontend to time Tk-side callbacks.
+def record_metric(name, elapsed, rows=0, lock_wait=0.0, error=False):
+    with _metrics_lock:
+        st = _metrics.get(name)
+        if st is None:
+            st = _metrics[name] = _OpStats()
+        st.calls += 1
+        st.errors += error
+        st.total += elapsed
+        st.max = max(st.max, elapsed)
+        st.rows += rows
+        st.lock_wait += lock_wait
+        st.samples.append(elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _slow_log.warning("slow %s: %.1f ms, rows=%d, lock_wait=%.1f ms%s",
+                          name, elapsed * 1000, rows, lock_wait * 1000, " (error)" if error else "")
+
+def _add_lock_wait(seconds):
+    _metrics_local.lock_wait = getattr(_metrics_local, "lock_wait", 0.0) + seconds
+
+# Decorator for backend entry points. Lock wait is tracked per thread so a
+# nested instrumented call (get_conn inside add_transaction) is also counted
+# in its caller.
+def instrumented(fn):
+    name = fn.__name__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not INSTRUMENT:
+            return fn(*args, **kwargs)
+        outer = getattr(_metrics_local, "lock_wait", 0.0)
+        _metrics_local.lock_wait = 0.0
+        result = None
+        error = True
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            waited = _metrics_local.lock_wait
+            _metrics_local.lock_wait = outer + waited
+            record_metric(name, elapsed, _row_count(result), waited, error)
+    return wrapper
+
+def set_instrumentation(enabled):
+    global INSTRUMENT, _slow_log_file
+    if enabled and SLOW_QUERY_LOG and _slow_log_file != SLOW_QUERY_LOG:
+        handler = logging.FileHandler(SLOW_QUERY_LOG)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _slow_log.addHandler(handler)
+        _slow_log_file = SLOW_QUERY_LOG
+    INSTRUMENT = bool(enabled)
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+# {name: {calls, errors, avg_ms, p50_ms, p95_ms, p99_ms, max_ms, rows, lock_wait_ms}}
+def metrics_snapshot():
+    with _metrics_lock:
+        items = [(name, st.calls, st.errors, st.total, st.max, st.rows, st.lock_wait, sorted(st.samples))
+                 for name, st in _metrics.items()]
+    snap = {}
+    for name, calls, errors, total, peak, rows, lock_wait, samples in items:
+        snap[name] = {
+            "calls": calls,
+            "errors": errors,
+            "avg_ms": total / calls * 1000,
+            "p50_ms": _percentile(samples, 0.50) * 1000,
+            "p95_ms": _percentile(samples, 0.95) * 1000,
+            "p99_ms": _percentile(samples, 0.99) * 1000,
+            "max_ms": peak * 1000,
+            "rows": rows,
+            "lock_wait_ms": lock_wait * 1000,
+        }
+    return snap
+
+METRIC_COLUMNS = ("calls", "errors", "avg_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "rows", "lock_wait_ms")
+
+def format_metrics(snapshot=None):
+    snapshot = metrics_snapshot() if snapshot is None else snapshot
+    lines = [f"Metrics snapshot {datetime.datetime.utcnow().isoformat()} UTC (instrumentation {'on' if INSTRUMENT else 'off'})",
+             f"{'operation':<28}" + "".join(f"{c:>13}" for c in METRIC_COLUMNS)]
+    for name in sorted(snapshot, key=lambda n: -snapshot[n]["avg_ms"] * snapshot[n]["calls"]):
+        row = snapshot[name]
+        lines.append(f"{name:<28}" + "".join(
+            f"{row[c]:>13}" if isinstance(row[c], int) else f"{row[c]:>13.2f}" for c in METRIC_COLUMNS))
+    cache = account_cache_stats()
+    lines.append(f"account cache: {cache['size']}/{cache['capacity']} rows, {cache['hits']} hits, "
+                 f"{cache['misses']} misses ({cache['hit_rate']:.1%}), {cache['evictions']} evictions, "
+                 f"{cache['invalidations']} invalidations")
+    return "\n".join(lines) + "\n"
+
+# Raises OSError if the file can't be written.
+def export_metrics(path):
+    with open(path, "w") as f:
+        f.write(format_metrics())
+
+# Pooled connection handed out by get_conn(). It behaves like the real
+# connection, but close() only rolls back anything left uncommitted and keeps
+# the connection open for the next call on the same thread.
+# With AUDIT_MODE = "async", audit rows logged on it wait in .audit and only
+# go to the audit writer once commit() succeeds; a rollback drops them.
+class PooledConnection:
+    __slots__ = ("_raw", "audit")
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.audit = []
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        result = self._raw.__exit__(*exc)
+        if exc[0] is None:
+            self._queue_audit()
+        else:
+            self.audit.clear()
+        return result
+
+    def _queue_audit(self):
+        if self.audit:
+            rows, self.audit = self.audit, []
+            writer = _get_audit_writer()
+            for row in rows:
+                writer.put(row)
+
+    def commit(self):
+        self._raw.commit()
+        self._queue_audit()
+
+    def rollback(self):
+        self.audit.clear()
+        self._raw.rollback()
+
+    def close(self):
+        self.audit.clear()
+        if self._raw.in_transaction:
+            self._raw.rollback()
+
+# get_conn() without the SQLite pool: close() really closes (or hands a
+# MySQL connection back to its pool).
+class DirectConnection(PooledConnection):
+    __slots__ = ()
+
+    def close(self):
+        self.audit.clear()
+        self._raw.close()
+
+_pool_local = threading.local()
+_pool_lock = threading.Lock()
+_pool_conns = []        # every raw SQLite connection we opened, for close_pool()
+_pool_generation = 0    # bumped by close_pool() so threads reopen lazily
+_mysql_pool = None
+
+def _connect_sqlite(**kwargs):
+    return sqlite3.connect(SQLITE_DB, detect_types=sqlite3.PARSE_DECLTYPES, **kwargs)
+
+def _open_sqlite():
+    conn = _connect_sqlite(check_same_thread=False)
+    for name, value in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value};").fetchall()
+    return conn
+
+def _get_sqlite_pooled():
+    key = (SQLITE_DB, _pool_generation)
+    cached = getattr(_pool_local, "conn", None)
+    if cached is None or cached[0] != key:
+        raw = _open_sqlite()
+        with _pool_lock:
+            _pool_conns.append(raw)
+        cached = (key, PooledConnection(raw))
+        _pool_local.conn = cached
+    return cached[1]
+
+def _get_mysql_pooled():
+    global _mysql_pool
+    if _mysql_pool is None:
+        from mysql.connector import pooling
+        with _pool_lock:
+            if _mysql_pool is None:
+                _mysql_pool = pooling.MySQLConnectionPool(
+                    pool_name="bankpool",
+                    pool_size=MYSQL_POOL_SIZE,
+                    **MYSQL_CONFIG
+                )
+    # close() on these returns the connection to the pool
+    return _mysql_pool.get_connection()
+
+# Close every pooled connection (called at exit, or after changing SQLITE_DB).
+def close_pool():
+    global _pool_generation, _mysql_pool
+    with _pool_lock:
+        _pool_generation += 1
+        conns = list(_pool_conns)
+        _pool_conns.clear()
+        _mysql_pool = None
+    for conn in conns:
+        try:
+            conn.close()
+        except Exception as e:
+            print("close_pool error:", e)
+
+atexit.register(close_pool)
+
 # DB connection abstraction
+@instrumented
 def get_conn():
     if USE_MYSQL:
+        if POOL_ENABLED:
+            return DirectConnection(_get_mysql_pooled())
         import mysql.connector
         conn = mysql.connector.connect(
             host=MYSQL_CONFIG["host"],
@@ -28,12 +453,35 @@ def get_conn():
             password=MYSQL_CONFIG["password"],
             database=MYSQL_CONFIG["database"]
         )
-        return conn
+        return DirectConnection(conn)
     else:
-        return sqlite3.connect(SQLITE_DB)
+        if POOL_ENABLED:
+            return _get_sqlite_pooled()
+        return DirectConnection(_connect_sqlite())
 
+# Launches after the first only need to see that schema_version is at the
+# latest migration; the CREATE TABLEs, default admin and migrations run
+# when it isn't (new database, or an update added migrations).
+@instrumented
 def init_db():
     conn = get_conn()
+    try:
+        if not _schema_current(conn):
+            _create_schema(conn)
+        _velocity.warm(conn)
+    finally:
+        conn.close()
+
+def _schema_current(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT MAX(version) FROM schema_version;")
+        return cur.fetchone()[0] == MIGRATIONS[-1][0]
+    except Exception:
+        conn.rollback()
+        return False
+
+def _create_schema(conn):
     cur = conn.cursor()
     # Admins table
     cur.execute("""
@@ -98,9 +546,261 @@ def init_db():
                     ("Admin", pw, "Charles Admin"))
         conn.commit()
 
-    conn.close()
+    migrate(conn)
+
+# === Schema migrations ===
+# Ordered (version, description, steps). A step is either an SQL string or a
+# callable taking a cursor, for changes plain SQL can't express. Each
+# migration runs in its own transaction and records itself in schema_version,
+# so a database is brought up to date step by step and never re-migrated.
+# Append new migrations at the end; never edit one that has shipped.
+MIGRATIONS = [
+    (1, "secondary indexes for hot query paths", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions (account_no, id);",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type, amount);",
+        "CREATE INDEX IF NOT EXISTS idx_loans_status ON loans (status, id);",
+        "CREATE INDEX IF NOT EXISTS idx_audit_admin ON audit_logs (admin, id);",
+    ]),
+    (2, "rollup tables for reports", [
+        """CREATE TABLE IF NOT EXISTS rollups (
+            name TEXT PRIMARY KEY, -- tx:<type>, accounts, loans:<status>
+            count INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0
+        );""",
+        """CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT,
+            type TEXT,
+            count INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, type)
+        ) WITHOUT ROWID;""",
+        lambda cur: _rebuild_rollups(cur),
+    ]),
+    (3, "persisted sequences for account numbers", [
+        """CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );""",
+        "INSERT OR IGNORE INTO sequences (name, value) VALUES ('account_no', 100000);",
+    ]),
+    (4, "store money as integer minor units", [
+        lambda cur: _migrate_money_columns(cur),
+    ]),
+    (5, "loan terms, schedules and interest accrual", [
+        "ALTER TABLE loans ADD COLUMN rate_bps INTEGER NOT NULL DEFAULT 0;",
+        "ALTER TABLE loans ADD COLUMN term_months INTEGER NOT NULL DEFAULT 12;",
+        "ALTER TABLE loans ADD COLUMN schedule TEXT NOT NULL DEFAULT 'annuity';",
+        # maintained by run_loan_batch() for approved loans
+        "ALTER TABLE loans ADD COLUMN principal_balance MONEY;",
+        "ALTER TABLE loans ADD COLUMN next_payment MONEY;",
+        "ALTER TABLE loans ADD COLUMN next_due_date TEXT;",
+        "ALTER TABLE loans ADD COLUMN accrued_interest MONEY NOT NULL DEFAULT 0;",
+        "ALTER TABLE loans ADD COLUMN accrued_through TEXT;",
+    ]),
+    (6, "full-text search index over accounts", [
+        lambda cur: _create_accounts_fts(cur),
+    ]),
+    (7, "change log for the change feed", [
+        """CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT NOT NULL,
+            row_id INTEGER, -- NULL with op 'reload': too many rows changed, reload the table
+            op TEXT NOT NULL -- update/delete/reload
+        );""",
+        # new rows are found by id; only edits and deletes need logging.
+        # Balance updates aren't logged: they always come with a new
+        # transactions row, which names the account.
+        """CREATE TRIGGER IF NOT EXISTS accounts_changes_au AFTER UPDATE OF account_no, name, email, phone ON accounts
+        BEGIN INSERT INTO change_log (tbl, row_id, op) VALUES ('accounts', new.id, 'update'); END;""",
+        """CREATE TRIGGER IF NOT EXISTS accounts_changes_ad AFTER DELETE ON accounts
+        BEGIN INSERT INTO change_log (tbl, row_id, op) VALUES ('accounts', old.id, 'delete'); END;""",
+        """CREATE TRIGGER IF NOT EXISTS loans_changes_au AFTER UPDATE OF status ON loans
+        BEGIN INSERT INTO change_log (tbl, row_id, op) VALUES ('loans', new.id, 'update'); END;""",
+        """CREATE TRIGGER IF NOT EXISTS loans_changes_ad AFTER DELETE ON loans
+        BEGIN INSERT INTO change_log (tbl, row_id, op) VALUES ('loans', old.id, 'delete'); END;""",
+        f"""CREATE TRIGGER IF NOT EXISTS change_log_trim AFTER INSERT ON change_log
+        BEGIN DELETE FROM change_log WHERE id <= new.id - {CHANGE_LOG_KEEP}; END;""",
+    ]),
+    (8, "opening balances and reconciliation checkpoints", [
+        # balance = opening_balance + net of the account's transactions.
+        # NULL for accounts that predate this column; the first full
+        # reconciliation adopts balance - net for them.
+        "ALTER TABLE accounts ADD COLUMN opening_balance MONEY;",
+        """CREATE TABLE IF NOT EXISTS recon_checkpoints (
+            account_no TEXT PRIMARY KEY,
+            last_tx_id INTEGER NOT NULL, -- newest transaction counted in net
+            net MONEY NOT NULL
+        ) WITHOUT ROWID;""",
+        """CREATE TABLE IF NOT EXISTS recon_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mode TEXT NOT NULL, -- incremental/full
+            started_at TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            last_tx_id INTEGER NOT NULL, -- every transaction up to here is in recon_checkpoints
+            transactions INTEGER NOT NULL DEFAULT 0,
+            accounts INTEGER NOT NULL DEFAULT 0,
+            mismatches INTEGER NOT NULL DEFAULT 0
+        );""",
+        """CREATE TABLE IF NOT EXISTS recon_mismatches (
+            run_id INTEGER NOT NULL,
+            account_no TEXT NOT NULL,
+            balance MONEY,
+            expected MONEY,
+            PRIMARY KEY (run_id, account_no)
+        ) WITHOUT ROWID;""",
+    ]),
+    (9, "timestamp index for imported back-dated transactions", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp);",
+    ]),
+]
+
+def schema_version(conn):
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    );
+    """)
+    conn.commit()
+    cur.execute("SELECT MAX(version) FROM schema_version;")
+    return cur.fetchone()[0] or 0
+
+def migrate(conn):
+    current = schema_version(conn)
+    cur = conn.cursor()
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated while we waited for the lock
+            cur.execute("SELECT 1 FROM schema_version WHERE version = ?;", (version,))
+            if cur.fetchone():
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(cur)
+                else:
+                    cur.execute(step)
+            cur.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                        (version, description, datetime.datetime.utcnow().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
+
+# SQLite can't change a column's type in place: create <table>_new, copy
+# the rows across with select_sql, swap it in, then restore the AUTOINCREMENT
+# counter and the indexes the old table had.
+def _rebuild_table(cur, table, create_sql, select_sql, indexes=()):
+    cur.execute("SELECT seq FROM sqlite_sequence WHERE name = ?;", (table,))
+    old_seq = cur.fetchone()
+    cur.execute(create_sql.replace(f"CREATE TABLE {table} (", f"CREATE TABLE {table}_new (", 1))
+    cur.execute(f"INSERT INTO {table}_new {select_sql};")
+    cur.execute(f"DROP TABLE {table};")
+    cur.execute(f"ALTER TABLE {table}_new RENAME TO {table};")
+    if old_seq:
+        cur.execute("SELECT seq FROM sqlite_sequence WHERE name = ?;", (table,))
+        new_seq = cur.fetchone()
+        cur.execute("DELETE FROM sqlite_sequence WHERE name = ?;", (table,))
+        cur.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?);",
+                    (table, max(old_seq[0], new_seq[0] if new_seq else 0)))
+    for sql in indexes:
+        cur.execute(sql)
+
+# pesos REAL -> centavos INTEGER, as SQL
+def _minor_sql(col):
+    return f"CAST(ROUND(COALESCE({col}, 0) * {MINOR_UNITS}) AS INTEGER)"
+
+def _migrate_money_columns(cur):
+    _rebuild_table(cur, "accounts", """
+    CREATE TABLE accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_no TEXT UNIQUE,
+        name TEXT,
+        email TEXT,
+        phone TEXT,
+        balance MONEY NOT NULL DEFAULT 0,
+        created_at TEXT
+    );""", f"SELECT id, account_no, name, email, phone, {_minor_sql('balance')}, created_at FROM accounts")
+    _rebuild_table(cur, "transactions", """
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_no TEXT,
+        type TEXT, -- deposit/withdraw/transfer (transfer legs are signed)
+        amount MONEY,
+        timestamp TEXT,
+        note TEXT
+    );""", f"SELECT id, account_no, type, {_minor_sql('amount')}, timestamp, note FROM transactions", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions (account_no, id);",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type, amount);",
+    ])
+    _rebuild_table(cur, "loans", """
+    CREATE TABLE loans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_no TEXT,
+        amount MONEY,
+        status TEXT, -- pending/approved/paid
+        created_at TEXT,
+        updated_at TEXT
+    );""", f"SELECT id, account_no, {_minor_sql('amount')}, status, created_at, updated_at FROM loans", [
+        "CREATE INDEX IF NOT EXISTS idx_loans_status ON loans (status, id);",
+    ])
+    _rebuild_table(cur, "rollups", """
+    CREATE TABLE rollups (
+        name TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        amount MONEY NOT NULL DEFAULT 0
+    );""", f"SELECT name, count, {_minor_sql('amount')} FROM rollups")
+    _rebuild_table(cur, "daily_rollups", """
+    CREATE TABLE daily_rollups (
+        day TEXT,
+        type TEXT,
+        count INTEGER NOT NULL DEFAULT 0,
+        amount MONEY NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, type)
+    ) WITHOUT ROWID;""", f"SELECT day, type, count, {_minor_sql('amount')} FROM daily_rollups")
+
+# External-content FTS5 index: accounts_fts stores only the index, the text
+# stays in accounts. Triggers keep it in step with every insert, delete and
+# edit; balance updates don't touch an indexed column, so they don't fire.
+# Prefix indexes for 2-8 characters keep search-as-you-type lookups to a few
+# index reads even for phone numbers and emails, where nearly every token is
+# unique.
+def _create_accounts_fts(cur):
+    try:
+        cur.execute("""CREATE VIRTUAL TABLE accounts_fts USING fts5(
+            account_no, name, email, phone,
+            content='accounts', content_rowid='id',
+            prefix='2 3 4 5 6 7 8', tokenize='unicode61 remove_diacritics 2'
+        );""")
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return  # no FTS5 in this SQLite: search_accounts falls back to LIKE
+    cur.execute("""CREATE TRIGGER accounts_fts_ai AFTER INSERT ON accounts BEGIN
+        INSERT INTO accounts_fts (rowid, account_no, name, email, phone)
+        VALUES (new.id, new.account_no, new.name, new.email, new.phone);
+    END;""")
+    cur.execute("""CREATE TRIGGER accounts_fts_ad AFTER DELETE ON accounts BEGIN
+        INSERT INTO accounts_fts (accounts_fts, rowid, account_no, name, email, phone)
+        VALUES ('delete', old.id, old.account_no, old.name, old.email, old.phone);
+    END;""")
+    cur.execute("""CREATE TRIGGER accounts_fts_au AFTER UPDATE OF account_no, name, email, phone ON accounts BEGIN
+        INSERT INTO accounts_fts (accounts_fts, rowid, account_no, name, email, phone)
+        VALUES ('delete', old.id, old.account_no, old.name, old.email, old.phone);
+        INSERT INTO accounts_fts (rowid, account_no, name, email, phone)
+        VALUES (new.id, new.account_no, new.name, new.email, new.phone);
+    END;""")
+    cur.execute("INSERT INTO accounts_fts (accounts_fts) VALUES ('rebuild');")
 
 # Authentication
+@instrumented
 def authenticate_admin(username: str, password: str) -> bool:
     conn = get_conn()
     cur = conn.cursor()
@@ -113,6 +813,7 @@ def authenticate_admin(username: str, password: str) -> bool:
     return stored == hash_password(password)
 
 # Admin creation (optional)
+@instrumented
 def create_admin(username: str, password: str, fullname: str = ""):
     conn = get_conn()
     cur = conn.cursor()
@@ -127,16 +828,260 @@ def create_admin(username: str, password: str, fullname: str = ""):
     finally:
         conn.close()
 
+# === Account cache ===
+# LRU of account rows (id, account_no, name, email, phone, balance,
+# created_at) keyed by account_no, plus an id -> account_no index. Our own
+# writes go through to it once they commit. Anything else is caught by one
+# watcher connection for the whole process: PRAGMA data_version on it changes
+# whenever any other connection commits, ours or another process's. The
+# transactions and change_log rows added since it last looked then name the
+# accounts that changed (a balance never moves without a transactions row,
+# and triggers log edits and deletes), and only those rows are dropped. New
+# accounts need nothing; a lookup misses and loads them.
+class AccountCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.rows = collections.OrderedDict()
+        self.ids = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()  # per thread: staged writes
+        self.seq = 0                    # bumped by every write-through; guards fills
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self.watch_lock = threading.Lock()
+        self.watch = None               # (db key, connection, data_version, last tx id, last change_log id)
+
+    def enabled(self):
+        return self.capacity > 0 and POOL_ENABLED and not USE_MYSQL
+
+    # Drop the rows changed by commits since the last call, from any thread
+    # or process. A new database (or pool generation) clears everything.
+    def validate(self):
+        key = (SQLITE_DB, _pool_generation)
+        with self.watch_lock:
+            try:
+                if self.watch is None or self.watch[0] != key:
+                    self.watch = self._open_watch(key)
+                    self.clear(count=True)
+                    return
+                _, conn, version, tx_id, log_id = self.watch
+                now = conn.execute("PRAGMA data_version;").fetchone()[0]
+                if now != version:
+                    self.watch = (key, conn, now) + self._drop_changed(conn, tx_id, log_id)
+            except sqlite3.Error:
+                self.watch = None
+                self.clear(count=True)
+
+    def _open_watch(self, key):
+        conn = _open_sqlite()
+        with _pool_lock:
+            _pool_conns.append(conn)  # closed by close_pool() like the others
+        version = conn.execute("PRAGMA data_version;").fetchone()[0]
+        tx_id = conn.execute("SELECT MAX(id) FROM transactions;").fetchone()[0] or 0
+        log_id = conn.execute("SELECT MAX(id) FROM change_log;").fetchone()[0] or 0
+        return key, conn, version, tx_id, log_id
+
+    # -> (last tx id, last change_log id) after dropping what they name. More
+    # new rows than the cache holds (an import), or change_log entries trimmed
+    # before we saw them, clear the cache instead.
+    def _drop_changed(self, conn, tx_id, log_id):
+        touched, ids, whole = set(), set(), False
+        rows = conn.execute("SELECT id, account_no FROM transactions WHERE id > ? ORDER BY id LIMIT ?;",
+                            (tx_id, self.capacity + 1)).fetchall()
+        if len(rows) > self.capacity:
+            whole = True
+            tx_id = conn.execute("SELECT MAX(id) FROM transactions;").fetchone()[0]
+        elif rows:
+            tx_id = rows[-1][0]
+            touched.update(account_no for _, account_no in rows)
+        rows = conn.execute("SELECT id, tbl, row_id, op FROM change_log WHERE id > ? ORDER BY id;",
+                            (log_id,)).fetchall()
+        if rows:
+            whole |= rows[0][0] != log_id + 1
+            log_id = rows[-1][0]
+            for _, tbl, row_id, op in rows:
+                if tbl == "accounts":
+                    whole |= op == "reload"
+                    ids.add(row_id)
+        if whole:
+            self.clear(count=True)
+        elif touched or ids:
+            with self.lock:
+                self.seq += 1
+                touched.update(self.ids[i] for i in ids if i in self.ids)
+                for account_no in touched:
+                    row = self.rows.pop(account_no, None)
+                    if row is not None:
+                        self.ids.pop(row[0], None)
+                        self.invalidations += 1
+        return tx_id, log_id
+
+    def clear(self, count=False):
+        with self.lock:
+            self.rows.clear()
+            self.ids.clear()
+            self.seq += 1
+            self.invalidations += count
+
+    def get(self, account_no=None, acc_id=None):
+        with self.lock:
+            if account_no is None:
+                account_no = self.ids.get(acc_id)
+            row = self.rows.get(account_no)
+            if row is None:
+                self.misses += 1
+                return None, self.seq
+            self.rows.move_to_end(account_no)
+            self.hits += 1
+            return row, self.seq
+
+    # Cache a row read from the database, unless a write went through since
+    # the read started (the row might predate it).
+    def fill(self, row, seq):
+        with self.lock:
+            if seq != self.seq:
+                return
+            self._store(row)
+
+    def _store(self, row):
+        self.rows[row[1]] = row
+        self.rows.move_to_end(row[1])
+        self.ids[row[0]] = row[1]
+        while len(self.rows) > self.capacity:
+            _, old = self.rows.popitem(last=False)
+            self.ids.pop(old[0], None)
+            self.evictions += 1
+
+    # Write-through for a committed change; rows not cached are left alone.
+    def update(self, account_no, name=None, email=None, phone=None, balance=None):
+        with self.lock:
+            self.seq += 1
+            row = self.rows.get(account_no)
+            if row is None:
+                return
+            self.rows[account_no] = (row[0], row[1],
+                                     row[2] if name is None else name,
+                                     row[3] if email is None else email,
+                                     row[4] if phone is None else phone,
+                                     row[5] if balance is None else Money(balance),
+                                     row[6])
+
+    def put(self, row):
+        with self.lock:
+            self.seq += 1
+            self._store(row)
+
+    def drop(self, account_no):
+        with self.lock:
+            self.seq += 1
+            row = self.rows.pop(account_no, None)
+            if row is not None:
+                self.ids.pop(row[0], None)
+
+    # Balance changes made inside a transaction are staged per thread and
+    # applied only after the commit.
+    def stage(self, account_no, balance):
+        if self.enabled():
+            staged = getattr(self.local, "staged", None)
+            if staged is None:
+                staged = self.local.staged = []
+            staged.append((account_no, balance))
+
+    # position in this thread's staged list, for discard_staged(mark) after
+    # rolling back to a savepoint
+    def staged_mark(self):
+        staged = getattr(self.local, "staged", None)
+        return len(staged) if staged else 0
+
+    def apply_staged(self):
+        staged = getattr(self.local, "staged", None)
+        if staged:
+            for account_no, balance in staged:
+                self.update(account_no, balance=balance)
+            staged.clear()
+
+    def discard_staged(self, mark=0):
+        staged = getattr(self.local, "staged", None)
+        if staged:
+            del staged[mark:]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.rows),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+_account_cache = AccountCache(ACCOUNT_CACHE_SIZE)
+
+def _lookup_account(where, value, account_no=None, acc_id=None):
+    conn = get_conn()
+    try:
+        seq = None
+        if _account_cache.enabled():
+            _account_cache.validate()
+            row, seq = _account_cache.get(account_no, acc_id)
+            if row is not None:
+                return row
+        cur = conn.cursor()
+        cur.execute(f"SELECT id, account_no, name, email, phone, balance, created_at FROM accounts WHERE {where} = ?;",
+                    (value,))
+        row = cur.fetchone()
+        if row is not None and seq is not None:
+            _account_cache.fill(row, seq)
+        return row
+    finally:
+        conn.close()
+
+# One account row, or None. Served from the account cache when possible.
+@instrumented
+def get_account(account_no):
+    return _lookup_account("account_no", account_no, account_no=account_no)
+
+@instrumented
+def get_account_by_id(acc_id):
+    return _lookup_account("id", acc_id, acc_id=acc_id)
+
+def account_cache_stats():
+    return _account_cache.stats()
+
+def clear_account_cache():
+    _account_cache.clear()
+    _account_cache.reset_stats()
+
 # Accounts functions
+# Inserts one account inside the caller's transaction and returns its row for
+# the account cache (put it there once committed). Raises on a bad balance or
+# a duplicate account_no.
+def _apply_create_account(conn, account_no, name, email="", phone="", initial_balance=0.0):
+    cur = conn.cursor()
+    initial_balance = to_money(initial_balance)
+    created_at = datetime.datetime.utcnow().isoformat()
+    cur.execute("""INSERT INTO accounts (account_no, name, email, phone, balance, opening_balance, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?);""",
+                (account_no, name, email, phone, initial_balance, initial_balance, created_at))
+    acc_id = cur.lastrowid
+    _bump_rollup(cur, "accounts", 1)
+    log_action("system", f"Create account {account_no}", conn=conn)
+    return (acc_id, account_no, name, email, phone, initial_balance, created_at)
+
+@instrumented
 def create_account(account_no, name, email="", phone="", initial_balance=0.0):
     conn = get_conn()
-    cur = conn.cursor()
     try:
-        cur.execute("""INSERT INTO accounts (account_no, name, email, phone, balance, created_at)
-                       VALUES (?, ?, ?, ?, ?, ?);""",
-                    (account_no, name, email, phone, initial_balance, datetime.datetime.utcnow().isoformat()))
+        row = _apply_create_account(conn, account_no, name, email, phone, initial_balance)
         conn.commit()
-        log_action("system", f"Create account {account_no}")
+        if _account_cache.enabled():
+            _account_cache.put(row)
         return True
     except Exception as e:
         print("create_account error:", e)
@@ -144,6 +1089,7 @@ def create_account(account_no, name, email="", phone="", initial_balance=0.0):
     finally:
         conn.close()
 
+@instrumented
 def get_accounts():
     conn = get_conn()
     cur = conn.cursor()
@@ -152,6 +1098,7 @@ def get_accounts():
     conn.close()
     return rows
 
+@instrumented
 def update_account(acc_id, name=None, email=None, phone=None):
     conn = get_conn()
     cur = conn.cursor()
@@ -167,11 +1114,13 @@ def update_account(acc_id, name=None, email=None, phone=None):
     new_phone = phone if phone is not None else r[3]
     cur.execute("UPDATE accounts SET name=?, email=?, phone=? WHERE id=?",
                 (new_name, new_email, new_phone, acc_id))
+    log_action("system", f"Update account {account_no}", conn=conn)
     conn.commit()
-    log_action("system", f"Update account {account_no}")
     conn.close()
+    _account_cache.update(account_no, new_name, new_email, new_phone)
     return True
 
+@instrumented
 def delete_account(acc_id):
     conn = get_conn()
     cur = conn.cursor()
@@ -182,98 +1131,1064 @@ def delete_account(acc_id):
         return False
     account_no = r[0]
     cur.execute("DELETE FROM accounts WHERE id=?", (acc_id,))
+    cur.execute("DELETE FROM recon_checkpoints WHERE account_no=?", (account_no,))
+    _bump_rollup(cur, "accounts", -1)
+    log_action("system", f"Delete account {account_no}", conn=conn)
     conn.commit()
-    log_action("system", f"Delete account {account_no}")
     conn.close()
+    _account_cache.drop(account_no)
     return True
 
+# === Account search ===
+_SEARCH_WORD = re.compile(r"\w+")
+
+# "juan dela" -> '"juan"* "dela"*': every word must match (as a prefix when
+# it's at least SEARCH_MIN_PREFIX long). Words are quoted, so nothing the
+# user types is read as FTS5 query syntax.
+def _fts_query(text):
+    terms = []
+    for word in _SEARCH_WORD.findall(text.lower()):
+        terms.append(f'"{word}"*' if len(word) >= SEARCH_MIN_PREFIX else f'"{word}"')
+    return " ".join(terms)
+
+# Search accounts by account number, name, email or phone, best match first
+# (bm25, an account_no or name hit outranks an email/phone hit).
+# Returns rows shaped like get_accounts().
+@instrumented
+def search_accounts(query, limit=SEARCH_LIMIT):
+    match = _fts_query(query or "")
+    if not match:
+        return []
+    select = """SELECT a.id, a.account_no, a.name, a.email, a.phone, a.balance, a.created_at
+                FROM accounts_fts f JOIN accounts a ON a.id = f.rowid WHERE accounts_fts MATCH ?"""
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM (SELECT 1 FROM accounts_fts WHERE accounts_fts MATCH ? LIMIT ?);",
+                    (match, SEARCH_RANK_MAX + 1))
+        if cur.fetchone()[0] <= SEARCH_RANK_MAX:
+            cur.execute(select + " ORDER BY bm25(accounts_fts, 10.0, 5.0, 2.0, 2.0), a.id LIMIT ?;", (match, limit))
+            return cur.fetchall()
+        cur.execute(select + " ORDER BY f.rowid LIMIT ?;", ("{account_no name} : (" + match + ")", limit))
+        rows = cur.fetchall()
+        if len(rows) < limit:
+            seen = {r[0] for r in rows}
+            cur.execute(select + " ORDER BY f.rowid LIMIT ?;", (match, limit + len(rows)))
+            rows += [r for r in cur.fetchall() if r[0] not in seen][:limit - len(rows)]
+        return rows
+    except Exception as e:
+        if "accounts_fts" not in str(e):
+            print("search_accounts error:", e)
+            return []
+        # no FTS5 index: every word as a substring of some column; shows up
+        # in the metrics panel as search_accounts:like
+        start = time.perf_counter() if INSTRUMENT else None
+        where, params = [], []
+        for word in _SEARCH_WORD.findall(query.lower()):
+            where.append("(LOWER(account_no) LIKE ? OR LOWER(name) LIKE ? OR LOWER(email) LIKE ? OR phone LIKE ?)")
+            params += [f"%{word}%"] * 4
+        cur.execute(f"""SELECT id, account_no, name, email, phone, balance, created_at FROM accounts
+                        WHERE {' AND '.join(where)} ORDER BY id LIMIT {int(limit)};""", params)
+        rows = cur.fetchall()
+        if start is not None:
+            record_metric("search_accounts:like", time.perf_counter() - start, len(rows))
+        return rows
+    finally:
+        conn.close()
+
+# === Velocity limits ===
+# Per account, one flat array('q') holding a ring of VELOCITY_BUCKETS slices
+# per rule, each slice (slice number, count, total). A check sums the live
+# slices, so it costs the same however busy the account is. An event keeps
+# counting for between window and window + window/VELOCITY_BUCKETS seconds,
+# never less.
+#
+# The rings aren't fed by our own writes: every check first reads the
+# transactions committed since the previous check (id > last seen), whoever
+# wrote them. Checks run inside BEGIN IMMEDIATE, so nothing else can commit
+# between that read and the balance update, and limits hold across threads
+# and app instances. The first check, or init_db() when rules are set, warms
+# the rings from the last window of transactions. A caller that rolls back a
+# transaction after checks inside it read its earlier rows (a batch) must
+# call reset().
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def _epoch_seconds(ts):
+    return (datetime.datetime.fromisoformat(ts) - _EPOCH).total_seconds()
+
+def _window_label(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+_VELOCITY_PLURALS = {"deposit": "deposits", "withdraw": "withdrawals", "transfer": "transfers"}
+
+def _velocity_label(rule):
+    ttype, window, max_count, max_total = rule
+    caps = [f"{max_count}" if max_count is not None else None, str(max_total) if max_total is not None else None]
+    return f"{ttype} {' / '.join(c for c in caps if c)} per {_window_label(window)}"
+
+class VelocityLimiter:
+    def __init__(self, rules=()):
+        self.lock = threading.Lock()
+        self.set_rules(rules)
+
+    def set_rules(self, rules):
+        parsed = []
+        for ttype, window, max_count, max_total in rules:
+            if ttype not in ("deposit", "withdraw", "transfer"):
+                raise ValueError(f"velocity rule: unknown type {ttype!r}")
+            if int(window) <= 0 or (max_count is None and max_total is None):
+                raise ValueError("velocity rule needs a positive window and a count or total cap")
+            parsed.append((ttype, int(window), max_count, None if max_total is None else to_money(max_total)))
+        with self.lock:
+            self.rules = parsed
+            self.by_type = {}
+            for n, rule in enumerate(parsed):
+                self.by_type.setdefault(rule[0], []).append(n)
+            self.width = [rule[1] / VELOCITY_BUCKETS for rule in parsed]
+            self.checks = 0
+            self.check_time = 0.0
+            self.rejections = [0] * len(parsed)
+            self._reset()
+
+    def _reset(self):
+        self.rings = {}
+        self.last_id = None
+        self.key = None
+        self.swept = 0.0
+
+    # forget everything; the next check warms up again
+    def reset(self):
+        with self.lock:
+            self._reset()
+
+    def enabled(self):
+        return bool(self.rules)
+
+    def _add(self, account_no, ttype, amount, at):
+        ring = self.rings.get(account_no)
+        if ring is None:
+            ring = self.rings[account_no] = array.array("q", bytes(24 * VELOCITY_BUCKETS * len(self.rules)))
+        for n in self.by_type[ttype]:
+            b = int(at // self.width[n])
+            slot = (n * VELOCITY_BUCKETS + b % VELOCITY_BUCKETS) * 3
+            if ring[slot] == b:
+                ring[slot + 1] += 1
+                ring[slot + 2] += amount
+            elif ring[slot] < b:
+                ring[slot], ring[slot + 1], ring[slot + 2] = b, 1, amount
+
+    # -> (count, total) of rule n in the window ending at now
+    def _window(self, ring, n, now):
+        live = int(now // self.width[n]) - VELOCITY_BUCKETS + 1
+        base = n * VELOCITY_BUCKETS * 3
+        count = total = 0
+        for slot in range(base, base + 3 * VELOCITY_BUCKETS, 3):
+            if ring[slot] >= live:
+                count += ring[slot + 1]
+                total += ring[slot + 2]
+        return count, total
+
+    def _catch_up(self, cur, now):
+        key = (SQLITE_DB, _pool_generation)
+        if key != self.key:
+            self._reset()
+            self.key = key
+        if self.last_id is None:
+            since = _EPOCH + datetime.timedelta(seconds=now - max(rule[1] for rule in self.rules))
+            self.last_id = first_id_at(cur, "transactions", since.isoformat()) - 1
+        cur.execute("SELECT id, account_no, type, amount, timestamp FROM transactions WHERE id > ? ORDER BY id;",
+                    (self.last_id,))
+        for tx_id, account_no, ttype, amount, ts in cur:
+            self.last_id = tx_id
+            if ttype == "transfer":
+                if amount is None or amount >= 0:
+                    continue  # receiving leg
+                amount = -amount
+            if ttype in self.by_type and ts:
+                self._add(account_no, ttype, int(amount or 0), _epoch_seconds(ts))
+        if now - self.swept > VELOCITY_SWEEP_SECONDS:
+            self._sweep(now)
+
+    def _sweep(self, now):
+        self.swept = now
+        idle = [account_no for account_no, ring in self.rings.items()
+                if not any(self._window(ring, n, now)[0] for n in range(len(self.rules)))]
+        for account_no in idle:
+            del self.rings[account_no]
+
+    # Called inside the caller's write transaction, before the balance
+    # changes. pending = (count, total) already accepted in this transaction
+    # but not inserted yet (a bulk chunk). With a tally list the check is
+    # counted there instead of in stats(), and add_tally() counts it once
+    # the transaction commits, so a rolled-back and retried chunk isn't
+    # counted twice. -> (ok, msg)
+    def check(self, conn, account_no, ttype, amount, pending=None, tally=None):
+        rules = self.by_type.get(ttype)
+        if not rules:
+            return True, "OK"
+        start = time.perf_counter()
+        now = (datetime.datetime.utcnow() - _EPOCH).total_seconds()
+        failed = None
+        with self.lock:
+            self._catch_up(conn.cursor(), now)
+            ring = self.rings.get(account_no)
+            for n in rules:
+                count, total = self._window(ring, n, now) if ring is not None else (0, 0)
+                if pending:
+                    count, total = count + pending[0], total + pending[1]
+                _, _, max_count, max_total = self.rules[n]
+                if (max_count is not None and count >= max_count) or \
+                        (max_total is not None and total + amount > max_total):
+                    failed = n
+                    break
+            elapsed = time.perf_counter() - start
+            if tally is None:
+                self._count(failed, elapsed)
+            else:
+                tally.append((failed, elapsed))
+        if INSTRUMENT:
+            record_metric("velocity_check", elapsed, error=failed is not None)
+        if failed is None:
+            return True, "OK"
+        ttype, window, max_count, max_total = self.rules[failed]
+        what, per = _VELOCITY_PLURALS[ttype], _window_label(window)
+        if max_count is not None and max_total is not None:
+            return False, f"Velocity limit: at most {max_count} {what} or {max_total} per {per}"
+        if max_count is not None:
+            return False, f"Velocity limit: at most {max_count} {what} per {per}"
+        return False, f"Velocity limit: at most {max_total} in {what} per {per}"
+
+    def _count(self, failed, elapsed):
+        self.checks += 1
+        self.check_time += elapsed
+        if failed is not None and failed < len(self.rejections):
+            self.rejections[failed] += 1
+
+    def add_tally(self, tally):
+        with self.lock:
+            for failed, elapsed in tally:
+                self._count(failed, elapsed)
+
+    def warm(self, conn):
+        if self.rules:
+            with self.lock:
+                self._catch_up(conn.cursor(), (datetime.datetime.utcnow() - _EPOCH).total_seconds())
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rules": [(_velocity_label(rule), self.rejections[n]) for n, rule in enumerate(self.rules)],
+                "checks": self.checks,
+                "rejections": sum(self.rejections),
+                "accounts": len(self.rings),
+                "avg_check_us": self.check_time / self.checks * 1e6 if self.checks else 0.0,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.checks = 0
+            self.check_time = 0.0
+            self.rejections = [0] * len(self.rules)
+
+_velocity = VelocityLimiter(VELOCITY_RULES)
+
+# Replace the rules at runtime, e.g. [("withdraw", 3600, 10, 50_000)].
+def set_velocity_rules(rules):
+    _velocity.set_rules(rules)
+
+# {rules: [(label, rejections)], checks, rejections, accounts, avg_check_us}
+def velocity_stats():
+    return _velocity.stats()
+
+def reset_velocity_stats():
+    _velocity.reset_stats()
+
+# === Ledger ===
+# Balances are only ever changed by single conditional UPDATEs
+# (balance = balance - ? WHERE balance >= ?) inside BEGIN IMMEDIATE, so two
+# tellers hitting the same account can't lose each other's update and a
+# withdrawal can't overdraw even under concurrency.
+
+def _is_busy(e):
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+# Retry a whole write transaction with jittered backoff on SQLITE_BUSY.
+def _retry_busy(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == BUSY_RETRIES:
+                    raise
+                delay = random.uniform(0, 0.01 * 2 ** attempt)
+                if INSTRUMENT:
+                    _add_lock_wait(delay)
+                time.sleep(delay)
+    return wrapper
+
+# Time spent here is waiting for the write lock (busy_timeout), so it is
+# counted as lock wait when instrumented.
+def _begin_write(conn):
+    start = time.perf_counter() if INSTRUMENT else None
+    if USE_MYSQL:
+        conn.start_transaction()
+    else:
+        conn.execute("BEGIN IMMEDIATE")
+    if start is not None:
+        _add_lock_wait(time.perf_counter() - start)
+
+# _debit/_credit return the new balance, or None when no row changed.
+# SQLite hands the balance back with RETURNING, so the account cache gets it
+# without a second query.
+def _debit(cur, account_no, amount):
+    if USE_MYSQL:
+        cur.execute("UPDATE accounts SET balance = balance - ? WHERE account_no = ? AND balance >= ?;",
+                    (amount, account_no, amount))
+        return _balance_after(cur, account_no)
+    cur.execute("UPDATE accounts SET balance = balance - ? WHERE account_no = ? AND balance >= ? RETURNING balance;",
+                (amount, account_no, amount))
+    row = cur.fetchone()
+    return None if row is None else Money(row[0])
+
+def _credit(cur, account_no, amount):
+    if USE_MYSQL:
+        cur.execute("UPDATE accounts SET balance = balance + ? WHERE account_no = ?;", (amount, account_no))
+        return _balance_after(cur, account_no)
+    cur.execute("UPDATE accounts SET balance = balance + ? WHERE account_no = ? RETURNING balance;",
+                (amount, account_no))
+    row = cur.fetchone()
+    return None if row is None else Money(row[0])
+
+def _balance_after(cur, account_no):
+    if cur.rowcount != 1:
+        return None
+    cur.execute("SELECT balance FROM accounts WHERE account_no = ?;", (account_no,))
+    return Money(cur.fetchone()[0])
+
+# why a _debit/_credit touched no row
+def _balance_failure(cur, account_no):
+    cur.execute("SELECT 1 FROM accounts WHERE account_no = ?;", (account_no,))
+    return "Insufficient funds" if cur.fetchone() else "Account not found"
+
+# Applies one deposit/withdraw inside the caller's transaction; the caller
+# commits on (True, ...) and rolls back otherwise.
+def _apply_transaction(conn, account_no, ttype, amount, note=""):
+    if ttype not in ("deposit", "withdraw"):
+        return False, "Invalid type"
+    amount = _positive_money(amount)
+    if amount is None:
+        return False, "Invalid amount"
+    ok, msg = _velocity.check(conn, account_no, ttype, amount)
+    if not ok:
+        return False, msg
+    cur = conn.cursor()
+    balance = _credit(cur, account_no, amount) if ttype == "deposit" else _debit(cur, account_no, amount)
+    if balance is None:
+        return False, _balance_failure(cur, account_no)
+    _account_cache.stage(account_no, balance)
+    now = datetime.datetime.utcnow().isoformat()
+    cur.execute("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)",
+                (account_no, ttype, amount, now, note))
+    _rollup_transactions(cur, [(account_no, ttype, amount, now, note)])
+    log_action("system", f"{ttype} {amount} on {account_no}", conn=conn)
+    return True, "OK"
+
 # Transactions (deposit/withdraw)
+@instrumented
+@_retry_busy
 def add_transaction(account_no, ttype, amount, note=""):
     conn = get_conn()
+    try:
+        _begin_write(conn)
+        ok, msg = _apply_transaction(conn, account_no, ttype, amount, note)
+        if ok:
+            conn.commit()
+            _account_cache.apply_staged()
+        else:
+            conn.rollback()
+        return ok, msg
+    finally:
+        _account_cache.discard_staged()
+        conn.close()
+
+# Transfer legs are stored as two "transfer" rows with a signed amount:
+# -amount on the source account, +amount on the destination.
+def _apply_transfer(conn, from_no, to_no, amount, note=""):
+    if from_no == to_no:
+        return False, "Cannot transfer to the same account"
+    amount = _positive_money(amount)
+    if amount is None:
+        return False, "Invalid amount"
+    ok, msg = _velocity.check(conn, from_no, "transfer", amount)
+    if not ok:
+        return False, msg
     cur = conn.cursor()
-    # update balance
-    cur.execute("SELECT balance FROM accounts WHERE account_no = ?;", (account_no,))
-    r = cur.fetchone()
-    if not r:
+    # Touch both rows in account_no order: on row-locking engines (MySQL) two
+    # opposite transfers then lock in the same order and can't deadlock.
+    for account_no in sorted((from_no, to_no)):
+        if account_no == from_no:
+            balance = _debit(cur, from_no, amount)
+        else:
+            balance = _credit(cur, to_no, amount)
+        if balance is None:
+            return False, _balance_failure(cur, account_no)
+        _account_cache.stage(account_no, balance)
+    now = datetime.datetime.utcnow().isoformat()
+    legs = [(from_no, "transfer", -amount, now, note), (to_no, "transfer", amount, now, note)]
+    cur.executemany("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)",
+                    legs)
+    _rollup_transactions(cur, legs)
+    log_action("system", f"transfer {amount} from {from_no} to {to_no}", conn=conn)
+    return True, "OK"
+
+@instrumented
+@_retry_busy
+def transfer(from_no, to_no, amount, note=""):
+    conn = get_conn()
+    try:
+        _begin_write(conn)
+        ok, msg = _apply_transfer(conn, from_no, to_no, amount, note)
+        if ok:
+            conn.commit()
+            _account_cache.apply_staged()
+        else:
+            conn.rollback()
+        return ok, msg
+    finally:
+        _account_cache.discard_staged()
         conn.close()
-        return False, "Account not found"
-    balance = r[0]
-    if ttype == "withdraw" and balance < amount:
+
+# Bulk posting for batch files (payroll, end-of-day). rows is any iterable of
+# (account_no, type, amount[, note]) tuples or dicts with those keys. It is
+# consumed lazily, chunk_size rows per transaction: balances for the chunk are
+# read once, funds are checked in memory row by row, then balance deltas,
+# transaction rows and audit rows go in with executemany. Returns one
+# (ok, msg) per input row, in input order, like add_transaction().
+@instrumented
+def add_transactions_bulk(rows, chunk_size=None):
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    results = []
+    conn = get_conn()
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                results.extend(_post_bulk_chunk(conn, chunk))
+                chunk = []
+        if chunk:
+            results.extend(_post_bulk_chunk(conn, chunk))
+    finally:
         conn.close()
-        return False, "Insufficient funds"
-    new_balance = balance + amount if ttype == "deposit" else balance - amount
-    cur.execute("UPDATE accounts SET balance = ? WHERE account_no = ?;", (new_balance, account_no))
-    cur.execute("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)",
-                (account_no, ttype, amount, datetime.datetime.utcnow().isoformat(), note))
-    conn.commit()
-    log_action("system", f"{ttype} {amount} on {account_no}")
-    conn.close()
-    return True, "OK"
+    return results
+
+# -> (account_no, type, amount, note, timestamp or None)
+def _parse_bulk_row(row):
+    if isinstance(row, dict):
+        return (row.get("account_no"), row.get("type"), row.get("amount"), row.get("note") or "",
+                row.get("timestamp") or None)
+    account_no, ttype, amount = row[0], row[1], row[2]
+    note = row[3] if len(row) > 3 else ""
+    ts = row[4] if len(row) > 4 else None
+    return account_no, ttype, amount, note, ts or None
+
+def _fetch_balances(cur, account_nos):
+    balances = {}
+    account_nos = list(account_nos)
+    for i in range(0, len(account_nos), 500):
+        part = account_nos[i:i + 500]
+        marks = ",".join("?" * len(part))
+        cur.execute(f"SELECT account_no, balance FROM accounts WHERE account_no IN ({marks});", part)
+        balances.update(cur.fetchall())
+    return balances
+
+# imported=True is the import path: transfer legs (signed amounts) are
+# accepted, and timestamps are kept. With apply=False too, rows are recorded
+# as history: balances aren't touched (nor checked, for funds or velocity)
+# and there is no audit row per transaction. Applied rows go through the
+# velocity limits like add_transaction, counting the rows accepted earlier
+# in the same chunk.
+def _post_bulk_chunk(conn, chunk, attempt=0, imported=False, apply=True):
+    parsed = []
+    for row in chunk:
+        try:
+            parsed.append(_parse_bulk_row(row))
+        except Exception:
+            parsed.append(None)
+    cur = conn.cursor()
+    try:
+        _begin_write(conn)
+        balances = _fetch_balances(cur, {p[0] for p in parsed if p})
+        now = datetime.datetime.utcnow().isoformat()
+        results, deltas, tx_rows, audit_rows = [], {}, [], []
+        history = {}  # net of history rows per account, taken off opening_balance
+        pending = {}  # (account_no, type) -> (count, total) accepted in this chunk
+        tally = []    # velocity checks, counted once the chunk commits
+        for p in parsed:
+            if p is None:
+                results.append((False, "Malformed row"))
+                continue
+            account_no, ttype, amount, note, ts = p
+            if ttype == "transfer" and imported:
+                try:
+                    amount = to_money(amount)
+                except Exception:
+                    amount = None
+                if not amount:
+                    results.append((False, "Invalid amount"))
+                    continue
+                delta = amount
+            elif ttype in ("deposit", "withdraw"):
+                amount = _positive_money(amount)
+                if amount is None:
+                    results.append((False, "Invalid amount"))
+                    continue
+                delta = amount if ttype == "deposit" else -amount
+            else:
+                results.append((False, "Invalid type"))
+                continue
+            if account_no not in balances:
+                results.append((False, "Account not found"))
+                continue
+            if imported and ts is not None:
+                try:
+                    ts = datetime.datetime.fromisoformat(ts).isoformat()
+                except (TypeError, ValueError):
+                    results.append((False, "Invalid timestamp"))
+                    continue
+            if apply:
+                # a transfer leg counts against the sending account only
+                key = (account_no, ttype) if ttype != "transfer" or delta < 0 else None
+                if key is not None:
+                    ok, msg = _velocity.check(conn, account_no, ttype, abs(delta), pending.get(key), tally)
+                    if not ok:
+                        results.append((False, msg))
+                        continue
+                if delta < 0 and balances[account_no] < -delta:
+                    results.append((False, "Insufficient funds"))
+                    continue
+                if key is not None and _velocity.enabled():
+                    count, total = pending.get(key, (0, 0))
+                    pending[key] = (count + 1, total + abs(delta))
+                balances[account_no] += delta
+                deltas[account_no] = deltas.get(account_no, 0) + delta
+                audit_rows.append(("system", f"{ttype} {amount} on {account_no}", now))
+            else:
+                history[account_no] = history.get(account_no, 0) + delta
+            tx_rows.append((account_no, ttype, amount, ts or now, note))
+            results.append((True, "OK"))
+        cur.executemany("UPDATE accounts SET balance = balance + ? WHERE account_no = ?;",
+                        [(d, a) for a, d in deltas.items()])
+        # the balance already includes history rows, so the opening balance didn't
+        cur.executemany("UPDATE accounts SET opening_balance = opening_balance - ? WHERE account_no = ?;",
+                        [(d, a) for a, d in history.items()])
+        cur.executemany("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)",
+                        tx_rows)
+        _rollup_transactions(cur, tx_rows)
+        _log_many(conn, audit_rows)
+        conn.commit()
+        _velocity.add_tally(tally)
+        for account_no in deltas:
+            _account_cache.update(account_no, balance=balances[account_no])
+        return results
+    except Exception as e:
+        conn.rollback()
+        if _is_busy(e) and attempt < BUSY_RETRIES:
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+            return _post_bulk_chunk(conn, chunk, attempt + 1, imported, apply)
+        print("add_transactions_bulk error:", e)
+        return [(False, str(e))] * len(chunk)
 
-def get_transactions(limit=100):
+@instrumented
+def get_transactions(limit=100, account_no=None):
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("SELECT id, account_no, type, amount, timestamp, note FROM transactions ORDER BY id DESC LIMIT ?;", (limit,))
+    if account_no is not None:
+        cur.execute("SELECT id, account_no, type, amount, timestamp, note FROM transactions WHERE account_no = ? ORDER BY id DESC LIMIT ?;",
+                    (account_no, limit))
+    else:
+        cur.execute("SELECT id, account_no, type, amount, timestamp, note FROM transactions ORDER BY id DESC LIMIT ?;", (limit,))
     rows = cur.fetchall()
     conn.close()
     return rows
 
 # Loans
-def create_loan(account_no, amount):
+@instrumented
+def create_loan(account_no, amount, rate_bps=0, term_months=12, schedule="annuity"):
+    amount = to_money(amount)
+    if (schedule not in LOAN_SCHEDULES or not 1 <= int(term_months) <= LOAN_MAX_TERM_MONTHS
+            or not 0 <= int(rate_bps) <= 100000):
+        raise ValueError("Invalid loan terms")
     conn = get_conn()
     cur = conn.cursor()
     now = datetime.datetime.utcnow().isoformat()
-    cur.execute("INSERT INTO loans (account_no, amount, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-                (account_no, amount, "pending", now, now))
+    cur.execute("""INSERT INTO loans (account_no, amount, status, created_at, updated_at, rate_bps, term_months, schedule)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (account_no, amount, "pending", now, now, int(rate_bps), int(term_months), schedule))
+    _bump_rollup(cur, "loans:pending", 1, amount)
+    log_action("system", f"Loan request {amount} for {account_no}", conn=conn)
     conn.commit()
-    log_action("system", f"Loan request {amount} for {account_no}")
     conn.close()
     return True
 
+# The status is read under BEGIN IMMEDIATE, so two changes to the same loan
+# can't both move it out of the old status's rollup.
+@instrumented
+@_retry_busy
 def update_loan_status(loan_id, status):
+    if status not in LOAN_STATUSES:
+        raise ValueError("Invalid loan status")
     conn = get_conn()
-    cur = conn.cursor()
-    now = datetime.datetime.utcnow().isoformat()
-    cur.execute("UPDATE loans SET status=?, updated_at=? WHERE id=?", (status, now, loan_id))
-    conn.commit()
-    log_action("system", f"Loan {loan_id} status -> {status}")
-    conn.close()
-    return True
+    try:
+        _begin_write(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT status, amount FROM loans WHERE id=?;", (loan_id,))
+        r = cur.fetchone()
+        if not r:
+            conn.rollback()
+            return False
+        if r[0] == status:  # nothing to move between the loans:<status> rollups
+            conn.rollback()
+            return True
+        now = datetime.datetime.utcnow().isoformat()
+        cur.execute("UPDATE loans SET status=?, updated_at=? WHERE id=?", (status, now, loan_id))
+        _bump_rollup(cur, f"loans:{r[0]}", -1, -r[1])
+        _bump_rollup(cur, f"loans:{status}", 1, r[1])
+        log_action("system", f"Loan {loan_id} status -> {status}", conn=conn)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
 
-def get_loans():
+@instrumented
+def get_loans(status=None):
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("SELECT id, account_no, amount, status, created_at, updated_at FROM loans ORDER BY id DESC;")
+    if status is not None:
+        cur.execute("SELECT id, account_no, amount, status, created_at, updated_at FROM loans WHERE status = ? ORDER BY id DESC;",
+                    (status,))
+    else:
+        cur.execute("SELECT id, account_no, amount, status, created_at, updated_at FROM loans ORDER BY id DESC;")
     rows = cur.fetchall()
     conn.close()
     return rows
 
 # Reporting
+# Totals come from the rollups table, which every write path keeps current
+# inside its own transaction, so reports never scan the raw tables.
+def _bump_rollup(cur, name, count, amount=0):
+    cur.execute("""INSERT INTO rollups (name, count, amount) VALUES (?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET count = count + excluded.count,
+                                                   amount = amount + excluded.amount;""",
+                (name, count, amount))
+
+# tx_rows are (account_no, type, amount, timestamp, note) as inserted.
+def _rollup_transactions(cur, tx_rows):
+    totals, daily = {}, {}
+    for _, ttype, amount, ts, _ in tx_rows:
+        c, a = totals.get(ttype, (0, 0))
+        totals[ttype] = (c + 1, a + amount)
+        key = (ts[:10], ttype)
+        c, a = daily.get(key, (0, 0))
+        daily[key] = (c + 1, a + amount)
+    cur.executemany("""INSERT INTO rollups (name, count, amount) VALUES (?, ?, ?)
+                       ON CONFLICT(name) DO UPDATE SET count = count + excluded.count,
+                                                       amount = amount + excluded.amount;""",
+                    [(f"tx:{t}", c, a) for t, (c, a) in totals.items()])
+    cur.executemany("""INSERT INTO daily_rollups (day, type, count, amount) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(day, type) DO UPDATE SET count = count + excluded.count,
+                                                            amount = amount + excluded.amount;""",
+                    [(d, t, c, a) for (d, t), (c, a) in daily.items()])
+
+def _rebuild_rollups(cur):
+    cur.execute("DELETE FROM rollups;")
+    cur.execute("DELETE FROM daily_rollups;")
+    cur.execute("""INSERT INTO rollups (name, count, amount)
+                   SELECT 'tx:' || type, COUNT(*), COALESCE(SUM(amount), 0) FROM transactions GROUP BY type;""")
+    cur.execute("INSERT INTO rollups (name, count, amount) SELECT 'accounts', COUNT(*), 0 FROM accounts;")
+    cur.execute("""INSERT INTO rollups (name, count, amount)
+                   SELECT 'loans:' || status, COUNT(*), COALESCE(SUM(amount), 0) FROM loans GROUP BY status;""")
+    cur.execute("""INSERT INTO daily_rollups (day, type, count, amount)
+                   SELECT substr(timestamp, 1, 10), type, COUNT(*), COALESCE(SUM(amount), 0)
+                   FROM transactions GROUP BY substr(timestamp, 1, 10), type;""")
+
+# Recompute every rollup from the raw tables (after manual edits or imports
+# that bypassed the backend functions).
+@instrumented
+def rebuild_rollups():
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        _begin_write(conn)
+        _rebuild_rollups(cur)
+        conn.commit()
+    finally:
+        conn.close()
+
+def _rollup(cur, name):
+    cur.execute("SELECT count, amount FROM rollups WHERE name = ?;", (name,))
+    return cur.fetchone() or (0, Money(0))
+
+@instrumented
 def total_deposits():
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("SELECT SUM(amount) FROM transactions WHERE type='deposit';")
-    s = cur.fetchone()[0] or 0
+    s = _rollup(cur, "tx:deposit")[1]
     conn.close()
     return s
 
+@instrumented
 def total_withdraws():
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("SELECT SUM(amount) FROM transactions WHERE type='withdraw';")
-    s = cur.fetchone()[0] or 0
+    s = _rollup(cur, "tx:withdraw")[1]
     conn.close()
     return s
 
+# Everything the Reports tab shows, from the small rollup tables.
+@instrumented
+def get_report_summary(day=None):
+    day = day or datetime.datetime.utcnow().date().isoformat()
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT name, count, amount FROM rollups;")
+    rollups = {name: (count, amount) for name, count, amount in cur.fetchall()}
+    cur.execute("SELECT type, count, amount FROM daily_rollups WHERE day = ?;", (day,))
+    today = {t: (count, amount) for t, count, amount in cur.fetchall()}
+    conn.close()
+    loans = {name.split(":", 1)[1]: count for name, (count, _) in rollups.items()
+             if name.startswith("loans:") and count}
+    none = (0, Money(0))
+    return {
+        "accounts": rollups.get("accounts", none)[0],
+        "deposits": rollups.get("tx:deposit", none)[1],
+        "withdraws": rollups.get("tx:withdraw", none)[1],
+        "loans": loans,
+        "loans_total": sum(loans.values()),
+        "day": day,
+        "day_deposits": today.get("deposit", none)[1],
+        "day_withdraws": today.get("withdraw", none)[1],
+    }
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+_AGGREGATE_KEYS = {"type": "type", "account_no": "account_no", "day": "substr(timestamp, 1, 10)"}
+
+# Count and sum transaction amounts grouped by type, account_no or day,
+# streaming rows with fetchmany. With NumPy the amounts are loaded into int64
+# arrays and summed per group in one vectorised pass; without it, a dict
+# loop does the same. signed=True nets withdrawals negatively (what a balance
+# sees). Returns {key: (count, Money)}.
+@instrumented
+def aggregate_transactions(by="type", signed=False, where="", params=(), chunk=100000):
+    key_sql = _AGGREGATE_KEYS[by]
+    amount_sql = "CASE type WHEN 'withdraw' THEN -amount ELSE amount END" if signed else "amount"
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"SELECT {key_sql}, {amount_sql} FROM transactions {where};", params)
+    np = _numpy()
+    keys, parts = [], []
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            break
+        if np is not None:
+            keys.extend(r[0] for r in rows)
+            parts.append(np.fromiter((r[1] or 0 for r in rows), dtype=np.int64, count=len(rows)))
+        else:
+            keys.extend(rows)
+    conn.close()
+    if np is None:
+        totals = {}
+        for key, amount in keys:
+            c, a = totals.get(key, (0, 0))
+            totals[key] = (c + 1, a + (amount or 0))
+        return {k: (c, Money(a)) for k, (c, a) in totals.items()}
+    if not keys:
+        return {}
+    amounts = np.concatenate(parts)
+    uniq, inverse = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    sums = np.zeros(len(uniq), dtype=np.int64)
+    np.add.at(sums, inverse, amounts)
+    counts = np.bincount(inverse, minlength=len(uniq))
+    return {k: (int(c), Money(int(a))) for k, c, a in zip(uniq.tolist(), counts, sums)}
+
+# === Loan batch engine ===
+# A loan's schedule follows from its terms, so it isn't stored row by row:
+# the balance after k monthly payments has a closed form,
+#   annuity:  B_k = P * ((1+r)^n - (1+r)^k) / ((1+r)^n - 1)
+#   straight: B_k = P * (1 - k/n)            (also annuity at r = 0)
+# with r the monthly rate. Balances are rounded to centavos and a period's
+# principal is B_(k-1) - B_k, so principal always sums to exactly P. The
+# nightly batch evaluates this for a whole chunk of loans at once with NumPy
+# arrays (a Python loop does the same math without NumPy).
+
+def _scheduled_balances(np, principal, rate_bps, term, straight, k):
+    P = principal.astype(np.float64)
+    n = term.astype(np.float64)
+    r = rate_bps.astype(np.float64) / 120000.0
+    k = np.minimum(k, n)
+    level = straight | (r == 0)
+    gn = (1 + r) ** n
+    annuity = P * (gn - (1 + r) ** k) / np.where(level, 1.0, gn - 1)
+    linear = P * (1 - k / n)
+    return np.rint(np.where(level, linear, annuity)).astype(np.int64)
+
+def _scheduled_balance_py(principal, rate_bps, term, straight, k):
+    k = min(k, term)
+    r = rate_bps / 120000.0
+    if straight or r == 0:
+        return round(principal * (1 - k / term))
+    gn = (1 + r) ** term
+    return round(principal * (gn - (1 + r) ** k) / (gn - 1))
+
+# payments fall on the loan's day of month, capped at 28
+def _add_months(day, months):
+    y, m = divmod(day.month - 1 + months, 12)
+    return datetime.date(day.year + y, m + 1, min(day.day, 28))
+
+# full schedule: [(period, due_date, payment, principal, interest, balance)]
+def loan_schedule(amount, rate_bps, term_months, schedule="annuity", start=None):
+    start = datetime.date.fromisoformat(str(start or datetime.datetime.utcnow().date())[:10])
+    straight = schedule == "straight"
+    rows, prev = [], int(amount)
+    for k in range(1, term_months + 1):
+        bal = _scheduled_balance_py(int(amount), rate_bps, term_months, straight, k)
+        interest = round(prev * (rate_bps / 120000.0))
+        rows.append((k, _add_months(start, k).isoformat(), Money(prev - bal + interest),
+                     Money(prev - bal), Money(interest), Money(bal)))
+        prev = bal
+    return rows
+
+@instrumented
+def get_loan_schedule(loan_id):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT amount, rate_bps, term_months, schedule, created_at FROM loans WHERE id = ?;", (loan_id,))
+    r = cur.fetchone()
+    conn.close()
+    return loan_schedule(*r) if r else []
+
+# rows: (id, amount, rate_bps, term_months, schedule, created_at,
+# accrued_interest, accrued_through). For each loan: payments made by asof
+# (k), the scheduled principal balance, the next payment and its due date,
+# and simple daily interest on that balance for the days since the last run.
+# -> [(principal_balance, next_payment, next_due_date, accrued_interest,
+#      accrued_through, id)] for loans with at least one day to accrue
+def _loan_positions(rows, asof):
+    np = _numpy()
+    asof_s = asof.isoformat()
+    if np is None:
+        out = []
+        for loan_id, amount, rate_bps, term, schedule, created, accrued, through in rows:
+            days = (asof - datetime.date.fromisoformat((through or created)[:10])).days
+            if days <= 0:
+                continue
+            start = datetime.date.fromisoformat(created[:10])
+            straight = schedule == "straight"
+            k = (asof.year - start.year) * 12 + asof.month - start.month - (asof.day < min(start.day, 28))
+            k = min(max(k, 0), term)
+            bal = _scheduled_balance_py(amount, rate_bps, term, straight, k)
+            nxt = _scheduled_balance_py(amount, rate_bps, term, straight, k + 1)
+            payment = bal - nxt + round(bal * (rate_bps / 120000.0))
+            due = _add_months(start, k + 1).isoformat() if k < term else None
+            out.append((bal, payment, due, accrued + round(bal * (rate_bps * days / 3650000.0)), asof_s, loan_id))
+        return out
+    n = len(rows)
+    ids = np.fromiter((r[0] for r in rows), np.int64, n)
+    principal = np.fromiter((r[1] for r in rows), np.int64, n)
+    rate_bps = np.fromiter((r[2] for r in rows), np.int64, n)
+    term = np.fromiter((r[3] for r in rows), np.int64, n)
+    straight = np.fromiter((r[4] == "straight" for r in rows), bool, n)
+    accrued = np.fromiter((r[6] for r in rows), np.int64, n)
+    created = np.array([r[5][:10] for r in rows], dtype="datetime64[D]")
+    since = np.array([(r[7] or r[5])[:10] for r in rows], dtype="datetime64[D]")
+    days = (np.datetime64(asof_s, "D") - since).astype(np.int64)
+    start_m = created.astype("datetime64[M]")
+    start_day = np.minimum((created - start_m.astype("datetime64[D]")).astype(np.int64) + 1, 28)
+    k = (np.datetime64(asof_s[:7], "M") - start_m).astype(np.int64) - (asof.day < start_day)
+    k = np.clip(k, 0, term)
+    bal = _scheduled_balances(np, principal, rate_bps, term, straight, k)
+    nxt = _scheduled_balances(np, principal, rate_bps, term, straight, k + 1)
+    payment = bal - nxt + np.rint(bal * (rate_bps / 120000.0)).astype(np.int64)
+    total = accrued + np.rint(bal * (rate_bps * days / 3650000.0)).astype(np.int64)
+    sel = days > 0
+    due_m = np.datetime_as_string((start_m + k + 1)[sel], unit="M").tolist()
+    due = [f"{m}-{d:02d}" if kk < t else None
+           for m, d, kk, t in zip(due_m, start_day[sel].tolist(), k[sel].tolist(), term[sel].tolist())]
+    return list(zip(bal[sel].tolist(), payment[sel].tolist(), due, total[sel].tolist(),
+                    [asof_s] * len(due), ids[sel].tolist()))
+
+# Nightly loan run over approved loans, up to asof (a date, default today
+# UTC). Each chunk commits on its own and a loan already run for asof is
+# skipped, so an interrupted run can simply be started again.
+@instrumented
+def run_loan_batch(asof=None):
+    asof = asof or datetime.datetime.utcnow().date()
+    stats = {"asof": asof.isoformat(), "loans": 0, "updated": 0, "compute_s": 0.0, "write_s": 0.0}
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        last = 0
+        while True:
+            cur.execute("""SELECT id, amount, rate_bps, term_months, schedule, created_at, accrued_interest, accrued_through
+                           FROM loans WHERE status = 'approved' AND id > ? ORDER BY id LIMIT ?;""",
+                        (last, LOAN_BATCH_SIZE))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            t0 = time.perf_counter()
+            updates = _loan_positions(rows, asof)
+            t1 = time.perf_counter()
+            if updates:
+                _begin_write(conn)
+                cur.executemany("""UPDATE loans SET principal_balance = ?, next_payment = ?, next_due_date = ?,
+                                   accrued_interest = ?, accrued_through = ? WHERE id = ?;""", updates)
+                note_reload(cur, "loans")
+                conn.commit()
+            stats["compute_s"] += t1 - t0
+            stats["write_s"] += time.perf_counter() - t1
+            stats["loans"] += len(rows)
+            stats["updated"] += len(updates)
+    except Exception as e:
+        print("run_loan_batch error:", e)
+        conn.rollback()
+        stats["error"] = str(e)
+    finally:
+        conn.close()
+    return stats
+
 # Audit logs
-def log_action(admin, action):
+# Pass conn= from inside a business transaction so the audit row is committed
+# together with the change; without it the row gets its own commit.
+@instrumented
+def log_action(admin, action, conn=None):
+    ts = datetime.datetime.utcnow().isoformat()
+    if AUDIT_MODE == "async":
+        pending = getattr(conn, "audit", None)
+        if pending is not None:
+            pending.append((admin, action, ts))  # queued by conn.commit()
+        else:
+            _get_audit_writer().put((admin, action, ts))
+        return
+    if conn is not None:
+        conn.execute("INSERT INTO audit_logs (admin, action, timestamp) VALUES (?, ?, ?)",
+                     (admin, action, ts))
+        return
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("INSERT INTO audit_logs (admin, action, timestamp) VALUES (?, ?, ?)",
-                (admin, action, datetime.datetime.utcnow().isoformat()))
+                (admin, action, ts))
     conn.commit()
     conn.close()
 
+# Bulk variant of log_action for (admin, action, timestamp) rows.
+def _log_many(conn, rows):
+    if AUDIT_MODE == "async":
+        conn.audit.extend(rows)  # queued by conn.commit()
+        return
+    conn.executemany("INSERT INTO audit_logs (admin, action, timestamp) VALUES (?, ?, ?)", rows)
+
+_AUDIT_STOP = object()
+
+# Background audit writer used when AUDIT_MODE = "async". Rows go into a
+# bounded queue (put() blocks when it is full) and a single thread writes
+# whatever has piled up with one executemany + commit.
+class AuditWriter:
+    def __init__(self, maxsize=None, batch_size=None, linger=None):
+        self.queue = queue.Queue(maxsize or AUDIT_QUEUE_SIZE)
+        self.batch_size = batch_size or AUDIT_BATCH_SIZE
+        self.linger = AUDIT_LINGER if linger is None else linger
+        self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, row):
+        self.queue.put(row)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size and batch[-1] is not _AUDIT_STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows):
+        for attempt in range(3):
+            conn = get_conn()
+            try:
+                conn.executemany("INSERT INTO audit_logs (admin, action, timestamp) VALUES (?, ?, ?)", rows)
+                conn.commit()
+                return
+            except Exception as e:
+                print("audit writer error:", e)
+                time.sleep(0.1 * (attempt + 1))
+            finally:
+                conn.close()
+        print(f"audit writer: dropped {len(rows)} rows")
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _AUDIT_STOP
+            rows = batch[:-1] if stop else batch
+            if rows:
+                self._write(rows)
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    # block until everything queued so far is committed
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(_AUDIT_STOP)
+        self.thread.join()
+
+_audit_writer = None
+
+def _get_audit_writer():
+    global _audit_writer
+    if _audit_writer is None:
+        with _pool_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter()
+    return _audit_writer
+
+@instrumented
+def flush_audit():
+    if _audit_writer is not None:
+        _audit_writer.flush()
+
+# Drain and stop the async writer (runs at exit, before close_pool).
+def shutdown_audit():
+    global _audit_writer
+    writer, _audit_writer = _audit_writer, None
+    if writer is not None:
+        writer.close()
+
+atexit.register(shutdown_audit)
+
+@instrumented
 def get_audit_logs(limit=100):
     conn = get_conn()
     cur = conn.cursor()
@@ -282,12 +2197,582 @@ def get_audit_logs(limit=100):
     conn.close()
     return rows
 
-# Helper: generate a simple account number
+# Smallest id in table (transactions, audit_logs) whose timestamp is >= ts,
+# or MAX(id) + 1 if there is none. Audit rows get their timestamp when they
+# are written, so ids grow with time and a binary search on the primary key
+# replaces an index on timestamp. Writers can race by a few milliseconds, so
+# callers that need an exact cut search from a little earlier and still
+# compare timestamps. Imported transactions keep their own, possibly
+# back-dated, timestamps under new ids, so transactions are looked up
+# through idx_transactions_timestamp instead; that reads the index entries
+# from ts on, which is cheap for the recent cuts callers ask for.
+_TIMESTAMP_INDEXED = {"transactions"}
+
+def first_id_at(cur, table, ts):
+    if table in _TIMESTAMP_INDEXED:
+        # +id: a bare MIN(id) walks the primary key from the oldest row
+        cur.execute(f"SELECT MIN(+id) FROM {table} WHERE timestamp >= ?;", (ts,))
+        first = cur.fetchone()[0]
+        if first is not None:
+            return first
+        cur.execute(f"SELECT MAX(id) FROM {table};")
+        return (cur.fetchone()[0] or 0) + 1
+    # one subquery each: MIN(id), MAX(id) together defeats the min/max
+    # optimization and scans the whole table
+    cur.execute(f"SELECT (SELECT MIN(id) FROM {table}), (SELECT MAX(id) FROM {table});")
+    lo, hi = cur.fetchone()
+    if lo is None:
+        return 1
+    hi += 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        cur.execute(f"SELECT timestamp FROM {table} WHERE id >= ? ORDER BY id LIMIT 1;", (mid,))
+        row = cur.fetchone()
+        if row is None or row[0] >= ts:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+# === Keyset pagination ===
+# Pages are addressed by the id of the row next to them instead of OFFSET,
+# so any page costs one index seek no matter how deep it is. Each table has a
+# natural order (accounts oldest first, everything else newest first):
+#   after_id=None             -> first page
+#   after_id=X                -> the page following row X
+#   after_id=X, backward=True -> the page preceding row X (still in natural order)
+#   after_id=None, backward=True -> last page
+_PAGED_TABLES = {
+    "accounts": ("SELECT id, account_no, name, email, phone, balance, created_at FROM accounts", False, ()),
+    "transactions": ("SELECT id, account_no, type, amount, timestamp, note FROM transactions", True, ("account_no",)),
+    "loans": ("SELECT id, account_no, amount, status, created_at, updated_at, rate_bps, term_months, next_payment, "
+              "next_due_date, accrued_interest FROM loans", True, ("status",)),
+    "audit_logs": ("SELECT id, admin, action, timestamp FROM audit_logs", True, ("admin",)),
+}
+
+def get_page(table, after_id=None, limit=PAGE_SIZE, backward=False, **filters):
+    select, newest_first, filterable = _PAGED_TABLES[table]
+    where, params = [], []
+    for col, value in filters.items():
+        if col not in filterable:
+            raise ValueError(f"cannot filter {table} by {col}")
+        if value is not None:
+            where.append(f"{col} = ?")
+            params.append(value)
+    # scanning towards smaller ids?
+    descending = newest_first != backward
+    if after_id is not None:
+        where.append("id < ?" if descending else "id > ?")
+        params.append(after_id)
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?;"
+    params.append(limit)
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+    if backward:
+        rows.reverse()
+    return rows
+
+@instrumented
+def get_accounts_page(after_id=None, limit=PAGE_SIZE, backward=False):
+    return get_page("accounts", after_id, limit, backward)
+
+@instrumented
+def get_transactions_page(after_id=None, limit=PAGE_SIZE, backward=False, account_no=None):
+    return get_page("transactions", after_id, limit, backward, account_no=account_no)
+
+@instrumented
+def get_loans_page(after_id=None, limit=PAGE_SIZE, backward=False, status=None):
+    return get_page("loans", after_id, limit, backward, status=status)
+
+@instrumented
+def get_audit_logs_page(after_id=None, limit=PAGE_SIZE, backward=False, admin=None):
+    return get_page("audit_logs", after_id, limit, backward, admin=admin)
+
+# === Change feed ===
+# A ChangeFeed tells a consumer (the dashboard) which rows of FEED_TABLES
+# appeared, changed or disappeared since its last poll, in the same shape as
+# the get_*_page() rows:
+#   new rows       id above the table's high-water mark
+#   edits/deletes  change_log entries above the log's high-water mark
+#   balances       accounts named by new transactions rows
+# On SQLite a poll first reads PRAGMA data_version on the feed's own
+# connection, so a poll when nothing was committed, by this process or any
+# other, costs one PRAGMA and no queries.
+FEED_TABLES = ("accounts", "transactions", "loans", "audit_logs")
+
+# After a bulk change (e.g. the loan batch), tell feeds to reload table.
+# Call inside the writing transaction.
+def note_reload(cur, table):
+    if not USE_MYSQL:
+        cur.execute("INSERT INTO change_log (tbl, row_id, op) VALUES (?, NULL, 'reload');", (table,))
+
+class ChangeFeed:
+    def __init__(self, tables=FEED_TABLES, limit=CHANGE_FEED_LIMIT):
+        self.tables = tables
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.conn = None
+        self.version = None
+        self.marks = None   # table -> highest id seen, "change_log" -> last entry read
+
+    def _cursor(self):
+        if self.conn is None:
+            # not pooled: data_version only moves for commits made by other
+            # connections, and the pool's connections are the ones writing
+            self.conn = get_conn() if USE_MYSQL else _open_sqlite()
+        return self.conn.cursor()
+
+    def _top(self, cur, table):
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table};")
+        return cur.fetchone()[0]
+
+    def _rows(self, cur, table, col, values):
+        rows = []
+        values = list(values)
+        for i in range(0, len(values), 500):
+            chunk = values[i:i + 500]
+            cur.execute(f"{_PAGED_TABLES[table][0]} WHERE {col} IN ({', '.join('?' * len(chunk))});", chunk)
+            rows += cur.fetchall()
+        return rows
+
+    # Returns {table: {"new": rows, "changed": rows, "deleted": ids,
+    # "reset": bool}} for tables with something to report; "reset" means
+    # more changed than the feed returns and the consumer should reload.
+    # The first poll only records where the tables are and returns {}.
+    def poll(self):
+        with self.lock:
+            cur = self._cursor()
+            try:
+                if not USE_MYSQL:
+                    cur.execute("PRAGMA data_version;")
+                    version = cur.fetchone()[0]
+                    if version == self.version:
+                        return {}
+                    self.version = version
+                if self.marks is None:
+                    self.marks = {t: self._top(cur, t) for t in self.tables + ("change_log",)}
+                    return {}
+                return self._collect(cur)
+            finally:
+                if USE_MYSQL:
+                    self.conn.commit()  # end the snapshot so the next poll sees new commits
+
+    def _collect(self, cur):
+        changes = {}
+        def entry(table):
+            return changes.setdefault(table, {"new": [], "changed": [], "deleted": [], "reset": False})
+        for table in self.tables:
+            cur.execute(f"{_PAGED_TABLES[table][0]} WHERE id > ? ORDER BY id LIMIT ?;",
+                        (self.marks[table], self.limit + 1))
+            rows = cur.fetchall()
+            if len(rows) > self.limit:
+                entry(table)["reset"] = True
+                self.marks[table] = self._top(cur, table)
+            elif rows:
+                entry(table)["new"] = rows
+                self.marks[table] = rows[-1][0]
+
+        changed, deleted = {}, {}
+        cur.execute("SELECT id, tbl, row_id, op FROM change_log WHERE id > ? ORDER BY id LIMIT ?;",
+                    (self.marks["change_log"], self.limit + 1))
+        log = cur.fetchall()
+        if log and (len(log) > self.limit or log[0][0] > self.marks["change_log"] + 1):
+            # too far behind (or the log was trimmed past us): reload everything logged
+            for table in ("accounts", "loans"):
+                if table in self.tables:
+                    entry(table)["reset"] = True
+            self.marks["change_log"] = self._top(cur, "change_log")
+            log = []
+        for log_id, table, row_id, op in log:
+            self.marks["change_log"] = log_id
+            if table not in self.tables:
+                continue
+            if op == "reload":
+                entry(table)["reset"] = True
+            elif op == "delete":
+                deleted.setdefault(table, set()).add(row_id)
+                changed.get(table, set()).discard(row_id)
+            else:
+                changed.setdefault(table, set()).add(row_id)
+
+        for table, ids in changed.items():
+            if ids and not entry(table)["reset"]:
+                entry(table)["changed"] = self._rows(cur, table, "id", sorted(ids))
+        for table, ids in deleted.items():
+            if not entry(table)["reset"]:
+                entry(table)["deleted"] = sorted(ids)
+        if "accounts" in self.tables and "transactions" in changes:
+            if changes["transactions"]["reset"]:
+                entry("accounts")["reset"] = True
+            elif not entry("accounts")["reset"]:
+                touched = {r[1] for r in changes["transactions"]["new"]}
+                entry("accounts")["changed"] += self._rows(cur, "accounts", "account_no", sorted(touched))
+        return {t: c for t, c in changes.items() if c["reset"] or c["new"] or c["changed"] or c["deleted"]}
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+# === Import / export ===
+# Files are CSV (header row) or JSON lines, optionally gzipped, picked by
+# extension: .csv, .jsonl/.ndjson, plus .gz. Imports read the file as a
+# stream and write IMPORT_CHUNK_SIZE rows per transaction; exports stream
+# one query through fetchmany. Memory stays the same for ten rows or
+# ten million.
+#   accounts:     account_no (blank = allocate one), name, email, phone,
+#                 balance (opening balance), created_at (optional)
+#   transactions: account_no, type, amount, timestamp (optional), note
+EXPORT_COLUMNS = {
+    "accounts": ("id", "account_no", "name", "email", "phone", "balance", "created_at"),
+    "transactions": ("id", "account_no", "type", "amount", "timestamp", "note"),
+}
+
+def _file_format(path, fmt=None):
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+def _open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+# -> (line number, dict) per row; a line that doesn't parse yields (line, None)
+def _read_rows(path, fmt=None):
+    fmt = _file_format(path, fmt)
+    with _open_text(path, "r") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {k.strip().lower(): (v.strip() if isinstance(v, str) else v)
+                                        for k, v in row.items() if k}
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_no, row if isinstance(row, dict) else None
+
+def _reject(summary, line, message):
+    summary["rejected"] += 1
+    if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+        summary["errors"].append((line, message))
+
+# The accounts_fts insert trigger indexes rows one at a time, about 3x slower
+# than indexing a whole chunk with one INSERT ... SELECT. Bulk inserts drop
+# it and put it back inside their own transaction, so no other connection
+# ever sees accounts without it. -> the trigger's SQL, or None
+def _drop_fts_insert_trigger(cur):
+    cur.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'accounts_fts_ai';")
+    row = cur.fetchone()
+    if row is None:
+        return None
+    cur.execute("DROP TRIGGER accounts_fts_ai;")
+    return row[0]
+
+def _index_new_accounts(cur, trigger_sql, after_id):
+    cur.execute("""INSERT INTO accounts_fts (rowid, account_no, name, email, phone)
+                   SELECT id, account_no, name, email, phone FROM accounts WHERE id > ?;""", (after_id,))
+    cur.execute(trigger_sql)
+
+# Insert one chunk of [(line, row)] in one transaction; rejected rows are
+# counted in summary.
+def _import_accounts_chunk(conn, chunk, summary, attempt=0):
+    cur = conn.cursor()
+    now = datetime.datetime.utcnow().isoformat()
+    # numbers come from their own transaction, before ours takes the lock
+    missing = sum(1 for _, row in chunk if row is not None and not row.get("account_no"))
+    fresh = iter(allocate_account_nos(missing) if missing else ())
+    try:
+        _begin_write(conn)
+        given = {row["account_no"] for _, row in chunk if row is not None and row.get("account_no")}
+        taken = set(_fetch_balances(cur, given))
+        inserts, audit_rows, rejected = [], [], []
+        for line, row in chunk:
+            if row is None:
+                rejected.append((line, "Malformed row"))
+                continue
+            account_no = str(row.get("account_no") or next(fresh))
+            if account_no in taken:
+                rejected.append((line, "Duplicate account_no"))
+                continue
+            try:
+                balance = to_money(row.get("balance") or row.get("opening_balance") or 0)
+            except Exception:
+                balance = None
+            if balance is None or balance < 0:
+                rejected.append((line, "Invalid balance"))
+                continue
+            taken.add(account_no)
+            inserts.append((account_no, row.get("name") or "", row.get("email") or "", row.get("phone") or "",
+                            balance, balance, row.get("created_at") or now))
+            audit_rows.append(("system", f"Create account {account_no}", now))
+        trigger_sql = None if USE_MYSQL else _drop_fts_insert_trigger(cur)
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM accounts;")
+        last_id = cur.fetchone()[0]
+        cur.executemany("""INSERT INTO accounts (account_no, name, email, phone, balance, opening_balance, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?);""", inserts)
+        if trigger_sql:
+            _index_new_accounts(cur, trigger_sql, last_id)
+        _bump_rollup(cur, "accounts", len(inserts))
+        _log_many(conn, audit_rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        if _is_busy(e) and attempt < BUSY_RETRIES:
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+            return _import_accounts_chunk(conn, chunk, summary, attempt + 1)
+        print("import_accounts error:", e)
+        for line, _ in chunk:
+            _reject(summary, line, str(e))
+        return
+    summary["imported"] += len(inserts)
+    for line, message in rejected:
+        _reject(summary, line, message)
+
+def _transactions_chunk(apply):
+    def post(conn, chunk, summary):
+        results = _post_bulk_chunk(conn, [row if row is not None else () for _, row in chunk],
+                                   imported=True, apply=apply)
+        for (line, _), (ok, message) in zip(chunk, results):
+            if ok:
+                summary["imported"] += 1
+            else:
+                _reject(summary, line, message)
+    return post
+
+def _run_import(path, fmt, chunk_size, progress, post):
+    summary = {"rows": 0, "imported": 0, "rejected": 0, "errors": []}
+    conn = get_conn()
+    try:
+        chunk = []
+        for line, row in _read_rows(path, fmt):
+            chunk.append((line, row))
+            summary["rows"] += 1
+            if len(chunk) >= chunk_size:
+                post(conn, chunk, summary)
+                chunk = []
+                if progress:
+                    progress(summary["rows"])
+        if chunk:
+            post(conn, chunk, summary)
+            if progress:
+                progress(summary["rows"])
+    finally:
+        conn.close()
+    return summary
+
+# Create accounts from a file. Returns {"rows", "imported", "rejected",
+# "errors": [(line, message)] (the first IMPORT_MAX_ERRORS)};
+# progress(rows_read) is called after every chunk.
+@instrumented
+def import_accounts(path, fmt=None, chunk_size=None, progress=None, admin="system"):
+    summary = _run_import(path, fmt, chunk_size or IMPORT_CHUNK_SIZE, progress, _import_accounts_chunk)
+    log_action(admin, f"Imported {summary['imported']} accounts from {os.path.basename(path)}")
+    return summary
+
+# Post transactions from a file through the ledger: balances move, overdrafts
+# are rejected and every row is audited. With apply=False the rows are
+# history instead, recorded as they are with balances left alone (for when
+# the imported balances already include them).
+@instrumented
+def import_transactions(path, fmt=None, chunk_size=None, progress=None, apply=True, admin="system"):
+    summary = _run_import(path, fmt, chunk_size or IMPORT_CHUNK_SIZE, progress, _transactions_chunk(apply))
+    log_action(admin, f"Imported {summary['imported']} transactions from {os.path.basename(path)}"
+                      + ("" if apply else " (history)"))
+    return summary
+
+# Yield every row of table (accounts or transactions) in id order, chunk
+# rows at a time from a single query, so the export is one consistent
+# snapshot.
+def iter_table(table, chunk=None):
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {', '.join(EXPORT_COLUMNS[table])} FROM {table} ORDER BY id;")
+        while True:
+            rows = cur.fetchmany(chunk or EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+# Write table to path (format from the extension unless fmt is given).
+# The file appears only once complete. Returns the number of rows.
+@instrumented
+def export_table(table, path, fmt=None, progress=None):
+    fmt = _file_format(path, fmt)
+    columns = EXPORT_COLUMNS[table]
+    n = 0
+    tmp = path + ".part" + (".gz" if path.endswith(".gz") else "")
+    try:
+        with _open_text(tmp, "w") as f:
+            writer = csv.writer(f) if fmt == "csv" else None
+            if writer:
+                writer.writerow(columns)
+            for row in iter_table(table):
+                row = [str(v) if isinstance(v, Money) else v for v in row]
+                if writer:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(dict(zip(columns, row))) + "\n")
+                n += 1
+                if progress and n % EXPORT_CHUNK_SIZE == 0:
+                    progress(n)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    if progress:
+        progress(n)
+    return n
+
+# === Account numbers ===
+# Account numbers are "AC" + a sequence number + a Luhn check digit, e.g.
+# AC1000003. The old random numbers were "AC" + 6 digits, so numbers from
+# the two schemes can never collide.
+def _luhn_digit(digits):
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return (10 - total % 10) % 10
+
+def format_account_no(seq):
+    digits = str(seq)
+    return f"AC{digits}{_luhn_digit(digits)}"
+
+# True for numbers from the sequence allocator whose check digit matches.
+def valid_account_no(account_no):
+    digits = account_no[2:]
+    return (account_no.startswith("AC") and len(digits) > 1 and digits.isdigit()
+            and _luhn_digit(digits[:-1]) == int(digits[-1]))
+
+class AccountNumberAllocator:
+    # Hands out numbers from blocks reserved in the sequences table. Reserving
+    # a block is one atomic UPDATE, so threads and separate processes never
+    # share a number. Numbers left in a block when the process exits are
+    # skipped, not reused.
+    def __init__(self, block_size=ACCOUNT_NO_BLOCK):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next = self.end = 0
+        self.db_key = None
+
+    @_retry_busy
+    def _reserve(self, n):
+        conn = get_conn()
+        try:
+            _begin_write(conn)
+            cur = conn.cursor()
+            cur.execute("UPDATE sequences SET value = value + ? WHERE name = 'account_no';", (n,))
+            cur.execute("SELECT value FROM sequences WHERE name = 'account_no';")
+            end = cur.fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+        return end - n, end
+
+    def allocate(self, n=1):
+        with self.lock:
+            # a block belongs to the database it was reserved in
+            db_key = (SQLITE_DB, _pool_generation)
+            if db_key != self.db_key:
+                self.next = self.end = 0
+                self.db_key = db_key
+            seqs = []
+            while len(seqs) < n:
+                if self.next >= self.end:
+                    self.next, self.end = self._reserve(max(self.block_size, n - len(seqs)))
+                take = min(n - len(seqs), self.end - self.next)
+                seqs.extend(range(self.next, self.next + take))
+                self.next += take
+        return [format_account_no(seq) for seq in seqs]
+
+_account_numbers = AccountNumberAllocator()
+
+@instrumented
+def allocate_account_nos(n):
+    return _account_numbers.allocate(n)
+
+@instrumented
 def generate_account_no():
-    import random
-    return "AC" + str(random.randint(100000, 999999))
+    return _account_numbers.allocate(1)[0]
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Bank backend tools")
+    parser.add_argument("--db", help="SQLite database file (default: bank.db)")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("init", help="create/migrate the database (default)")
+    sub.add_parser("rebuild-rollups", help="recompute report rollups from the raw tables")
+    p = sub.add_parser("loan-batch", help="update loan positions and accrue interest")
+    p.add_argument("--asof", help="accrue up to this date (YYYY-MM-DD, default today)")
+    p = sub.add_parser("import-accounts", help="create accounts from a CSV/JSONL file")
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+    p = sub.add_parser("import-transactions", help="post transactions from a CSV/JSONL file")
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+    p.add_argument("--history", action="store_true",
+                   help="record as history without changing balances (balances already include them)")
+    p = sub.add_parser("export", help="write accounts or transactions to a CSV/JSONL file")
+    p.add_argument("table", choices=sorted(EXPORT_COLUMNS))
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+    args = parser.parse_args()
+    if args.db:
+        SQLITE_DB = args.db
+    if args.command == "loan-batch":
+        init_db()
+        asof = datetime.date.fromisoformat(args.asof) if args.asof else None
+        stats = run_loan_batch(asof)
+        print(", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in stats.items()))
+        sys.exit(1 if "error" in stats else 0)
+    if args.command in ("import-accounts", "import-transactions", "export"):
+        init_db()
+        start = time.perf_counter()
+        show = lambda n: print(f"\r{n:,} rows", end="", file=sys.stderr, flush=True)
+        if args.command == "export":
+            n = export_table(args.table, args.path, args.format, progress=show)
+            print(f"\n{n:,} {args.table} written to {args.path} in {time.perf_counter() - start:.1f}s")
+            sys.exit(0)
+        if args.command == "import-accounts":
+            summary = import_accounts(args.path, args.format, progress=show)
+        else:
+            summary = import_transactions(args.path, args.format, progress=show, apply=not args.history)
+        print(f"\n{summary['imported']:,} of {summary['rows']:,} rows imported, {summary['rejected']:,} rejected "
+              f"in {time.perf_counter() - start:.1f}s")
+        for line, message in summary["errors"]:
+            print(f"  line {line}: {message}")
+        shutdown_audit()
+        sys.exit(1 if summary["rejected"] else 0)
+    if args.command == "rebuild-rollups":
+        init_db()
+        rebuild_rollups()
+        print("Rollups rebuilt")
+        sys.exit(0)
     # Create DB and default admin/account for quick testing
     init_db()
     print("Database initialized (default admin: Admin / Admin123)")
\ No newline at end of file
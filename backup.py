@@ -0,0 +1,256 @@
+# Online backups of the SQLite database while the app keeps running.
+#
+#   python backup.py run                      # one backup now
+#   python backup.py run --pages 512 --sleep 0.005
+#   python backup.py schedule --every 60      # back up every 60 minutes until Ctrl+C
+#   python backup.py list
+#   python backup.py verify backups/bank-20261017-040200.db
+#
+# Uses the sqlite3 online backup API: BACKUP_PAGES pages are copied per step
+# and the copier sleeps BACKUP_SLEEP seconds between steps, so nothing ever
+# holds the write lock and tellers keep posting.
+#
+# Consistency: on its own the backup API starts over from page 1 whenever
+# another connection writes to the source, so on a busy day it never
+# finishes. Instead the source connection opens a read transaction first; in
+# WAL mode that pins one snapshot, the copy is exactly the database as of that
+# moment, and writers carry on appending to the WAL. The WAL can't be
+# checkpointed past the snapshot until the backup ends, so it grows for the
+# whole copy (at ~5k posts/s that is a few hundred MB a second, and commits get
+# slower as it grows). That is why the defaults copy in fairly large steps with
+# short pauses: a quick copy costs tellers less than a gentle, slow one.
+#
+# Every copy is written to <name>.db.part, switched to a rollback journal so
+# it is a single self-contained file, checked with PRAGMA integrity_check and
+# then renamed. A copy that fails the check is kept as <name>.db.bad. After a
+# good backup only the newest BACKUP_KEEP copies are kept.
+#
+# The write-latency impact is measured by `python bench.py backup`.
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import backend
+
+BACKUP_DIR = None                   # None = "backups" next to the database
+BACKUP_PAGES = 1024                 # pages per step (4 MB with 4 KB pages)
+BACKUP_SLEEP = 0.005                # seconds between steps
+BACKUP_KEEP = 7
+BACKUP_CHECK = "integrity_check"    # "quick_check" skips index cross-checks on very large files
+BACKUP_INTERVAL_MIN = 60
+
+
+def backup_dir():
+    if BACKUP_DIR:
+        return BACKUP_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(backend.SQLITE_DB)), "backups")
+
+
+def _stem():
+    return os.path.splitext(os.path.basename(backend.SQLITE_DB))[0]
+
+
+# Finished backups of the current database, newest first.
+def list_backups(root=None):
+    root = root or backup_dir()
+    if not os.path.isdir(root):
+        return []
+    prefix = _stem() + "-"
+    names = [n for n in os.listdir(root) if n.startswith(prefix) and n.endswith(".db")]
+    return [os.path.join(root, n) for n in sorted(names, reverse=True)]
+
+
+# -> (ok, message)
+def verify_backup(path, check=None):
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute(f"PRAGMA {check or BACKUP_CHECK};").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return False, str(e)
+    if rows == [("ok",)]:
+        return True, "ok"
+    return False, "; ".join(str(r[0]) for r in rows[:5])
+
+
+# Delete all but the newest keep backups. Returns the removed paths.
+def rotate_backups(keep=None, root=None):
+    keep = BACKUP_KEEP if keep is None else keep
+    removed = list_backups(root)[max(keep, 1):]
+    for path in removed:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print("rotate_backups error:", e)
+    return removed
+
+
+# Copy the live database to dest (default: backup_dir()/<db>-YYYYmmdd-HHMMSS.db).
+# progress(copied_pages, total_pages) is called after every step.
+# Returns a summary dict; summary["ok"] is False if the copy failed or
+# didn't pass the check.
+def backup_database(dest=None, pages=None, sleep=None, check=None, keep=None, progress=None):
+    summary = {"path": None, "ok": False, "message": "", "pages": 0, "steps": 0,
+               "bytes": 0, "wal_bytes": 0, "seconds": 0.0, "check_seconds": 0.0, "removed": []}
+    if backend.USE_MYSQL:
+        summary["message"] = "online backup is only available for SQLite"
+        return summary
+    if dest is None:
+        os.makedirs(backup_dir(), exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        dest = os.path.join(backup_dir(), f"{_stem()}-{stamp}.db")
+    part = dest + ".part"
+    if os.path.exists(part):
+        os.remove(part)
+
+    # sqlite3's own sleep= only applies after a BUSY/LOCKED step, so the
+    # pause between steps happens here
+    pause = BACKUP_SLEEP if sleep is None else sleep
+    def step(status, remaining, total):
+        summary["steps"] += 1
+        summary["pages"] = total
+        if progress:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    t0 = time.perf_counter()
+    src = backend._open_sqlite()
+    dst = sqlite3.connect(part)
+    try:
+        src.execute("BEGIN;")
+        src.execute("SELECT COUNT(*) FROM sqlite_master;").fetchone()  # pins the snapshot
+        src.backup(dst, pages=pages or BACKUP_PAGES, progress=step, sleep=pause)
+        wal = backend.SQLITE_DB + "-wal"
+        summary["wal_bytes"] = os.path.getsize(wal) if os.path.exists(wal) else 0
+        src.rollback()
+        # catch up on the WAL that built up behind the snapshot here rather
+        # than in some teller's commit (PASSIVE never waits on writers)
+        src.execute("PRAGMA wal_checkpoint(PASSIVE);").fetchall()
+        dst.execute("PRAGMA journal_mode = DELETE;").fetchall()
+    except sqlite3.Error as e:
+        summary["message"] = str(e)
+    finally:
+        dst.close()
+        src.close()
+        summary["seconds"] = time.perf_counter() - t0
+    if summary["message"]:  # the copy failed; drop the half-written file
+        os.remove(part)
+        return summary
+
+    t1 = time.perf_counter()
+    ok, message = verify_backup(part, check)
+    summary["check_seconds"] = time.perf_counter() - t1
+    summary["bytes"] = os.path.getsize(part)
+    if not ok:
+        os.replace(part, dest + ".bad")
+        summary["path"] = dest + ".bad"
+        summary["message"] = message
+        return summary
+    os.replace(part, dest)
+    summary.update(path=dest, ok=True, message=message)
+    if os.path.dirname(os.path.abspath(dest)) == os.path.abspath(backup_dir()):
+        summary["removed"] = rotate_backups(keep)
+    return summary
+
+
+# Runs backup_database() every every_min minutes on a daemon thread. The
+# first backup is due interval after the newest existing one, so restarting
+# the app doesn't trigger an extra copy.
+class BackupScheduler:
+    def __init__(self, every_min=None, on_result=None, **options):
+        self.interval = (every_min or BACKUP_INTERVAL_MIN) * 60
+        self.on_result = on_result
+        self.options = options
+        self.last = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _due(self):
+        backups = list_backups()
+        if not backups:
+            return 0
+        return max(0.0, self.interval - (time.time() - os.path.getmtime(backups[0])))
+
+    def _run(self):
+        while not self.stop_event.wait(self._due()):
+            self.last = backup_database(**self.options)
+            if not self.last["ok"]:
+                print("scheduled backup failed:", self.last["message"])
+            if self.on_result:
+                self.on_result(self.last)
+
+    # waits for a backup that is already running
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+
+def _print_progress(done, total):
+    print(f"\r{done:,}/{total:,} pages", end="", flush=True)
+
+
+def _print_summary(summary):
+    print()
+    if summary["ok"]:
+        print(f"{summary['path']}: {summary['bytes']:,} bytes, {summary['pages']:,} pages in "
+              f"{summary['steps']} steps, {summary['seconds']:.1f}s copy + {summary['check_seconds']:.1f}s check, "
+              f"WAL grew to {summary['wal_bytes']:,} bytes meanwhile")
+    else:
+        print(f"backup FAILED ({summary['path'] or 'no file'}): {summary['message']}")
+    for path in summary["removed"]:
+        print("rotated out:", path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online database backup")
+    parser.add_argument("--db", help="SQLite database file (default: bank.db)")
+    parser.add_argument("--dir", help="backup directory (default: backups/ next to the database)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, text in (("run", "back up once"), ("schedule", "back up on an interval until interrupted")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("--pages", type=int, default=BACKUP_PAGES, help="pages copied per step")
+        p.add_argument("--sleep", type=float, default=BACKUP_SLEEP, help="seconds between steps")
+        p.add_argument("--keep", type=int, default=BACKUP_KEEP, help="backups to keep")
+        p.add_argument("--quick", action="store_true", help="PRAGMA quick_check instead of integrity_check")
+    sub.choices["schedule"].add_argument("--every", type=float, default=BACKUP_INTERVAL_MIN, help="minutes between backups")
+    sub.add_parser("list", help="existing backups, newest first")
+    p = sub.add_parser("verify", help="integrity-check a backup file")
+    p.add_argument("path")
+    args = parser.parse_args()
+    if args.db:
+        backend.SQLITE_DB = args.db
+    if args.dir:
+        BACKUP_DIR = args.dir
+    if args.command == "list":
+        for path in list_backups():
+            print(f"{path}\t{os.path.getsize(path):,} bytes")
+    elif args.command == "verify":
+        ok, message = verify_backup(args.path)
+        print(f"{args.path}: {message}")
+        sys.exit(0 if ok else 1)
+    else:
+        options = dict(pages=args.pages, sleep=args.sleep, keep=args.keep,
+                       check="quick_check" if args.quick else None)
+        if args.command == "run":
+            summary = backup_database(progress=_print_progress, **options)
+            _print_summary(summary)
+            sys.exit(0 if summary["ok"] else 1)
+        scheduler = BackupScheduler(args.every, on_result=_print_summary, **options).start()
+        print(f"backing up {backend.SQLITE_DB} every {args.every:g} min to {backup_dir()} (Ctrl+C to stop)")
+        try:
+            while scheduler.thread.is_alive():
+                scheduler.thread.join(1)
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,772 @@
+# bench.py
+# Throughput benchmark for backend.py. Every run works on a throwaway
+# database in a temp directory, so bank.db is never touched.
+#
+#   python bench.py pool       # compare connect-per-call vs pooled connections
+#   python bench.py audit      # inline vs async audit writes
+#   python bench.py bulk       # add_transactions_bulk throughput (target 100k rows/min)
+#   python bench.py ledger     # concurrent transfer stress test, checks for lost updates
+#   python bench.py engines    # SQLite vs in-memory storage engine (storage.py)
+#   python bench.py loans      # nightly loan schedule/accrual batch over 1M loans
+#   python bench.py velocity   # add_transaction with velocity limits vs a history query per call
+#   python bench.py pool --ops 5000
+#
+# Regression suite on production-sized synthetic data:
+#
+#   python bench.py generate big.db --accounts 1000000 --transactions 50000000
+#   python bench.py suite --db big.db --json run.json --baseline baseline.json
+#   python bench.py suite --save-baseline baseline.json   # small generated dataset
+#
+# Write latency while backup.py copies the database:
+#
+#   python bench.py backup --db big.db --pages 1024 --sleep 0.005
+import argparse
+import datetime
+import json
+import platform
+import sqlite3
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import backend
+
+
+def fresh_db(tmpdir, name):
+    backend.close_pool()
+    backend.SQLITE_DB = os.path.join(tmpdir, name)
+    backend.init_db()
+
+
+def seed_accounts(n):
+    nos = []
+    for i in range(n):
+        acc_no = f"BN{i:06d}"
+        backend.create_account(acc_no, f"Customer {i}", f"c{i}@example.com", "", 1000.0)
+        nos.append(acc_no)
+    return nos
+
+
+# Each scenario is (name, setup, op). setup runs once and returns state,
+# op(state, i) is timed.
+def _scenarios():
+    def tx_setup():
+        return seed_accounts(50)
+
+    def tx_op(nos, i):
+        backend.add_transaction(nos[i % len(nos)], "deposit", 10.0)
+
+    def read_setup():
+        nos = seed_accounts(200)
+        for i in range(200):
+            backend.add_transaction(nos[i], "deposit", 5.0)
+        return nos
+
+    return [
+        ("authenticate_admin", lambda: None,
+         lambda s, i: backend.authenticate_admin("Admin", "Admin123")),
+        ("add_transaction", tx_setup, tx_op),
+        ("get_accounts", read_setup, lambda s, i: backend.get_accounts()),
+        ("get_transactions", read_setup, lambda s, i: backend.get_transactions(100)),
+        ("total_deposits", read_setup, lambda s, i: backend.total_deposits()),
+        ("create_account", lambda: None,
+         lambda s, i: backend.create_account(f"NEW{i:07d}", "Bench", "", "", 0.0)),
+        ("log_action", lambda: None, lambda s, i: backend.log_action("bench", f"op {i}")),
+    ]
+
+
+def run_scenario(tmpdir, name, setup, op, ops, pooled=True, tag=""):
+    backend.POOL_ENABLED = pooled
+    fresh_db(tmpdir, f"{name}-{tag or ('pool' if pooled else 'nopool')}.db")
+    state = setup()
+    start = time.perf_counter()
+    for i in range(ops):
+        op(state, i)
+    elapsed = time.perf_counter() - start
+    backend.flush_audit()
+    backend.close_pool()
+    return ops / elapsed if elapsed else float("inf")
+
+
+def bench_pool(ops):
+    print(f"{'operation':<20}{'before ops/s':>14}{'after ops/s':>14}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, setup, op in _scenarios():
+            before = run_scenario(tmpdir, name, setup, op, ops, pooled=False)
+            after = run_scenario(tmpdir, name, setup, op, ops, pooled=True)
+            print(f"{name:<20}{before:>14.0f}{after:>14.0f}{after / before:>9.1f}x")
+    backend.POOL_ENABLED = True
+
+
+# "separate" reproduces the old pattern of a second commit for the audit row.
+def bench_audit(ops):
+    writes = [s for s in _scenarios() if s[0] in ("add_transaction", "create_account")]
+    modes = ("separate", "inline", "async")
+    print(f"{'operation':<20}" + "".join(f"{m + ' ops/s':>16}" for m in modes))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, setup, op in writes:
+            results = []
+            for mode in modes:
+                if mode == "separate":
+                    backend.AUDIT_MODE = "inline"
+                    timed = lambda s, i, op=op: (op(s, i), backend.log_action("system", f"op {i}"))
+                else:
+                    backend.AUDIT_MODE = mode
+                    timed = op
+                results.append(run_scenario(tmpdir, name, setup, timed, ops, tag=mode))
+                backend.shutdown_audit()
+            print(f"{name:<20}" + "".join(f"{r:>16.0f}" for r in results))
+    backend.AUDIT_MODE = "inline"
+
+
+BULK_TARGET_ROWS_PER_MIN = 100_000
+
+
+def bench_bulk(ops):
+    rows = max(ops, 100_000)
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fresh_db(tmpdir, "bulk.db")
+        nos = seed_accounts(1000)
+        batch = ((rng.choice(nos), rng.choice(("deposit", "deposit", "withdraw")),
+                  round(rng.uniform(1, 500), 2), "batch") for _ in range(rows))
+        start = time.perf_counter()
+        results = backend.add_transactions_bulk(batch)
+        elapsed = time.perf_counter() - start
+        backend.close_pool()
+    posted = sum(1 for ok, _ in results if ok)
+    per_min = rows / elapsed * 60
+    verdict = "PASS" if per_min >= BULK_TARGET_ROWS_PER_MIN else "FAIL"
+    print(f"add_transactions_bulk: {rows} rows ({posted} posted) in {elapsed:.2f}s")
+    print(f"  {per_min:,.0f} rows/min (target {BULK_TARGET_ROWS_PER_MIN:,}) {verdict}")
+
+
+LEDGER_ACCOUNTS = 100
+LEDGER_OPENING = 1000.0
+
+
+# Every account's balance must equal its opening balance plus the signed net
+# of its transactions, and transfers must conserve the total.
+def check_ledger(nos):
+    opening = backend.to_money(LEDGER_OPENING)
+    nets = backend.aggregate_transactions("account_no", signed=True)
+    balances = {r[1]: r[5] for r in backend.get_accounts()}
+    bad = [no for no in nos if balances[no] != opening + nets.get(no, (0, 0))[1]]
+    return bad, sum(balances.values())
+
+
+def bench_ledger(ops):
+    print(f"{'threads':>8}{'transfers/s':>14}{'rejected':>10}  consistency")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for threads in (1, 2, 4, 8):
+            fresh_db(tmpdir, f"ledger-{threads}.db")
+            nos = [f"LG{i:05d}" for i in range(LEDGER_ACCOUNTS)]
+            for no in nos:
+                backend.create_account(no, "Ledger", "", "", LEDGER_OPENING)
+            per_thread = max(1, ops // threads)
+            rejected = [0] * threads
+
+            def worker(k):
+                rng = random.Random(k)
+                for _ in range(per_thread):
+                    a, b = rng.sample(nos, 2)
+                    ok, _ = backend.transfer(a, b, round(rng.uniform(1, 400), 2))
+                    rejected[k] += not ok
+
+            pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+            start = time.perf_counter()
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            elapsed = time.perf_counter() - start
+            bad, total = check_ledger(nos)
+            expected = LEDGER_ACCOUNTS * backend.to_money(LEDGER_OPENING)
+            ok = not bad and total == expected
+            status = "OK" if ok else f"FAILED ({len(bad)} accounts off, total {total} vs {expected})"
+            print(f"{threads:>8}{per_thread * threads / elapsed:>14.0f}{sum(rejected):>10}  {status}")
+            backend.close_pool()
+
+
+# === Synthetic data ===
+GEN_CHUNK = 200_000
+GEN_WITHDRAW_SHARE = 0.35
+GEN_SPAN_DAYS = 365
+GEN_FIRST_NAMES = ("Juan", "Maria", "Jose", "Ana", "Pedro", "Rosa", "Carlos", "Luz", "Miguel", "Elena",
+                   "Ramon", "Teresa", "Antonio", "Carmen", "Roberto", "Liza", "Paolo", "Grace", "Mark", "Joy")
+GEN_LAST_NAMES = ("Dela Cruz", "Santos", "Reyes", "Garcia", "Mendoza", "Bautista", "Villanueva", "Ramos",
+                  "Aquino", "Castillo", "Flores", "Gonzales", "Torres", "Navarro", "Ferrer", "Lim", "Tan",
+                  "Domingo", "Pascual", "Salazar", "Rivera", "Aguilar", "Marquez", "Soriano", "Valdez")
+
+
+def _gen_chunk(n, accounts, rng, np_rng):
+    # -> (account indexes, is_withdraw flags, amounts in centavos)
+    if np_rng is not None:
+        idx = np_rng.integers(0, accounts, n)
+        withdraw = np_rng.random(n) < GEN_WITHDRAW_SHARE
+        amounts = np_rng.integers(100, 500_000, n)
+        return idx, withdraw, amounts
+    idx = [rng.randrange(accounts) for _ in range(n)]
+    withdraw = [rng.random() < GEN_WITHDRAW_SHARE for _ in range(n)]
+    amounts = [rng.randrange(100, 500_000) for _ in range(n)]
+    return idx, withdraw, amounts
+
+
+# Build a consistent database at path: every account's balance equals its
+# opening balance plus the net of its transactions, and opening balances
+# cover all withdrawals so no balance ever dips below zero. Rows go in with
+# executemany while journaling is off and the secondary indexes and triggers
+# are dropped; indexes, triggers, the search index and rollups are rebuilt
+# once at the end.
+def generate_dataset(path, accounts=10_000, transactions=100_000, loans=None, audit=None, seed=42):
+    loans = accounts // 10 if loans is None else loans
+    audit = accounts if audit is None else audit
+    backend.close_pool()
+    for f in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(f):
+            os.remove(f)
+    backend.SQLITE_DB = path
+    backend.init_db()
+    backend.close_pool()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF;")
+    conn.execute("PRAGMA synchronous = OFF;")
+    conn.execute("PRAGMA cache_size = -262144;")
+    cur = conn.cursor()
+    cur.execute("SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL;")
+    indexes = cur.fetchall()
+    for kind, name, _ in indexes:
+        cur.execute(f"DROP {kind.upper()} {name};")
+
+    np = backend._numpy()
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed) if np is not None else None
+    nos = [backend.format_account_no(100000 + i) for i in range(accounts)]
+    deposits = [0] * accounts
+    withdraws = [0] * accounts
+    start = datetime.datetime.utcnow() - datetime.timedelta(days=GEN_SPAN_DAYS)
+    step = GEN_SPAN_DAYS * 86400 / max(1, transactions)
+
+    done = 0
+    while done < transactions:
+        n = min(GEN_CHUNK, transactions - done)
+        idx, withdraw, amounts = _gen_chunk(n, accounts, rng, np_rng)
+        if np is not None:
+            np_dep = np.bincount(idx[~withdraw], weights=amounts[~withdraw], minlength=accounts)
+            np_wd = np.bincount(idx[withdraw], weights=amounts[withdraw], minlength=accounts)
+            for i in np.nonzero(np_dep)[0].tolist():
+                deposits[i] += int(np_dep[i])
+            for i in np.nonzero(np_wd)[0].tolist():
+                withdraws[i] += int(np_wd[i])
+            idx, withdraw, amounts = idx.tolist(), withdraw.tolist(), amounts.tolist()
+        else:
+            for i, w, a in zip(idx, withdraw, amounts):
+                if w:
+                    withdraws[i] += a
+                else:
+                    deposits[i] += a
+        rows = ((nos[i], "withdraw" if w else "deposit", a,
+                 (start + datetime.timedelta(seconds=(done + k) * step)).isoformat(), "synthetic")
+                for k, (i, w, a) in enumerate(zip(idx, withdraw, amounts)))
+        cur.executemany("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)", rows)
+        done += n
+
+    created = start.isoformat()
+    for lo in range(0, accounts, GEN_CHUNK):
+        hi = min(accounts, lo + GEN_CHUNK)
+        rows = []
+        for i in range(lo, hi):
+            opening = withdraws[i] + rng.randrange(0, 10_000_000)
+            first, last = rng.choice(GEN_FIRST_NAMES), rng.choice(GEN_LAST_NAMES)
+            email = f"{first}.{last.replace(' ', '')}{i}@example.com".lower()
+            rows.append((nos[i], f"{first} {last}", email, f"09{i:09d}",
+                         opening + deposits[i] - withdraws[i], opening, created))
+        cur.executemany("INSERT INTO accounts (account_no, name, email, phone, balance, opening_balance, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    cur.execute("UPDATE sequences SET value = ? WHERE name = 'account_no';", (100000 + accounts,))
+
+    statuses = ("pending", "approved", "paid")
+    cur.executemany("INSERT INTO loans (account_no, amount, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    ((rng.choice(nos), rng.randrange(1_000_00, 5_000_000_00), rng.choice(statuses), created, created)
+                     for _ in range(loans)))
+    cur.executemany("INSERT INTO audit_logs (admin, action, timestamp) VALUES (?, ?, ?)",
+                    (("system", f"synthetic {i}", created) for i in range(audit)))
+
+    for _, _, sql in indexes:
+        cur.execute(sql)
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'accounts_fts';")
+    if cur.fetchone():
+        cur.execute("INSERT INTO accounts_fts (accounts_fts) VALUES ('rebuild');")
+    backend._rebuild_rollups(cur)
+    conn.commit()
+    conn.close()
+    return nos
+
+
+# === Regression suite ===
+SUITE_HEAVY_OPS = 5  # cap for full-table operations
+
+
+# (name, op(rng), heavy). op gets a per-thread random.Random.
+def _suite_scenarios(nos, max_account_id, loan_ids):
+    pick = lambda r: r.choice(nos)
+    return [
+        ("authenticate_admin", lambda r: backend.authenticate_admin("Admin", "Admin123"), False),
+        ("get_accounts_page", lambda r: backend.get_accounts_page(r.randrange(max_account_id)), False),
+        ("get_account", lambda r: backend.get_account(pick(r)), False),
+        ("search_accounts", lambda r: backend.search_accounts(
+            f"{r.choice(GEN_FIRST_NAMES)[:r.randrange(2, 5)]} {r.choice(GEN_LAST_NAMES)}"), False),
+        ("get_transactions", lambda r: backend.get_transactions(100), False),
+        ("get_transactions(account_no)", lambda r: backend.get_transactions(100, account_no=pick(r)), False),
+        ("get_transactions_page", lambda r: backend.get_transactions_page(), False),
+        ("get_loans(status)", lambda r: backend.get_loans_page(status="pending"), False),
+        ("get_audit_logs", lambda r: backend.get_audit_logs(100), False),
+        ("total_deposits", lambda r: backend.total_deposits(), False),
+        ("total_withdraws", lambda r: backend.total_withdraws(), False),
+        ("get_report_summary", lambda r: backend.get_report_summary(), False),
+        ("add_transaction", lambda r: backend.add_transaction(pick(r), "deposit", r.randrange(1, 500)), False),
+        ("transfer", lambda r: backend.transfer(pick(r), pick(r), r.randrange(1, 50)), False),
+        ("add_transactions_bulk(1000)",
+         lambda r: backend.add_transactions_bulk((pick(r), "deposit", 1) for _ in range(1000)), False),
+        ("create_account", lambda r: backend.create_account(backend.generate_account_no(), "Bench"), False),
+        ("update_account", lambda r: backend.update_account(r.randrange(1, max_account_id), phone="0"), False),
+        ("create_loan", lambda r: backend.create_loan(pick(r), 1000), False),
+        ("update_loan_status", lambda r: backend.update_loan_status(r.choice(loan_ids), "approved"), False),
+        ("log_action", lambda r: backend.log_action("bench", "op"), False),
+        ("get_accounts", lambda r: backend.get_accounts(), True),
+        ("aggregate_transactions", lambda r: backend.aggregate_transactions("type"), True),
+    ]
+
+
+def _summarize(latencies, elapsed):
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": backend._percentile(latencies, 0.50) * 1000,
+        "p95_ms": backend._percentile(latencies, 0.95) * 1000,
+        "p99_ms": backend._percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _measure(op, ops, threads, seed):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(k, n):
+        rng = random.Random(seed + k)
+        local = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            op(rng)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    per_thread = max(1, ops // threads)
+    pool = [threading.Thread(target=worker, args=(k, per_thread)) for k in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return _summarize(latencies, time.perf_counter() - start)
+
+
+def run_suite(db, ops=200, threads=4, only=None):
+    backend.close_pool()
+    backend.SQLITE_DB = db
+    backend.init_db()
+    conn = backend.get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT account_no FROM accounts ORDER BY id LIMIT 10000;")
+    nos = [r[0] for r in cur.fetchall()]
+    cur.execute("SELECT MAX(id) FROM accounts;")
+    max_account_id = (cur.fetchone()[0] or 0) + 1
+    cur.execute("SELECT id FROM loans ORDER BY id DESC LIMIT 1000;")
+    loan_ids = [r[0] for r in cur.fetchall()] or [0]
+    cur.execute("SELECT (SELECT COUNT(*) FROM accounts), (SELECT COUNT(*) FROM transactions);")
+    n_accounts, n_transactions = cur.fetchone()
+    conn.close()
+
+    results = {}
+    for name, op, heavy in _suite_scenarios(nos, max_account_id, loan_ids):
+        if only and name not in only:
+            continue
+        n = min(ops, SUITE_HEAVY_OPS) if heavy else ops
+        results[name] = {
+            "single": _measure(op, n, 1, seed=1),
+            "concurrent": _measure(op, n, threads, seed=1000),
+        }
+        r = results[name]
+        print(f"{name:<30}{r['single']['ops_per_sec']:>10.0f}/s  p99 {r['single']['p99_ms']:>8.2f}ms"
+              f"  | x{threads}{r['concurrent']['ops_per_sec']:>10.0f}/s  p99 {r['concurrent']['p99_ms']:>8.2f}ms")
+    backend.flush_audit()
+    backend.close_pool()
+    return {
+        "meta": {
+            "created": datetime.datetime.utcnow().isoformat(),
+            "accounts": n_accounts,
+            "transactions": n_transactions,
+            "ops": ops,
+            "threads": threads,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+# Returns [(scenario, mode, baseline ops/s, current ops/s, ratio)] for
+# everything slower than baseline by more than tolerance.
+def compare_to_baseline(report, baseline, tolerance=0.2):
+    regressions = []
+    for name, modes in report["results"].items():
+        for mode, stats in modes.items():
+            base = baseline.get("results", {}).get(name, {}).get(mode)
+            if not base or not base["ops_per_sec"]:
+                continue
+            ratio = stats["ops_per_sec"] / base["ops_per_sec"]
+            if ratio < 1 - tolerance:
+                regressions.append((name, mode, base["ops_per_sec"], stats["ops_per_sec"], ratio))
+    return regressions
+
+
+def cmd_generate(args):
+    start = time.perf_counter()
+    generate_dataset(args.path, args.accounts, args.transactions, seed=args.seed)
+    print(f"generated {args.accounts} accounts / {args.transactions} transactions "
+          f"in {time.perf_counter() - start:.1f}s -> {args.path}")
+
+
+def cmd_suite(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = args.db
+        if db is None:
+            db = os.path.join(tmpdir, "suite.db")
+            generate_dataset(db, args.accounts, args.transactions, seed=args.seed)
+        report = run_suite(db, args.ops, args.threads, only=args.only)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for name, mode, base, now, ratio in regressions:
+            print(f"REGRESSION {name} [{mode}]: {base:.0f}/s -> {now:.0f}/s ({ratio:.0%})")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+    return 0
+
+
+LOAN_BATCH_TARGET_COMPUTE_S = 5.0
+
+
+# Nightly loan run over ops loans (at least 1M, 80% approved). Compute
+# (NumPy) and SQLite write time are reported separately.
+def bench_loans(ops):
+    n = max(ops, 1_000_000)
+    rng = random.Random(3)
+    today = datetime.datetime.utcnow()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fresh_db(tmpdir, "loans.db")
+        conn = backend.get_conn()
+        rows = []
+        for i in range(n):
+            created = (today - datetime.timedelta(days=rng.randrange(1, 900))).isoformat()
+            rows.append((f"BN{i % 100000:06d}", rng.randrange(10_000_00, 500_000_00),
+                         "approved" if rng.random() < 0.8 else "pending", created, created,
+                         rng.choice((600, 1200, 1800, 2400)), rng.choice((6, 12, 24, 36)),
+                         rng.choice(backend.LOAN_SCHEDULES)))
+        conn.executemany("""INSERT INTO loans (account_no, amount, status, created_at, updated_at, rate_bps, term_months, schedule)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+        conn.commit()
+        conn.close()
+        backend._numpy()  # keep the import out of the timing
+        stats = backend.run_loan_batch()
+        backend.close_pool()
+    verdict = "PASS" if stats["compute_s"] <= LOAN_BATCH_TARGET_COMPUTE_S else "FAIL"
+    print(f"run_loan_batch: {n:,} loans, {stats['loans']:,} approved, {stats['updated']:,} updated")
+    print(f"  compute {stats['compute_s']:.2f}s (target {LOAN_BATCH_TARGET_COMPUTE_S:.0f}s) {verdict}, "
+          f"write {stats['write_s']:.2f}s")
+
+
+# Same workload against every storage engine that needs no server.
+def bench_engines(ops):
+    import storage
+    with tempfile.TemporaryDirectory() as tmpdir:
+        backend.close_pool()
+        engines = [storage.SQLiteEngine(os.path.join(tmpdir, "engines.db")), storage.MemoryEngine()]
+        for engine in engines:
+            nos = [f"EN{i:06d}" for i in range(1000)]
+            for no in nos:
+                engine.create_account(no, "Bench", initial_balance=1000)
+            rng = random.Random(7)
+            ops_list = [
+                ("add_transaction", lambda: engine.add_transaction(rng.choice(nos), "deposit", 1)),
+                ("transfer", lambda: engine.transfer(rng.choice(nos), rng.choice(nos), 1)),
+                ("get_transactions(account_no)", lambda: engine.get_transactions(50, rng.choice(nos))),
+                ("total_deposits", engine.total_deposits),
+            ]
+            for name, op in ops_list:
+                start = time.perf_counter()
+                for _ in range(ops):
+                    op()
+                elapsed = time.perf_counter() - start
+                print(f"{engine.name:<8}{name:<30}{ops / elapsed:>12.0f} ops/s")
+            engine.close()
+
+
+# === Startup ===
+# Each step runs in a fresh interpreter, as it would when the app is
+# launched, and is timed from just after `import backend` (which is timed
+# separately), so the first connection is part of every step.
+STARTUP_STEPS = [
+    ("init_db, full schema pass", "conn = backend.get_conn(); backend._create_schema(conn); conn.close()"),
+    ("init_db, schema check", "backend.init_db()"),
+    ("dashboard, all tabs' first queries",
+     "backend.get_accounts_page(); backend.get_transactions_page(); backend.get_loans_page(); "
+     "backend.get_report_summary(); backend.get_audit_logs_page(); backend.metrics_snapshot()"),
+    ("dashboard, first tab only", "backend.get_accounts_page()"),
+]
+STARTUP_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import backend
+t1 = time.perf_counter()
+backend.SQLITE_DB = {db!r}
+{step}
+print(t1 - t0, time.perf_counter() - t1)
+"""
+LOGO_SIZE = (300, 300)
+
+
+# -> (import seconds, step seconds)
+def _run_fresh(code):
+    import subprocess
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return tuple(float(v) for v in out.stdout.split()[-2:])
+
+
+# The logo step needs Pillow, like the frontend: decoding and scaling the
+# full-size PNG on every login vs opening an already scaled copy.
+def _logo_timings(runs, tmpdir):
+    try:
+        from PIL import Image
+    except ImportError:
+        return []
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "BANK_SYSTEM_LOGO.png")
+    scaled = os.path.join(tmpdir, "logo.png")
+    Image.open(src).resize(LOGO_SIZE).save(scaled)
+    results = []
+    for name, load in (("logo, decode + resize", lambda: Image.open(src).resize(LOGO_SIZE)),
+                       ("logo, pre-scaled copy", lambda: Image.open(scaled).load())):
+        times = []
+        for _ in range(runs):
+            t = time.perf_counter()
+            load()
+            times.append(time.perf_counter() - t)
+        results.append((name, times))
+    return results
+
+
+def cmd_startup(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = args.db
+        if db is None:
+            db = os.path.join(tmpdir, "startup.db")
+            generate_dataset(db, args.accounts, args.transactions)
+            backend.close_pool()
+        # byte-compile first, as an installed app would be; otherwise every
+        # run pays for compiling backend.py (e.g. with PYTHONDONTWRITEBYTECODE)
+        import py_compile
+        py_compile.compile(backend.__file__)
+        results, imports = [], []
+        for name, step in STARTUP_STEPS:
+            runs = [_run_fresh(STARTUP_SNIPPET.format(db=db, step=step)) for _ in range(args.runs)]
+            imports += [r[0] for r in runs]
+            results.append((name, [r[1] for r in runs]))
+        results.insert(0, ("import backend", imports))
+        results += _logo_timings(args.runs, tmpdir)
+    print(f"startup steps, fresh process each, {args.runs} runs")
+    for name, times in results:
+        times.sort()
+        print(f"  {name:<38} median {times[len(times) // 2] * 1000:8.1f} ms   min {times[0] * 1000:8.1f} ms")
+    print("  (the frontend prints its own login/dashboard timings with BANK_STARTUP_TIMING=1)")
+
+
+# Teller writes (add_transaction from --threads threads) with no backup
+# running, then while backup.backup_database() copies the database with the
+# given pages/sleep, then with the whole copy in one step for comparison.
+def _write_latency_during(db, nos, threads, run, seconds):
+    latencies = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def worker(k):
+        rng = random.Random(k)
+        local = []
+        while not done.is_set():
+            t0 = time.perf_counter()
+            backend.add_transaction(rng.choice(nos), "deposit", 1.0, "bench")
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    result = run() if run else time.sleep(seconds)
+    done.set()
+    for t in pool:
+        t.join()
+    report = _summarize(latencies, time.perf_counter() - start)
+    report["max_ms"] = latencies[-1] * 1000 if latencies else 0.0
+    return report, result
+
+
+def cmd_backup(args):
+    import backup
+    pages = args.pages or backup.BACKUP_PAGES
+    pause = backup.BACKUP_SLEEP if args.sleep is None else args.sleep
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = args.db
+        if db is None:
+            db = os.path.join(tmpdir, "backup.db")
+            generate_dataset(db, args.accounts, args.transactions)
+        backend.close_pool()
+        backend.SQLITE_DB = db
+        backend.init_db()
+        backup.BACKUP_DIR = tmpdir
+        conn = backend.get_conn()
+        nos = [r[0] for r in conn.execute("SELECT account_no FROM accounts ORDER BY id LIMIT 1000;")]
+        conn.close()
+        runs = [("no backup", None),
+                (f"backup, {pages} pages/step, sleep {pause}s",
+                 lambda: backup.backup_database(pages=pages, sleep=pause, check="quick_check")),
+                ("backup, one step", lambda: backup.backup_database(pages=-1, sleep=0, check="quick_check"))]
+        print(f"add_transaction latency, {args.threads} writer threads, {os.path.getsize(db):,} byte database")
+        print(f"{'':<38}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'backup s':>10}"
+              f"{'WAL MB':>8}")
+        for name, run in runs:
+            report, result = _write_latency_during(db, nos, args.threads, run, args.seconds)
+            copy = f"{result['seconds']:>10.1f}{result['wal_bytes'] / 2**20:>8.0f}" if result else ""
+            if result and not result["ok"]:
+                copy += "  FAILED: " + result["message"]
+            print(f"{name:<38}{report['ops_per_sec']:>9.0f}{report['p50_ms']:>9.2f}{report['p95_ms']:>9.2f}"
+                  f"{report['p99_ms']:>9.2f}{report['max_ms']:>9.1f}{copy}")
+        backend.close_pool()
+
+
+VELOCITY_BENCH_RULES = [("withdraw", 3600, 1_000_000, None), ("deposit", 3600, None, 10**12)]
+VELOCITY_HISTORY = 200  # transactions per account already in the window
+
+
+# What the velocity engine replaces: count and sum the account's recent
+# withdrawals with a query before every post.
+def _velocity_by_query(account_no, since):
+    conn = backend.get_conn()
+    try:
+        conn.execute("""SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM transactions
+                        WHERE account_no = ? AND type = 'withdraw' AND timestamp >= ?;""",
+                     (account_no, since)).fetchone()
+    finally:
+        conn.close()
+
+
+def bench_velocity(ops):
+    modes = ("no limits", "velocity engine", "history query")
+    print(f"add_transaction, {VELOCITY_HISTORY} recent transactions per account")
+    print(f"{'mode':<20}{'ops/s':>10}{'avg us':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mode in modes:
+            fresh_db(tmpdir, f"velocity-{mode.replace(' ', '-')}.db")
+            nos = seed_accounts(50)
+            backend.add_transactions_bulk([(no, "withdraw", 1.0, "") for no in nos] * VELOCITY_HISTORY)
+            backend.set_velocity_rules(VELOCITY_BENCH_RULES if mode == "velocity engine" else [])
+            backend.init_db()  # warm-up
+            since = (datetime.datetime.utcnow() - datetime.timedelta(hours=1)).isoformat()
+            start = time.perf_counter()
+            for i in range(ops):
+                if mode == "history query":
+                    _velocity_by_query(nos[i % len(nos)], since)
+                backend.add_transaction(nos[i % len(nos)], "withdraw", 0.01)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<20}{ops / elapsed:>10.0f}{elapsed / ops * 1e6:>10.0f}")
+            if mode == "velocity engine":
+                check_us = backend.velocity_stats()["avg_check_us"]
+            backend.close_pool()
+    backend.set_velocity_rules([])
+    print(f"engine: {check_us:.1f} us per check, including the catch-up read")
+
+
+BENCHMARKS = {
+    "pool": bench_pool,
+    "audit": bench_audit,
+    "bulk": bench_bulk,
+    "ledger": bench_ledger,
+    "engines": bench_engines,
+    "loans": bench_loans,
+    "velocity": bench_velocity,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="backend.py benchmarks")
+    sub = parser.add_subparsers(dest="benchmark")
+    for name in BENCHMARKS:
+        p = sub.add_parser(name)
+        p.add_argument("--ops", type=int, default=2000, help="operations per scenario")
+    p = sub.add_parser("generate", help="build a synthetic database")
+    p.add_argument("path")
+    p.add_argument("--accounts", type=int, default=1_000_000)
+    p.add_argument("--transactions", type=int, default=50_000_000)
+    p.add_argument("--seed", type=int, default=42)
+    p = sub.add_parser("suite", help="latency/throughput for every backend function")
+    p.add_argument("--db", help="existing database to run against (it will be written to)")
+    p.add_argument("--accounts", type=int, default=10_000, help="size of the generated dataset without --db")
+    p.add_argument("--transactions", type=int, default=100_000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--ops", type=int, default=200, help="operations per scenario")
+    p.add_argument("--threads", type=int, default=4, help="threads for the concurrent run")
+    p.add_argument("--only", nargs="*", help="run only these scenarios")
+    p.add_argument("--json", help="write results here")
+    p.add_argument("--baseline", help="compare against this results file")
+    p.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline")
+    p.add_argument("--save-baseline", help="also write results here as the new baseline")
+    p = sub.add_parser("startup", help="time app startup steps in fresh processes")
+    p.add_argument("--db", help="existing database (default: a generated one)")
+    p.add_argument("--accounts", type=int, default=100_000, help="size of the generated dataset without --db")
+    p.add_argument("--transactions", type=int, default=1_000_000)
+    p.add_argument("--runs", type=int, default=9)
+    p = sub.add_parser("backup", help="write latency while an online backup runs")
+    p.add_argument("--db", help="existing database (it will be written to)")
+    p.add_argument("--accounts", type=int, default=100_000, help="size of the generated dataset without --db")
+    p.add_argument("--transactions", type=int, default=1_000_000)
+    p.add_argument("--pages", type=int, help="pages copied per backup step (default: backup.BACKUP_PAGES)")
+    p.add_argument("--sleep", type=float, help="seconds between backup steps (default: backup.BACKUP_SLEEP)")
+    p.add_argument("--threads", type=int, default=2, help="writer threads")
+    p.add_argument("--seconds", type=float, default=5.0, help="length of the no-backup run")
+    args = parser.parse_args()
+    if args.benchmark == "generate":
+        cmd_generate(args)
+    elif args.benchmark == "suite":
+        sys.exit(cmd_suite(args))
+    elif args.benchmark == "startup":
+        cmd_startup(args)
+    elif args.benchmark == "backup":
+        cmd_backup(args)
+    else:
+        BENCHMARKS[args.benchmark or "pool"](getattr(args, "ops", 2000))
@@ -1,16 +1,312 @@
 # frontend.py
+import time
+_STARTED = time.perf_counter()  # for BANK_STARTUP_TIMING
 import customtkinter as ctk
-from tkinter import ttk, messagebox, simpledialog, LEFT,RIGHT,BOTH,TOP,X,Y,CENTER
+from tkinter import ttk, messagebox, simpledialog, filedialog, LEFT,RIGHT,BOTH,TOP,X,Y,CENTER
 from PIL import Image, ImageTk
 import backend
 import datetime
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
 LOGO_PATH = "BANK_SYSTEM_LOGO.png"
+LOGO_SIZE = (300, 300)
+BACKEND_WORKERS = 4
+POLL_MS = 30  # how often the Tk loop picks up finished backend calls
+SEARCH_DEBOUNCE_MS = 250  # account search runs once typing pauses this long
+FEED_POLL_MS = 1000  # how often open tabs pick up rows changed by anyone (backend.ChangeFeed)
+STARTUP_TIMING = os.environ.get("BANK_STARTUP_TIMING") == "1"  # print launch/login timings
+IO_POLL_MS = 500  # progress label refresh while an import/export runs
+IO_FILETYPES = [("CSV", "*.csv"), ("JSON lines", "*.jsonl"), ("Compressed", "*.gz"), ("All files", "*.*")]
+# host:port of a running service.py; the app then sends its reads and writes
+# there instead of opening bank.db itself (imports/exports are turned off:
+# they would bypass the service's writer)
+SERVICE_ADDRESS = os.environ.get("BANK_SERVICE")
+
+
+
+# Initialize DB if needed (the service does its own)
+if not SERVICE_ADDRESS:
+    backend.init_db()
+
+# The logo is scaled once and saved next to the original
+# (BANK_SYSTEM_LOGO.300x300.png), so later launches open a small file instead
+# of decoding the full-size PNG. The copy is redone if the original is newer.
+def load_logo(size=LOGO_SIZE):
+    base, ext = os.path.splitext(LOGO_PATH)
+    scaled = f"{base}.{size[0]}x{size[1]}{ext}"
+    try:
+        if os.path.getmtime(scaled) >= os.path.getmtime(LOGO_PATH):
+            return Image.open(scaled)
+    except OSError:
+        pass
+    img = Image.open(LOGO_PATH).resize(size)
+    try:
+        img.save(scaled)
+    except OSError as e:
+        print("Logo cache write failed:", e)
+    return img
+
+class TaskRunner:
+    # Runs backend calls on a thread pool so the Tk loop never waits on the
+    # database. Tk isn't thread-safe, so workers only put finished futures on
+    # a queue that the main loop drains every POLL_MS via after().
+    #
+    # Calls submitted with a key are coalesced: while one is running, newer
+    # submissions replace each other in a single pending slot, and a result
+    # that was superseded before it arrived is dropped (stale refresh).
+    def __init__(self, root, workers=BACKEND_WORKERS, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backend")
+        self.done = queue.Queue()
+        self.latest = {}    # key -> newest generation submitted
+        self.running = {}   # key -> future in flight
+        self.pending = {}   # key -> newest call waiting for the running one
+        self.busy = 0
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, fn, *args, key=None, on_done=None, on_error=None):
+        gen = 0
+        if key is not None:
+            gen = self.latest.get(key, 0) + 1
+            self.latest[key] = gen
+            if key in self.running:
+                self.pending[key] = (gen, fn, args, on_done, on_error)
+                return
+        self._start(key, gen, fn, args, on_done, on_error)
+
+    # drop whatever is queued or in flight for key
+    def cancel(self, key):
+        self.latest[key] = self.latest.get(key, 0) + 1
+        self.pending.pop(key, None)
+        fut = self.running.get(key)
+        if fut is not None:
+            fut.cancel()
+
+    def _start(self, key, gen, fn, args, on_done, on_error):
+        self.busy += 1
+        self._notify()
+        fut = self.pool.submit(fn, *args)
+        if key is not None:
+            self.running[key] = fut
+        name = getattr(fn, "__name__", "task")
+        fut.add_done_callback(lambda f: self.done.put((key, gen, name, f, on_done, on_error)))
+
+    def _notify(self):
+        if self.on_busy:
+            self.on_busy(self.busy)
+
+    def _poll(self):
+        while True:
+            try:
+                key, gen, name, fut, on_done, on_error = self.done.get_nowait()
+            except queue.Empty:
+                break
+            self.busy -= 1
+            if key is not None:
+                self.running.pop(key, None)
+                nxt = self.pending.pop(key, None)
+                if nxt is not None:
+                    self._start(key, *nxt)
+                if gen != self.latest.get(key):
+                    continue
+            if fut.cancelled():
+                continue
+            exc = fut.exception()
+            # time the Tk side separately ("ui:<backend fn>") so a slow
+            # refresh can be told apart from a slow query
+            start = time.perf_counter() if backend.INSTRUMENT else None
+            try:
+                if exc is not None:
+                    (on_error or self._default_error)(exc)
+                elif on_done is not None:
+                    on_done(fut.result())
+            except Exception as e:
+                print("task callback error:", e)
+            if start is not None:
+                backend.record_metric("ui:" + name, time.perf_counter() - start)
+        self._notify()
+        self.root.after(POLL_MS, self._poll)
+
+    def _default_error(self, exc):
+        messagebox.showerror("Error", str(exc))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+class VirtualTable:
+    # Treeview over a keyset-paginated backend call (backend.get_*_page).
+    # Rows are fetched a page at a time as the user scrolls near either end,
+    # and at most window_pages pages are kept in the widget, so memory and
+    # refresh time don't depend on the size of the table.
+    # newest_first says which end new rows from the change feed belong at.
+    def __init__(self, master, columns, fetch_page, page_size=backend.PAGE_SIZE, window_pages=3, runner=None,
+                 newest_first=False):
+        self.fetch_page = fetch_page
+        self.runner = runner
+        self.newest_first = newest_first
+        self.key = f"table-{id(self)}"  # one key per table: a refresh supersedes scroll loads
+        self.page_size = page_size
+        self.max_rows = page_size * window_pages
+        self.frame = ctk.CTkFrame(master)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings")
+        for c in columns:
+            self.tree.heading(c, text=c)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", expand=True, fill="both")
+        self.at_start = True
+        self.at_end = True
+        self.fixed = False  # showing show_rows() results rather than pages
+        self._loading = False
+
+    def pack(self, **kw):
+        self.frame.pack(**kw)
+
+    # run fetch_page(*args) on the runner (or inline without one), then done(rows)
+    def _fetch(self, args, done):
+        self._loading = True
+        if self.runner is None:
+            try:
+                done(self.fetch_page(*args))
+            finally:
+                self._loading = False
+            return
+        def finish(rows):
+            try:
+                done(rows)
+            finally:
+                self._loading = False
+        def failed(exc):
+            self._loading = False
+            print("page load failed:", exc)
+        self.runner.submit(self.fetch_page, *args, key=self.key, on_done=finish, on_error=failed)
+
+    def refresh(self):
+        self._fetch((None, self.page_size, False), self._show_first)
+
+    def _show_first(self, rows):
+        self.tree.delete(*self.tree.get_children())
+        self._insert(rows, "end")
+        self.at_start = True
+        self.at_end = len(rows) < self.page_size
+        self.fixed = False
+        self.tree.yview_moveto(0)
+
+    # show a fixed set of rows (search results) with no paging; refresh()
+    # goes back to paging through the whole table
+    def show_rows(self, rows):
+        self._loading = False
+        self._show_first(rows)
+        self.at_end = True
+        self.fixed = True
+
+    # replace one row in place if it's in the loaded window (no refetch)
+    def update_row(self, row):
+        if row is not None and self.tree.exists(str(row[0])):
+            self.tree.item(str(row[0]), values=row)
+
+    # apply a backend.ChangeFeed batch to the loaded window: changed rows are
+    # updated in place and deleted ones removed; new rows are added only if
+    # the window reaches the end they belong at (otherwise scrolling there
+    # fetches them like any other page)
+    def apply_changes(self, new=(), changed=(), deleted=()):
+        for row in changed:
+            self.update_row(row)
+        for row_id in deleted:
+            if self.tree.exists(str(row_id)):
+                self.tree.delete(str(row_id))
+        if not new or self.fixed:
+            return
+        top, _ = self._top_index()
+        if self.newest_first:
+            if not self.at_start:
+                return
+            self._insert(new[::-1], 0)
+            items = self.tree.get_children()
+            trim = max(0, len(items) - self.max_rows)
+            if trim:
+                self.tree.delete(*items[-trim:])
+                self.at_end = False
+            if top:  # keep the rows the user is looking at still
+                self.tree.yview_moveto((top + len(new)) / max(1, len(items) - trim))
+        else:
+            if not self.at_end:
+                return
+            self._insert(new, "end")
+            items = self.tree.get_children()
+            trim = max(0, len(items) - self.max_rows)
+            if trim:
+                self.tree.delete(*items[:trim])
+                self.at_start = False
+                self.tree.yview_moveto(max(0, top - trim) / max(1, len(items) - trim))
+
+    def _insert(self, rows, where):
+        for r in rows if where == "end" else reversed(rows):
+            iid = str(r[0])
+            if self.tree.exists(iid):  # the change feed got there first
+                self.tree.item(iid, values=r)
+            else:
+                self.tree.insert("", where, iid=iid, values=r)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        if float(last) > 0.9 and not self.at_end:
+            self._loading = True
+            self.tree.after_idle(self._load_next)
+        elif float(first) < 0.1 and not self.at_start:
+            self._loading = True
+            self.tree.after_idle(self._load_prev)
+
+    # top visible row index, used to keep the view still while rows shift
+    def _top_index(self):
+        items = self.tree.get_children()
+        return int(self.tree.yview()[0] * len(items)), len(items)
+
+    def _load_next(self):
+        items = self.tree.get_children()
+        if not items:
+            self._loading = False
+            return
+        self._fetch((int(items[-1]), self.page_size, False), self._append)
 
+    def _append(self, rows):
+        self.at_end = len(rows) < self.page_size
+        if not rows:
+            return
+        top, _ = self._top_index()
+        self._insert(rows, "end")
+        items = self.tree.get_children()
+        trim = max(0, len(items) - self.max_rows)
+        if trim:
+            self.tree.delete(*items[:trim])
+            self.at_start = False
+        self.tree.yview_moveto(max(0, top - trim) / max(1, len(items) - trim))
+
+    def _load_prev(self):
+        items = self.tree.get_children()
+        if not items:
+            self._loading = False
+            return
+        self._fetch((int(items[0]), self.page_size, True), self._prepend)
 
-
-# Initialize DB if needed
-backend.init_db()
+    def _prepend(self, rows):
+        self.at_start = len(rows) < self.page_size
+        if not rows:
+            return
+        top, _ = self._top_index()
+        self._insert(rows, 0)
+        items = self.tree.get_children()
+        trim = max(0, len(items) - self.max_rows)
+        if trim:
+            self.tree.delete(*items[-trim:])
+            self.at_end = False
+        self.tree.yview_moveto((top + len(rows)) / max(1, len(items) - trim))
 
 class AdminApp(ctk.CTk):
     def __init__(self):
@@ -18,8 +314,38 @@ class AdminApp(ctk.CTk):
         self.title("Bank System")
         self.geometry("800sx700")
         self.admin_user = None
+        self.api = backend
+        if SERVICE_ADDRESS:
+            import service
+            self.api = service.ServiceClient.from_address(SERVICE_ADDRESS)
+        self.busy_label = None
+        self.tasks = TaskRunner(self, on_busy=self._set_busy)
+        self.feed = None
+        self._feed_after = None
+        self.logo_img = None
+        self._io_busy = False
+        self._io_rows = 0
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self._build_login()
         ctk.set_appearance_mode("Dark")
+        self._timing("launch to login screen", _STARTED)
+
+    # with BANK_STARTUP_TIMING=1, print the time from since until the UI
+    # built after it has been drawn (the next idle point of the Tk loop)
+    def _timing(self, label, since):
+        if STARTUP_TIMING:
+            self.after_idle(lambda: print(f"[timing] {label}: {(time.perf_counter() - since) * 1000:.0f} ms"))
+
+    def _on_close(self):
+        self._stop_feed()
+        self.tasks.shutdown()
+        self.destroy()
+
+    # loading indicator in the top bar while backend calls are in flight
+    def _set_busy(self, count):
+        if self.busy_label is None or not self.busy_label.winfo_exists():
+            return
+        self.busy_label.configure(text="Loading..." if count else "")
 
 
     def _build_login(self):
@@ -28,10 +354,10 @@ class AdminApp(ctk.CTk):
         frame = ctk.CTkFrame(self)
         frame.pack(expand=True)
 
-        # logo
+        # logo, decoded once per run (and scaled once per install)
         try:
-            img = Image.open(LOGO_PATH).resize((300, 300))
-            self.logo_img = ImageTk.PhotoImage(img)
+            if self.logo_img is None:
+                self.logo_img = ImageTk.PhotoImage(load_logo())
             logo_label = ctk.CTkLabel(frame, image=self.logo_img)
             logo_label.pack()
         except Exception as e:
@@ -72,12 +398,20 @@ class AdminApp(ctk.CTk):
     def _login(self):
         u = self.username_entry.get().strip()
         p = self.password_entry.get().strip()
-        if backend.authenticate_admin(u, p):
-            self.admin_user = u
-            backend.log_action(u, "login")
-            self._build_dashboard()
-        else:
-            messagebox.showerror("Login failed", "Invalid username or password")
+        def check():
+            ok = self.api.authenticate_admin(u, p)
+            if ok:
+                self.api.log_action(u, "login")
+            return ok
+        def done(ok):
+            if ok:
+                self.admin_user = u
+                start = time.perf_counter()
+                self._build_dashboard()
+                self._timing("login to dashboard", start)
+            else:
+                messagebox.showerror("Login failed", "Invalid username or password")
+        self.tasks.submit(check, key="login", on_done=done)
 
     def _build_dashboard(self):
         for w in self.winfo_children():
@@ -87,43 +421,103 @@ class AdminApp(ctk.CTk):
         top.pack(fill="x")
         ctk.CTkLabel(top, text=f"Admin: {self.admin_user}", font=("Segoe UI", 12)).pack(side="left", padx=12)
         ctk.CTkButton(top, text="Logout", command=self._logout).pack(side="right", padx=12, pady=12)
+        self.busy_label = ctk.CTkLabel(top, text="", font=("Segoe UI", 12))
+        self.busy_label.pack(side="right", padx=12)
 
-        # main area with tabs
+        # first poll only sets the high-water marks; anything committed
+        # after it reaches the tabs on the next poll
+        self.feed = self.api.ChangeFeed()
+        self.tasks.submit(self.feed.poll, key="feed", on_error=lambda e: print("change feed error:", e))
+
+        # main area with tabs; each tab's widgets and first queries are built
+        # the first time it's selected, so only Accounts is built up front
         tab_control = ttk.Notebook(self)
         tab_control.pack(expand=True, fill="both", padx=10, pady=10)
+        self.tab_control = tab_control
+        self._tab_builders = {}
+        self.acc_table = self.tx_table = self.loan_table = self.audit_table = None
+        self.report_text = None
 
         # Accounts tab
         self.accounts_tab = ctk.CTkFrame(tab_control)
         tab_control.add(self.accounts_tab, text="Accounts")
-        self._build_accounts_tab()
+        self._tab_builders[str(self.accounts_tab)] = self._build_accounts_tab
 
         # Transactions tab
         self.trans_tab = ctk.CTkFrame(tab_control)
         tab_control.add(self.trans_tab, text="Transactions")
-        self._build_transactions_tab()
+        self._tab_builders[str(self.trans_tab)] = self._build_transactions_tab
 
         # Loans tab
         self.loans_tab = ctk.CTkFrame(tab_control)
         tab_control.add(self.loans_tab, text="Loans")
-        self._build_loans_tab()
+        self._tab_builders[str(self.loans_tab)] = self._build_loans_tab
 
         # Reports tab
         self.reports_tab = ctk.CTkFrame(tab_control)
         tab_control.add(self.reports_tab, text="Reports")
-        self._build_reports_tab()
+        self._tab_builders[str(self.reports_tab)] = self._build_reports_tab
 
         # Audit tab
         self.audit_tab = ctk.CTkFrame(tab_control)
         tab_control.add(self.audit_tab, text="Audit Logs")
-        self._build_audit_tab()
+        self._tab_builders[str(self.audit_tab)] = self._build_audit_tab
 
         # Settings
         self.settings_tab = ctk.CTkFrame(tab_control)
         tab_control.add(self.settings_tab, text="Settings")
-        self._build_settings_tab()
+        self._tab_builders[str(self.settings_tab)] = self._build_settings_tab
+        tab_control.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._on_tab_changed()
+        self._feed_after = self.after(FEED_POLL_MS, self._poll_feed)
+
+    def _on_tab_changed(self, event=None):
+        build = self._tab_builders.pop(self.tab_control.select(), None)
+        if build is not None:
+            build()
+
+    # ---------- Live refresh ----------
+    # Every FEED_POLL_MS the feed reports rows added or changed since the last
+    # poll, by this workstation or any other; tabs patch them into what they
+    # show instead of reloading.
+    def _poll_feed(self):
+        self._pull_changes()
+        self._feed_after = self.after(FEED_POLL_MS, self._poll_feed)
+
+    # poll now (e.g. right after our own write) without waiting for the timer
+    def _pull_changes(self):
+        if self.feed is not None:
+            self.tasks.submit(self.feed.poll, key="feed", on_done=self._apply_feed,
+                              on_error=lambda e: print("change feed error:", e))
+
+    def _apply_feed(self, changes):
+        views = {"accounts": (self.acc_table, self._refresh_accounts),
+                 "transactions": (self.tx_table, self._refresh_tx),
+                 "loans": (self.loan_table, self._refresh_loans),
+                 "audit_logs": (self.audit_table, self._refresh_audit)}
+        for table, change in changes.items():
+            table_view, reload = views[table]
+            if table_view is None:  # tab not opened yet; it loads fresh when it is
+                continue
+            if change["reset"]:
+                reload()
+            else:
+                table_view.apply_changes(change["new"], change["changed"], change["deleted"])
+        if self.report_text is not None and changes.keys() & {"accounts", "transactions", "loans"}:
+            self._report_summary()
+
+    def _stop_feed(self):
+        if self._feed_after is not None:
+            self.after_cancel(self._feed_after)
+            self._feed_after = None
+        if self.feed is not None:
+            self.tasks.cancel("feed")
+            feed, self.feed = self.feed, None
+            self.tasks.submit(feed.close)
 
     def _logout(self):
-        backend.log_action(self.admin_user, "logout")
+        self._stop_feed()
+        self.tasks.submit(self.api.log_action, self.admin_user, "logout")
         self.admin_user = None
         self._build_login()
 
@@ -154,11 +548,14 @@ class AdminApp(ctk.CTk):
 
         # accounts list
         ctk.CTkLabel(right, text="Existing Accounts", font=("Segoe UI", 12, "bold")).pack(anchor="w")
+        self.acc_search = ctk.CTkEntry(right, placeholder_text="Search name, email, phone or account no.")
+        self.acc_search.pack(fill="x", pady=(0, 6))
+        self.acc_search.bind("<KeyRelease>", self._on_account_search)
+        self._acc_search_after = None
         cols = ("id","account_no","name","email","phone","balance","created_at")
-        self.acc_tree = ttk.Treeview(right, columns=cols, show="headings")
-        for c in cols:
-            self.acc_tree.heading(c, text=c)
-        self.acc_tree.pack(expand=True, fill="both")
+        self.acc_table = VirtualTable(right, cols, self.api.get_accounts_page, runner=self.tasks)
+        self.acc_tree = self.acc_table.tree
+        self.acc_table.pack(expand=True, fill="both")
         btn_frame = ctk.CTkFrame(right)
         btn_frame.pack(fill="x", pady=6)
         ctk.CTkButton(btn_frame, text="Refresh", command=self._refresh_accounts).pack(side="left", padx=6)
@@ -171,30 +568,47 @@ class AdminApp(ctk.CTk):
         email = self.acc_email.get().strip()
         phone = self.acc_phone.get().strip()
         try:
-            balance = float(self.acc_balance.get())
+            balance = backend.to_money(self.acc_balance.get())
         except:
-            balance = 0.0
+            balance = backend.Money(0)
         if not name:
             messagebox.showwarning("Validation", "Name is required")
             return
-        acc_no = backend.generate_account_no()
-        ok = backend.create_account(acc_no, name, email, phone, balance)
-        if ok:
-            messagebox.showinfo("Success", f"Account created: {acc_no}")
-            self.acc_name.delete(0, "end")
-            self.acc_email.delete(0, "end")
-            self.acc_phone.delete(0, "end")
-            self.acc_balance.delete(0, "end")
-            self._refresh_accounts()
-        else:
-            messagebox.showerror("Error", "Could not create account")
-
+        def create():
+            acc_no = self.api.generate_account_no()
+            return acc_no, self.api.create_account(acc_no, name, email, phone, balance)
+        def done(result):
+            acc_no, ok = result
+            if ok:
+                messagebox.showinfo("Success", f"Account created: {acc_no}")
+                self.acc_name.delete(0, "end")
+                self.acc_email.delete(0, "end")
+                self.acc_phone.delete(0, "end")
+                self.acc_balance.delete(0, "end")
+                self._refresh_accounts()
+            else:
+                messagebox.showerror("Error", "Could not create account")
+        self.tasks.submit(create, on_done=done)
+
+    # search box empty -> page through all accounts, otherwise show the
+    # ranked search hits. Both use the table's key, so whichever was asked
+    # for last wins.
     def _refresh_accounts(self):
-        for r in self.acc_tree.get_children():
-            self.acc_tree.delete(r)
-        rows = backend.get_accounts()
-        for r in rows:
-            self.acc_tree.insert("", "end", values=r)
+        q = self.acc_search.get().strip()
+        if not q:
+            self.acc_table.refresh()
+            return
+        self.tasks.submit(self.api.search_accounts, q, key=self.acc_table.key, on_done=self.acc_table.show_rows)
+
+    # search-as-you-type: restart the timer on every key, search when it fires
+    def _on_account_search(self, event=None):
+        if self._acc_search_after is not None:
+            self.after_cancel(self._acc_search_after)
+        self._acc_search_after = self.after(SEARCH_DEBOUNCE_MS, self._run_account_search)
+
+    def _run_account_search(self):
+        self._acc_search_after = None
+        self._refresh_accounts()
 
     def _edit_account(self):
         sel = self.acc_tree.selection()
@@ -208,8 +622,8 @@ class AdminApp(ctk.CTk):
         phone = simpledialog.askstring("Edit phone", "Phone:", initialvalue=item['values'][4])
         if name is None:
             return
-        backend.update_account(acc_id, name=name, email=email, phone=phone)
-        self._refresh_accounts()
+        self.tasks.submit(lambda: self.api.update_account(acc_id, name=name, email=email, phone=phone),
+                          on_done=lambda ok: self._pull_changes())
 
     def _delete_account(self):
         sel = self.acc_tree.selection()
@@ -219,8 +633,7 @@ class AdminApp(ctk.CTk):
         item = self.acc_tree.item(sel[0])
         acc_id = item['values'][0]
         if messagebox.askyesno("Confirm", "Delete account?"):
-            backend.delete_account(acc_id)
-            self._refresh_accounts()
+            self.tasks.submit(self.api.delete_account, acc_id, on_done=lambda ok: self._pull_changes())
 
     # ---------- Transactions Tab ----------
     def _build_transactions_tab(self):
@@ -238,35 +651,53 @@ class AdminApp(ctk.CTk):
                   command=lambda: self._do_tx("deposit")).pack(side="left", padx=6)
         ctk.CTkButton(top, text="Withdraw",
                   command=lambda: self._do_tx("withdraw")).pack(side="left", padx=6)
-
-        self.tx_tree = ttk.Treeview(self.trans_tab, columns=("id","account_no","type","amount","timestamp","note"), show="headings")
-        for c in ("id","account_no","type","amount","timestamp","note"):
-            self.tx_tree.heading(c, text=c)
-        self.tx_tree.pack(expand=True, fill="both", padx=8, pady=8)
+        ctk.CTkLabel(top, text="To:").pack(side="left")
+        self.tx_to_account = ctk.CTkEntry(top, width=100)
+        self.tx_to_account.pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Transfer", command=self._do_transfer).pack(side="left", padx=6)
+
+        self.tx_table = VirtualTable(self.trans_tab, ("id","account_no","type","amount","timestamp","note"),
+                                     self.api.get_transactions_page, runner=self.tasks, newest_first=True)
+        self.tx_tree = self.tx_table.tree
+        self.tx_table.pack(expand=True, fill="both", padx=8, pady=8)
         ctk.CTkButton(self.trans_tab, text="Refresh", command=self._refresh_tx).pack(pady=4)
         self._refresh_tx()
 
     def _do_tx(self, ttype):
         acc = self.tx_account_no.get().strip()
         try:
-            amt = float(self.tx_amount.get())
+            amt = backend.to_money(self.tx_amount.get())
         except:
             messagebox.showerror("Invalid", "Enter a numeric amount")
             return
-        ok, msg = backend.add_transaction(acc, ttype, amt, note=f"By {self.admin_user}")
-        if ok:
-            messagebox.showinfo("Success", msg)
-            self._refresh_tx()
-            self._refresh_accounts()
-        else:
-            messagebox.showerror("Error", msg)
+        def done(result):
+            ok, msg = result
+            if ok:
+                messagebox.showinfo("Success", msg)
+                self._pull_changes()
+            else:
+                messagebox.showerror("Error", msg)
+        self.tasks.submit(self.api.add_transaction, acc, ttype, amt, f"By {self.admin_user}", on_done=done)
+
+    def _do_transfer(self):
+        acc = self.tx_account_no.get().strip()
+        to_acc = self.tx_to_account.get().strip()
+        try:
+            amt = backend.to_money(self.tx_amount.get())
+        except:
+            messagebox.showerror("Invalid", "Enter a numeric amount")
+            return
+        def done(result):
+            ok, msg = result
+            if ok:
+                messagebox.showinfo("Success", msg)
+                self._pull_changes()
+            else:
+                messagebox.showerror("Error", msg)
+        self.tasks.submit(self.api.transfer, acc, to_acc, amt, f"By {self.admin_user}", on_done=done)
 
     def _refresh_tx(self):
-        for r in self.tx_tree.get_children():
-            self.tx_tree.delete(r)
-        rows = backend.get_transactions(200)
-        for r in rows:
-            self.tx_tree.insert("", "end", values=r)
+        self.tx_table.refresh()
 
     # ---------- Loans Tab ----------
     def _build_loans_tab(self):
@@ -280,37 +711,49 @@ class AdminApp(ctk.CTk):
         ctk.CTkLabel(top, text="Amount:").pack(side="left")
         self.loan_amt = ctk.CTkEntry(top, width=100)
         self.loan_amt.pack(side="left", padx=6)
+        ctk.CTkLabel(top, text="Rate %/yr:").pack(side="left")
+        self.loan_rate = ctk.CTkEntry(top, width=60)
+        self.loan_rate.insert(0, "0")
+        self.loan_rate.pack(side="left", padx=6)
+        ctk.CTkLabel(top, text="Months:").pack(side="left")
+        self.loan_term = ctk.CTkEntry(top, width=50)
+        self.loan_term.insert(0, "12")
+        self.loan_term.pack(side="left", padx=6)
+        self.loan_schedule = ctk.StringVar(value=backend.LOAN_SCHEDULES[0])
+        ctk.CTkOptionMenu(top, values=list(backend.LOAN_SCHEDULES), variable=self.loan_schedule,
+                          width=100).pack(side="left", padx=6)
         ctk.CTkButton(top, text="Request Loan", command=self._request_loan).pack(side="left", padx=6)
         # loan list
-        cols = ("id","account_no","amount","status","created_at","updated_at")
-        self.loan_tree = ttk.Treeview(self.loans_tab, columns=cols, show="headings")
-        for c in cols:
-            self.loan_tree.heading(c, text=c)
-        self.loan_tree.pack(expand=True, fill="both", padx=8, pady=8)
+        cols = ("id","account_no","amount","status","created_at","updated_at",
+                "rate_bps","term_months","next_payment","next_due_date","accrued_interest")
+        self.loan_table = VirtualTable(self.loans_tab, cols, self.api.get_loans_page, runner=self.tasks,
+                                       newest_first=True)
+        self.loan_tree = self.loan_table.tree
+        self.loan_table.pack(expand=True, fill="both", padx=8, pady=8)
         btn_frame = ctk.CTkFrame(self.loans_tab)
         btn_frame.pack(fill="x")
         ctk.CTkButton(btn_frame, text="Refresh", command=self._refresh_loans).pack(side="left", padx=6)
         ctk.CTkButton(btn_frame, text="Approve", command=lambda: self._change_loan("approved")).pack(side="left", padx=6)
         ctk.CTkButton(btn_frame, text="Mark Paid", command=lambda: self._change_loan("paid")).pack(side="left", padx=6)
+        ctk.CTkButton(btn_frame, text="Schedule", command=self._show_loan_schedule).pack(side="left", padx=6)
         self._refresh_loans()
 
     def _request_loan(self):
         acc = self.loan_acc.get().strip()
         try:
-            amt = float(self.loan_amt.get())
+            amt = backend.to_money(self.loan_amt.get())
+            rate_bps = int(round(float(self.loan_rate.get() or 0) * 100))
+            term = int(self.loan_term.get())
         except:
-            messagebox.showerror("Invalid", "Enter valid amount")
+            messagebox.showerror("Invalid", "Enter valid amount, rate and months")
             return
-        backend.create_loan(acc, amt)
-        messagebox.showinfo("Requested", "Loan requested")
-        self._refresh_loans()
+        def done(ok):
+            messagebox.showinfo("Requested", "Loan requested")
+            self._pull_changes()
+        self.tasks.submit(self.api.create_loan, acc, amt, rate_bps, term, self.loan_schedule.get(), on_done=done)
 
     def _refresh_loans(self):
-        for r in self.loan_tree.get_children():
-            self.loan_tree.delete(r)
-        rows = backend.get_loans()
-        for r in rows:
-            self.loan_tree.insert("", "end", values=r)
+        self.loan_table.refresh()
 
     def _change_loan(self, status):
         sel = self.loan_tree.selection()
@@ -319,9 +762,30 @@ class AdminApp(ctk.CTk):
             return
         item = self.loan_tree.item(sel[0])
         loan_id = item['values'][0]
-        backend.update_loan_status(loan_id, status)
-        messagebox.showinfo("OK", f"Loan {loan_id} -> {status}")
-        self._refresh_loans()
+        def done(ok):
+            if not ok:
+                messagebox.showerror("Error", f"Loan {loan_id} not found")
+                return
+            messagebox.showinfo("OK", f"Loan {loan_id} -> {status}")
+            self._pull_changes()
+        self.tasks.submit(self.api.update_loan_status, loan_id, status, on_done=done)
+
+    def _show_loan_schedule(self):
+        sel = self.loan_tree.selection()
+        if not sel:
+            messagebox.showwarning("Select", "Select a loan")
+            return
+        loan_id = self.loan_tree.item(sel[0])['values'][0]
+        def done(rows):
+            win = ctk.CTkToplevel(self)
+            win.title(f"Loan {loan_id} schedule")
+            text = ctk.Text(win, width=90, height=30)
+            text.pack(expand=True, fill="both")
+            lines = [f"{'#':>4} {'due':<12}{'payment':>14}{'principal':>14}{'interest':>12}{'balance':>16}"]
+            for period, due, payment, principal, interest, balance in rows:
+                lines.append(f"{period:>4} {due:<12}{str(payment):>14}{str(principal):>14}{str(interest):>12}{str(balance):>16}")
+            text.insert("1.0", "\n".join(lines))
+        self.tasks.submit(self.api.get_loan_schedule, loan_id, on_done=done)
 
     # ---------- Reports ----------
     def _build_reports_tab(self):
@@ -334,20 +798,17 @@ class AdminApp(ctk.CTk):
         self._report_summary()
 
     def _report_summary(self):
+        self.tasks.submit(self.api.get_report_summary, key="report", on_done=self._show_report)
+
+    def _show_report(self, report):
         self.report_text.delete("1.0", "end")
-        total_deposits = backend.total_deposits()
-        total_withdraws = backend.total_withdraws()
-        accounts = backend.get_accounts()
-        loans = backend.get_loans()
         summary = f"Summary at {datetime.datetime.utcnow().isoformat()} UTC\n\n"
-        summary += f"Total accounts: {len(accounts)}\n"
-        summary += f"Total deposits: {total_deposits}\n"
-        summary += f"Total withdrawals: {total_withdraws}\n"
-        summary += f"Loans: {len(loans)} (pending/approved/paid) breakdown:\n"
-        statuses = {}
-        for L in loans:
-            statuses[L[3]] = statuses.get(L[3], 0) + 1
-        for k,v in statuses.items():
+        summary += f"Total accounts: {report['accounts']}\n"
+        summary += f"Total deposits: {report['deposits']}\n"
+        summary += f"Total withdrawals: {report['withdraws']}\n"
+        summary += f"Today ({report['day']}): deposits {report['day_deposits']}, withdrawals {report['day_withdraws']}\n"
+        summary += f"Loans: {report['loans_total']} (pending/approved/paid) breakdown:\n"
+        for k,v in report['loans'].items():
             summary += f"  {k}: {v}\n"
         self.report_text.insert("1.0", summary)
 
@@ -356,25 +817,178 @@ class AdminApp(ctk.CTk):
         for w in self.audit_tab.winfo_children():
             w.destroy()
         ctk.CTkButton(self.audit_tab, text="Refresh", command=self._refresh_audit).pack(pady=6)
-        self.audit_tree = ttk.Treeview(self.audit_tab, columns=("id","admin","action","timestamp"), show="headings")
-        for c in ("id","admin","action","timestamp"):
-            self.audit_tree.heading(c, text=c)
-        self.audit_tree.pack(expand=True, fill="both", padx=8, pady=8)
+        self.audit_table = VirtualTable(self.audit_tab, ("id","admin","action","timestamp"),
+                                        self.api.get_audit_logs_page, runner=self.tasks, newest_first=True)
+        self.audit_tree = self.audit_table.tree
+        self.audit_table.pack(expand=True, fill="both", padx=8, pady=8)
         self._refresh_audit()
 
     def _refresh_audit(self):
-        for r in self.audit_tree.get_children():
-            self.audit_tree.delete(r)
-        rows = backend.get_audit_logs(200)
-        for r in rows:
-            self.audit_tree.insert("", "end", values=r)
+        self.audit_table.refresh()
 
     # ---------- Settings ----------
     def _build_settings_tab(self):
         for w in self.settings_tab.winfo_children():
             w.destroy()
         ctk.CTkLabel(self.settings_tab, text="Settings", font=("Segoe UI", 14, "bold")).pack(pady=8)
-        ctk.CTkLabel(self.settings_tab, text="(You can add more settings here)").pack()
+
+        # Bulk import / export (CSV or JSON lines, optionally .gz)
+        data = ctk.CTkFrame(self.settings_tab)
+        data.pack(fill="x", padx=8, pady=(0, 8))
+        io_buttons = [
+            ctk.CTkButton(data, text="Import accounts...", command=lambda: self._import_file("accounts")),
+            ctk.CTkButton(data, text="Import transactions...", command=lambda: self._import_file("transactions")),
+            ctk.CTkButton(data, text="Export accounts...", command=lambda: self._export_table("accounts")),
+            ctk.CTkButton(data, text="Export transactions...", command=lambda: self._export_table("transactions")),
+        ]
+        for button in io_buttons:
+            button.pack(side="left", padx=6, pady=6)
+        self.io_label = ctk.CTkLabel(data, text="")
+        self.io_label.pack(side="left", padx=12)
+        if SERVICE_ADDRESS:
+            for button in io_buttons:
+                button.configure(state="disabled")
+            self.io_label.configure(text="Off in service mode: run backend.py import-*/export on the service host")
+
+        # Performance metrics
+        bar = ctk.CTkFrame(self.settings_tab)
+        bar.pack(fill="x", padx=8)
+        self.instrument_var = ctk.BooleanVar(value=backend.INSTRUMENT)
+        ctk.CTkSwitch(bar, text="Instrumentation", variable=self.instrument_var,
+                      command=self._toggle_instrumentation).pack(side="left", padx=6, pady=6)
+        ctk.CTkLabel(bar, text="Slow query ms:").pack(side="left", padx=(12,2))
+        self.slow_ms_entry = ctk.CTkEntry(bar, width=70)
+        self.slow_ms_entry.insert(0, str(backend.SLOW_QUERY_MS))
+        self.slow_ms_entry.pack(side="left")
+        ctk.CTkButton(bar, text="Refresh", width=80, command=self._refresh_metrics).pack(side="left", padx=6)
+        ctk.CTkButton(bar, text="Reset", width=80, command=self._reset_metrics).pack(side="left", padx=6)
+        ctk.CTkButton(bar, text="Export...", width=80, command=self._export_metrics).pack(side="left", padx=6)
+
+        self.velocity_label = ctk.CTkLabel(self.settings_tab, text="", anchor="w")
+        self.velocity_label.pack(fill="x", padx=14)
+
+        cols = ("operation",) + backend.METRIC_COLUMNS
+        self.metrics_tree = ttk.Treeview(self.settings_tab, columns=cols, show="headings")
+        for c in cols:
+            self.metrics_tree.heading(c, text=c)
+            self.metrics_tree.column(c, width=180 if c == "operation" else 80, anchor="w" if c == "operation" else "e")
+        self.metrics_tree.pack(expand=True, fill="both", padx=8, pady=8)
+        self._refresh_metrics()
+
+    # Imports/exports run on the TaskRunner; the worker only stores a row
+    # count, which the Tk loop shows every IO_POLL_MS.
+    def _import_file(self, table):
+        if self._io_busy:
+            messagebox.showwarning("Busy", "An import or export is already running")
+            return
+        path = filedialog.askopenfilename(filetypes=IO_FILETYPES)
+        if not path:
+            return
+        apply = True
+        if table == "transactions":
+            apply = messagebox.askyesnocancel(
+                "Import transactions",
+                "Post these transactions to account balances?\n\n"
+                "Yes: post them like deposits/withdrawals (overdrafts and rows over a velocity limit are rejected)\n"
+                "No: record them as history only (balances already include them)")
+            if apply is None:
+                return
+        def run():
+            if table == "accounts":
+                return backend.import_accounts(path, progress=self._io_progress, admin=self.admin_user)
+            return backend.import_transactions(path, progress=self._io_progress, apply=apply, admin=self.admin_user)
+        def done(summary):
+            self._io_finish()
+            lines = [f"{summary['imported']:,} of {summary['rows']:,} rows imported, {summary['rejected']:,} rejected"]
+            lines += [f"line {line}: {message}" for line, message in summary["errors"][:10]]
+            if summary["rejected"]:
+                messagebox.showwarning("Import", "\n".join(lines))
+            else:
+                messagebox.showinfo("Import", lines[0])
+            self._pull_changes()
+        self._io_start(f"Importing {table}")
+        self.tasks.submit(run, on_done=done, on_error=self._io_failed)
+
+    def _export_table(self, table):
+        if self._io_busy:
+            messagebox.showwarning("Busy", "An import or export is already running")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".csv", initialfile=f"{table}.csv",
+                                            filetypes=IO_FILETYPES)
+        if not path:
+            return
+        def done(n):
+            self._io_finish()
+            messagebox.showinfo("Export", f"{n:,} {table} written to {path}")
+        self._io_start(f"Exporting {table}")
+        self.tasks.submit(lambda: backend.export_table(table, path, progress=self._io_progress),
+                          on_done=done, on_error=self._io_failed)
+
+    def _io_progress(self, rows):  # called on the worker thread
+        self._io_rows = rows
+
+    def _io_start(self, label):
+        self._io_busy = True
+        self._io_rows = 0
+        self._watch_io(label)
+
+    def _watch_io(self, label):
+        if not self._io_busy or not self.io_label.winfo_exists():
+            return
+        self.io_label.configure(text=f"{label}: {self._io_rows:,} rows")
+        self.after(IO_POLL_MS, lambda: self._watch_io(label))
+
+    def _io_finish(self):
+        self._io_busy = False
+        if self.io_label.winfo_exists():
+            self.io_label.configure(text="")
+
+    def _io_failed(self, exc):
+        self._io_finish()
+        messagebox.showerror("Error", str(exc))
+
+    def _toggle_instrumentation(self):
+        try:
+            backend.SLOW_QUERY_MS = float(self.slow_ms_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Slow query threshold must be a number")
+            return
+        backend.set_instrumentation(self.instrument_var.get())
+
+    def _refresh_metrics(self):
+        snap = backend.metrics_snapshot()
+        self.metrics_tree.delete(*self.metrics_tree.get_children())
+        for name in sorted(snap, key=lambda n: -snap[n]["avg_ms"] * snap[n]["calls"]):
+            row = snap[name]
+            self.metrics_tree.insert("", "end", values=(name,) + tuple(
+                row[c] if isinstance(row[c], int) else f"{row[c]:.2f}" for c in backend.METRIC_COLUMNS))
+        self.tasks.submit(self.api.velocity_stats, key="velocity", on_done=self._show_velocity)
+
+    def _show_velocity(self, velocity):
+        if not self.velocity_label.winfo_exists():
+            return
+        if velocity["rules"]:
+            rules = ", ".join(f"{label}: {n:,}" for label, n in velocity["rules"])
+            self.velocity_label.configure(text=f"Velocity limits: {velocity['checks']:,} checks, "
+                                               f"{velocity['rejections']:,} rejected ({rules})")
+        else:
+            self.velocity_label.configure(text="Velocity limits: none configured")
+
+    def _reset_metrics(self):
+        backend.reset_metrics()
+        self.tasks.submit(self.api.reset_velocity_stats, on_done=lambda _: self._refresh_metrics())
+
+    def _export_metrics(self):
+        path = filedialog.asksaveasfilename(defaultextension=".txt", initialfile="metrics.txt",
+                                            filetypes=[("Text", "*.txt")])
+        if not path:
+            return
+        try:
+            backend.export_metrics(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Export failed: {e}")
+            return
+        messagebox.showinfo("Exported", f"Metrics written to {path}")
         
 if __name__ == "__main__":
     app = AdminApp()
@@ -0,0 +1,285 @@
+# Balance reconciliation: every account's balance must equal its opening
+# balance plus the net of its transactions (deposits +, withdrawals -,
+# transfer legs are already signed).
+#
+#   python reconcile.py                         # only transactions since the last run
+#   python reconcile.py --full                  # recompute every account from scratch
+#   python reconcile.py --full --workers 8 --db big.db
+#
+# recon_checkpoints keeps each account's net up to recon_runs.last_tx_id (the
+# high-water mark of the last run) and the newest transaction counted. An
+# incremental run reads, in one snapshot, every balance, the checkpoints and
+# the net of transactions past the mark, so it only touches new transactions.
+# It still compares every account, so a balance changed behind the ledger's
+# back is caught the same night; an edited old transaction is only caught by
+# --full.
+#
+# --full splits the transactions up to the mark into id ranges, one worker
+# process per range: a sequential scan by id with GROUP BY account_no is
+# about twice as fast as walking the account index, and ids at or below the
+# mark never change, so the workers don't need the parent's snapshot. The
+# parent merges the per-range sums with NumPy (a dict loop without it) and
+# compares against the balances it read with the mark.
+#
+# New checkpoints from --full are written to a staging table in short
+# transactions and swapped in at the end, so tellers never wait on one big
+# write. A run whose mark has been overtaken by another run (two runs at
+# once) is discarded. The first run is always full; accounts that predate
+# opening_balance get balance - net as their opening balance then.
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import backend
+from backend import Money
+
+# Transaction id ranges for --full; None = one per worker. Each range returns
+# a partial sum for nearly every account, so more ranges than workers only
+# adds merge work.
+RECON_SHARDS = None
+RECON_WORKERS = os.cpu_count() or 2
+RECON_WRITE_CHUNK = 20_000      # checkpoint rows per write transaction
+RECON_REPORT_LIMIT = 1000       # mismatches returned in the summary (all are stored)
+
+SIGNED_AMOUNT = "CASE type WHEN 'withdraw' THEN -amount ELSE amount END"
+NET_SQL = f"""SELECT account_no, SUM({SIGNED_AMOUNT}), MAX(id), COUNT(*) FROM transactions
+              WHERE id > ? AND id <= ? GROUP BY account_no;"""
+CHECKPOINT_COLUMNS = """account_no TEXT PRIMARY KEY,
+            last_tx_id INTEGER NOT NULL,
+            net MONEY NOT NULL"""
+
+
+def _connect_ro(db):
+    conn = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only = ON;")
+    conn.execute("PRAGMA cache_size = -64000;")
+    conn.execute("PRAGMA mmap_size = 268435456;")
+    return conn
+
+
+# Worker: net per account of transactions lo < id <= hi.
+# -> [(account_no, net, last_id, count)]
+def net_shard(db, lo, hi):
+    conn = _connect_ro(db)
+    try:
+        return conn.execute(NET_SQL, (lo, hi)).fetchall()
+    finally:
+        conn.close()
+
+
+def _high_water(cur):
+    cur.execute("SELECT last_tx_id FROM recon_runs ORDER BY id DESC LIMIT 1;")
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+# Everything compared in one run, as parallel columns. Accounts come with
+# their checkpoint (0 net, last id 0 when there is none or for --full).
+class _Ledger:
+    def __init__(self, rows):
+        self.nos = [r[0] for r in rows]
+        self.index = {no: i for i, no in enumerate(self.nos)}
+        self.balance = [int(r[1] or 0) for r in rows]
+        self.opening = [r[2] for r in rows]
+        self.net = [int(r[3] or 0) for r in rows]
+        self.last = [r[4] or 0 for r in rows]
+        self.touched = set()
+        self.orphans = 0
+
+    # add [(account_no, net, last_id, count)]; -> transactions counted
+    def add(self, parts):
+        np = backend._numpy()
+        counted = sum(p[3] for p in parts)
+        idx = [self.index.get(p[0], -1) for p in parts]
+        known = [(i, p) for i, p in zip(idx, parts) if i >= 0]
+        self.orphans += sum(p[3] for i, p in zip(idx, parts) if i < 0)
+        if np is not None and known:
+            if not isinstance(self.net, np.ndarray):
+                self.net = np.array(self.net, dtype=np.int64)
+                self.last = np.array(self.last, dtype=np.int64)
+            where = np.fromiter((i for i, _ in known), dtype=np.int64, count=len(known))
+            np.add.at(self.net, where, np.fromiter((p[1] or 0 for _, p in known), dtype=np.int64, count=len(known)))
+            np.maximum.at(self.last, where, np.fromiter((p[2] for _, p in known), dtype=np.int64, count=len(known)))
+        else:
+            for i, p in known:
+                self.net[i] += p[1] or 0
+                self.last[i] = max(self.last[i], p[2])
+        self.touched.update(i for i, _ in known)
+        return counted
+
+    # -> ([(account_no, balance, expected)], [(opening, account_no)] to adopt)
+    def compare(self):
+        np = backend._numpy()
+        n = len(self.nos)
+        adopt = [i for i in range(n) if self.opening[i] is None]
+        if np is not None and n:
+            balance = np.array(self.balance, dtype=np.int64)
+            opening = np.fromiter((o or 0 for o in self.opening), dtype=np.int64, count=n)
+            expected = opening + np.asarray(self.net, dtype=np.int64)
+            bad = np.flatnonzero(balance != expected).tolist()
+            expected = expected.tolist()
+        else:
+            expected = [(o or 0) + net for o, net in zip(self.opening, self.net)]
+            bad = [i for i in range(n) if self.balance[i] != expected[i]]
+        adopting = set(adopt)
+        mismatches = [(self.nos[i], Money(self.balance[i]), Money(expected[i])) for i in bad if i not in adopting]
+        return mismatches, [(Money(self.balance[i] - int(self.net[i])), self.nos[i]) for i in adopt]
+
+    def checkpoints(self, only_touched):
+        rows = self.touched if only_touched else range(len(self.nos))
+        return [(self.nos[i], int(self.last[i]), Money(int(self.net[i]))) for i in sorted(rows) if self.last[i]]
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _write_chunks(conn, sql, rows):
+    for chunk in _chunks(rows, RECON_WRITE_CHUNK):
+        backend._begin_write(conn)
+        conn.executemany(sql, chunk)
+        conn.commit()
+
+
+# Run a reconciliation. progress(done_shards, total_shards) is called as
+# --full ranges finish. Returns a summary dict; summary["error"] is set if
+# the run was discarded.
+def reconcile(full=False, workers=None, shards=None, progress=None):
+    summary = {"mode": None, "run_id": None, "transactions": 0, "accounts": 0, "mismatch_count": 0,
+               "mismatches": [], "adopted": 0, "orphans": 0, "last_tx_id": 0, "seconds": 0.0, "error": None}
+    if backend.USE_MYSQL:
+        summary["error"] = "reconciliation is only available for SQLite"
+        return summary
+    t0 = time.perf_counter()
+    started = datetime.datetime.utcnow().isoformat()
+    backend.flush_audit()
+    conn = backend.get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN;")  # balances, checkpoints and the mark from one snapshot
+        mark = _high_water(cur)
+        full = full or mark is None
+        summary["mode"] = "full" if full else "incremental"
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM transactions;")
+        top = cur.fetchone()[0]
+        if full:
+            cur.execute("SELECT account_no, balance, opening_balance, 0, 0 FROM accounts;")
+        else:
+            cur.execute("""SELECT a.account_no, a.balance, a.opening_balance, c.net, c.last_tx_id
+                           FROM accounts a LEFT JOIN recon_checkpoints c ON c.account_no = a.account_no;""")
+        ledger = _Ledger(cur.fetchall())
+        if not full:
+            cur.execute(NET_SQL, (mark, top))
+            summary["transactions"] = ledger.add(cur.fetchall())
+        conn.rollback()
+
+        if full:
+            count = max(1, shards or RECON_SHARDS or workers or RECON_WORKERS)
+            step = max(1, -(-top // count))
+            ranges = [(lo, min(lo + step, top)) for lo in range(0, top, step)]
+            with ProcessPoolExecutor(max_workers=workers or RECON_WORKERS) as pool:
+                futures = [pool.submit(net_shard, backend.SQLITE_DB, lo, hi) for lo, hi in ranges]
+                for done, fut in enumerate(as_completed(futures), 1):
+                    summary["transactions"] += ledger.add(fut.result())
+                    if progress:
+                        progress(done, len(ranges))
+
+        mismatches, adopt = ledger.compare()
+        checkpoints = ledger.checkpoints(only_touched=not full)
+        if adopt:
+            _write_chunks(conn, "UPDATE accounts SET opening_balance = ? WHERE account_no = ? "
+                               "AND opening_balance IS NULL;", adopt)
+        if full:
+            conn.execute("DROP TABLE IF EXISTS recon_checkpoints_new;")
+            conn.execute(f"CREATE TABLE recon_checkpoints_new ({CHECKPOINT_COLUMNS}) WITHOUT ROWID;")
+            conn.commit()
+            _write_chunks(conn, "INSERT INTO recon_checkpoints_new (account_no, last_tx_id, net) VALUES (?, ?, ?);",
+                          checkpoints)
+
+        backend._begin_write(conn)
+        if _high_water(cur) != mark:
+            conn.rollback()
+            summary["error"] = "another reconciliation finished first; run again"
+            return summary
+        if full:
+            cur.execute("DROP TABLE IF EXISTS recon_checkpoints;")
+            cur.execute("ALTER TABLE recon_checkpoints_new RENAME TO recon_checkpoints;")
+        else:
+            cur.executemany("""INSERT INTO recon_checkpoints (account_no, last_tx_id, net) VALUES (?, ?, ?)
+                               ON CONFLICT (account_no) DO UPDATE
+                               SET last_tx_id = excluded.last_tx_id, net = excluded.net;""", checkpoints)
+        cur.execute("""INSERT INTO recon_runs (mode, started_at, finished_at, last_tx_id, transactions, accounts,
+                                               mismatches) VALUES (?, ?, ?, ?, ?, ?, ?);""",
+                    (summary["mode"], started, datetime.datetime.utcnow().isoformat(), top,
+                     summary["transactions"], len(ledger.nos), len(mismatches)))
+        run_id = cur.lastrowid
+        cur.executemany("INSERT INTO recon_mismatches (run_id, account_no, balance, expected) VALUES (?, ?, ?, ?);",
+                        [(run_id,) + m for m in mismatches])
+        backend.log_action("system", f"Reconciliation {summary['mode']} run {run_id}: "
+                                     f"{len(mismatches)} mismatched accounts", conn=conn)
+        conn.commit()
+        summary.update(run_id=run_id, accounts=len(ledger.nos), mismatch_count=len(mismatches),
+                       mismatches=mismatches[:RECON_REPORT_LIMIT], adopted=len(adopt), orphans=ledger.orphans,
+                       last_tx_id=top)
+    except Exception as e:
+        print("reconcile error:", e)
+        conn.rollback()
+        summary["error"] = str(e)
+    finally:
+        conn.close()
+        summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+# [(account_no, balance, expected)] flagged by a run (default: the latest).
+def get_mismatches(run_id=None, limit=None):
+    conn = backend.get_conn()
+    cur = conn.cursor()
+    if run_id is None:
+        cur.execute("SELECT MAX(id) FROM recon_runs;")
+        run_id = cur.fetchone()[0]
+    cur.execute("SELECT account_no, balance, expected FROM recon_mismatches WHERE run_id = ? "
+                "ORDER BY account_no LIMIT ?;", (run_id, -1 if limit is None else limit))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def _print_progress(done, total):
+    print(f"\r{done}/{total} ranges", end="", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Balance reconciliation")
+    parser.add_argument("--db", help="SQLite database (default: bank.db)")
+    parser.add_argument("--full", action="store_true", help="recompute every account from all transactions")
+    parser.add_argument("--shards", type=int, default=RECON_SHARDS, help="transaction id ranges for --full "
+                                                                         "(default: one per worker)")
+    parser.add_argument("--workers", type=int, default=RECON_WORKERS)
+    parser.add_argument("--show", type=int, default=20, help="mismatches to print")
+    args = parser.parse_args()
+    if args.db:
+        backend.SQLITE_DB = args.db
+    backend.init_db()
+    summary = reconcile(args.full, args.workers, args.shards, _print_progress)
+    if summary["mode"] == "full":
+        print()
+    if summary["error"]:
+        print("reconciliation failed:", summary["error"])
+        sys.exit(2)
+    print(f"run {summary['run_id']} ({summary['mode']}): {summary['accounts']:,} accounts, "
+          f"{summary['transactions']:,} transactions up to #{summary['last_tx_id']} in {summary['seconds']:.1f}s")
+    if summary["adopted"]:
+        print(f"{summary['adopted']:,} accounts had no opening balance; adopted balance - net")
+    if summary["orphans"]:
+        print(f"{summary['orphans']:,} transactions belong to deleted accounts")
+    print(f"{summary['mismatch_count']:,} mismatched accounts")
+    for account_no, balance, expected in summary["mismatches"][:args.show]:
+        print(f"  {account_no}: balance {balance}, expected {expected} (off by {Money(balance - expected)})")
+    backend.shutdown_audit()
+    sys.exit(1 if summary["mismatch_count"] else 0)
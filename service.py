@@ -0,0 +1,655 @@
+# Local service API: one process owns the database and teller workstations
+# talk to it over a socket, instead of every frontend.py opening bank.db and
+# fighting over its write lock on its own.
+#
+#   python service.py serve                             # 127.0.0.1:8765
+#   python service.py serve --db big.db --port 9000
+#   BANK_SERVICE=127.0.0.1:8765 python frontend.py      # AdminApp as a client
+#
+#   python service.py load --tellers 300 --seconds 20   # load generator (own server, throwaway db)
+#   python service.py load --address 127.0.0.1:8765     # ... against a running service
+#   python service.py load --direct --tellers 300       # same load, tellers calling backend.py directly
+#
+# Protocol: one JSON object per line each way.
+#   -> {"id": 7, "op": "add_transaction", "args": ["AC1000009", "deposit", {"$money": 50000}, ""]}
+#   <- {"id": 7, "result": [true, "OK"]}   or   {"id": 7, "error": "ValueError: ..."}
+# Money travels as {"$money": centavos}, tuples come back as lists. A client
+# may pipeline requests; replies carry the request's id and can come back
+# out of order.
+#
+# Writes go through one writer task. add_transaction, transfer and
+# create_account requests that queue up while a batch is committing are
+# posted together: one BEGIN IMMEDIATE, a SAVEPOINT per request (a failed one
+# is rolled back on its own and answered with its usual result) and one
+# commit for the lot, so a few hundred tellers cost one lock round and one
+# WAL commit instead of a few hundred. Other writes (edits, loans, audit
+# entries, account numbers) run one at a time on the same writer, in arrival
+# order. Reads run on SERVICE_READERS threads; in WAL mode they never wait
+# for the writer.
+#
+# The only authentication is authenticate_admin() in the client: keep the
+# service on 127.0.0.1 or a trusted network.
+import argparse
+import asyncio
+import datetime
+import functools
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import backend
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_READERS = 4             # threads serving reads
+SERVICE_BATCH_MAX = 500         # writes per shared commit
+SERVICE_LINGER = 0.0            # seconds the writer waits for more writes before a batch
+SERVICE_QUEUE = 10_000          # queued writes before clients have to wait
+SERVICE_MAX_LINE = 1 << 20      # longest request line, bytes
+SERVICE_TIMEOUT = 30            # client socket timeout, seconds
+SERVICE_FEED_IDLE = 600         # change feeds not polled for this long are closed
+
+# posted together, one SAVEPOINT each
+BATCHED_OPS = {"add_transaction", "transfer", "create_account"}
+# other writes, one at a time on the writer
+WRITE_OPS = {"update_account", "delete_account", "create_loan", "update_loan_status", "log_action",
+             "generate_account_no", "reset_velocity_stats"}
+READ_OPS = {"authenticate_admin", "get_account", "get_account_by_id", "get_transactions", "get_loans",
+            "get_loan_schedule", "get_report_summary", "search_accounts", "get_accounts_page",
+            "get_transactions_page", "get_loans_page", "get_audit_logs_page", "velocity_stats"}
+
+
+class ServiceError(Exception):
+    pass
+
+
+def _encode(value):
+    if isinstance(value, backend.Money):
+        return {"$money": int(value)}
+    if isinstance(value, (list, tuple, set)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1 and "$money" in value:
+            return backend.Money(value["$money"])
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def _error(e):
+    return str(e) if isinstance(e, ServiceError) else f"{type(e).__name__}: {e}"
+
+
+# -> (True, result) or (False, error message)
+def _call(op, args, kwargs):
+    try:
+        return True, getattr(backend, op)(*args, **kwargs)
+    except Exception as e:
+        return False, _error(e)
+
+
+# One request inside _post_batch's transaction. -> (result, keep, account
+# row for the cache)
+def _apply(conn, op, args, kwargs):
+    if op == "create_account":
+        try:
+            row = backend._apply_create_account(conn, *args, **kwargs)
+        except Exception as e:
+            print("create_account error:", e)  # what create_account() does
+            return False, False, None
+        return True, True, row
+    apply = backend._apply_transaction if op == "add_transaction" else backend._apply_transfer
+    ok, msg = apply(conn, *args, **kwargs)
+    return (ok, msg), ok, None
+
+
+# Posts a run of batched requests in one transaction. -> one (True, result) or
+# (False, error) per request
+@backend._retry_busy
+def _post_batch(run):
+    cache = backend._account_cache
+    conn = backend.get_conn()
+    results, rows = [], []
+    begun = False
+    try:
+        backend._begin_write(conn)
+        begun = True
+        cur = conn.cursor()
+        for op, args, kwargs in run:
+            mark, audit_mark = cache.staged_mark(), len(conn.audit)
+            cur.execute("SAVEPOINT request;")
+            try:
+                result, keep, row = _apply(conn, op, args, kwargs)
+                results.append((True, result))
+            except Exception as e:
+                keep, row = False, None
+                results.append((False, _error(e)))
+            if not keep:
+                cur.execute("ROLLBACK TO SAVEPOINT request;")
+                cache.discard_staged(mark)
+                del conn.audit[audit_mark:]  # async audit rows of the undone request
+            elif row is not None and cache.enabled():
+                rows.append(row)
+            cur.execute("RELEASE SAVEPOINT request;")
+        conn.commit()
+        cache.apply_staged()
+        for row in rows:
+            cache.put(row)
+        return results
+    except Exception:
+        if begun:
+            # the velocity limiter has already counted rows this rollback removes
+            conn.rollback()
+            backend._velocity.reset()
+        raise
+    finally:
+        cache.discard_staged()
+        conn.close()
+
+
+class BankService:
+    def __init__(self, host=None, port=None, readers=None, batch_max=None, linger=None):
+        self.host = host or SERVICE_HOST
+        self.port = SERVICE_PORT if port is None else port
+        self.batch_max = batch_max or SERVICE_BATCH_MAX
+        self.linger = SERVICE_LINGER if linger is None else linger
+        self.readers = ThreadPoolExecutor(readers or SERVICE_READERS, thread_name_prefix="service-read")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="service-write")
+        self.writes = None
+        self.write_task = None
+        self.closing = False
+        self.server = None
+        self.feeds = {}         # feed id -> [ChangeFeed, last poll]
+        self.feeds_lock = threading.Lock()
+        self.stats = dict.fromkeys(("connections", "requests", "reads", "writes", "batches", "batched",
+                                    "max_batch", "errors"), 0)
+
+    async def start(self):
+        self.writes = asyncio.Queue(SERVICE_QUEUE)
+        self.write_task = asyncio.create_task(self._write_loop())
+        self.server = await asyncio.start_server(self._serve_client, self.host, self.port, limit=SERVICE_MAX_LINE)
+        self.port = self.server.sockets[0].getsockname()[1]  # port 0 = any free port
+        return self
+
+    # Writes already queued still run: the None behind them stops the write
+    # loop, and anything that got in after it is answered with an error.
+    async def close(self):
+        self.closing = True
+        self.server.close()
+        await self.server.wait_closed()
+        await self.writes.put(None)
+        await self.write_task
+        while not self.writes.empty():
+            item = self.writes.get_nowait()
+            if item is not None and not item[3].done():
+                item[3].set_result((False, "service is shutting down"))
+        self.writer.shutdown()
+        self.readers.shutdown()
+        with self.feeds_lock:
+            feeds, self.feeds = self.feeds, {}
+        for feed, _ in feeds.values():
+            feed.close()
+
+    async def _serve_client(self, reader, writer):
+        self.stats["connections"] += 1
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # line over SERVICE_MAX_LINE, or reset
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self._answer(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, line, writer):
+        req_id = None
+        try:
+            request = json.loads(line)
+            req_id = request.get("id")
+            result = await self.call(request["op"], _decode(request.get("args", [])),
+                                     _decode(request.get("kwargs", {})))
+            reply = {"id": req_id, "result": _encode(result)}
+        except Exception as e:
+            self.stats["errors"] += 1
+            reply = {"id": req_id, "error": _error(e)}
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(reply).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def call(self, op, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        self.stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        if op in BATCHED_OPS or op in WRITE_OPS:
+            if self.closing:
+                raise ServiceError("service is shutting down")
+            self.stats["writes"] += 1
+            done = loop.create_future()
+            await self.writes.put((op, args, kwargs, done))
+            ok, value = await done
+            if not ok:
+                raise ServiceError(value)
+            return value
+        if op in READ_OPS:
+            self.stats["reads"] += 1
+            return await loop.run_in_executor(self.readers, functools.partial(getattr(backend, op), *args, **kwargs))
+        if op == "feed_poll":
+            return await loop.run_in_executor(self.readers, self._feed_poll, *args)
+        if op == "feed_close":
+            return await loop.run_in_executor(self.readers, self._feed_close, *args)
+        if op == "stats":
+            return dict(self.stats, queued=self.writes.qsize(), feeds=len(self.feeds))
+        if op == "ping":
+            return "pong"
+        raise ServiceError(f"unknown op {op!r}")
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self.writes.get()
+            if item is None:
+                return
+            batch = [item]
+            if self.linger:
+                await asyncio.sleep(self.linger)
+            while len(batch) < self.batch_max and not self.writes.empty():
+                item = self.writes.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                results = await loop.run_in_executor(self.writer, self._run_writes, [item[:3] for item in batch])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                results = [(False, _error(e))] * len(batch)
+            for (*_, done), result in zip(batch, results):
+                if not done.done():
+                    done.set_result(result)
+
+    # On the writer thread, in arrival order: consecutive batched requests
+    # share a transaction, anything else runs on its own.
+    def _run_writes(self, items):
+        results, run = [], []
+        for item in items:
+            if item[0] in BATCHED_OPS:
+                run.append(item)
+                continue
+            if run:
+                results += self._post(run)
+                run = []
+            results.append(_call(*item))
+        if run:
+            results += self._post(run)
+        return results
+
+    def _post(self, run):
+        start = time.perf_counter()
+        try:
+            results = _post_batch(run)
+        except Exception as e:
+            print("service batch error:", e)
+            results = [(False, _error(e))] * len(run)
+        self.stats["batches"] += 1
+        self.stats["batched"] += len(run)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(run))
+        if backend.INSTRUMENT:
+            backend.record_metric("service_batch", time.perf_counter() - start, rows=len(run))
+        return results
+
+    # Change feeds live here, one per client feed id, so a client's polls
+    # can come in on any of its connections.
+    def _feed_poll(self, feed_id):
+        now = time.monotonic()
+        with self.feeds_lock:
+            entry = self.feeds.get(feed_id)
+            if entry is None:
+                idle = [k for k, (_, last) in self.feeds.items() if now - last > SERVICE_FEED_IDLE]
+                closing = [self.feeds.pop(k)[0] for k in idle]
+                entry = self.feeds[feed_id] = [backend.ChangeFeed(), now]
+            else:
+                closing = []
+            entry[1] = now
+        for feed in closing:
+            feed.close()
+        return entry[0].poll()
+
+    def _feed_close(self, feed_id):
+        with self.feeds_lock:
+            entry = self.feeds.pop(feed_id, None)
+        if entry is not None:
+            entry[0].close()
+        return True
+
+
+async def serve(host=None, port=None, readers=None, batch_max=None, linger=None):
+    service = await BankService(host, port, readers, batch_max, linger).start()
+    print(f"serving {backend.SQLITE_DB} on {service.host}:{service.port}", flush=True)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.close()
+
+
+# Stands in for the backend module: client.add_transaction(...) sends the
+# request and returns what backend.add_transaction() would have. Each thread
+# gets its own connection with one request in flight; a connection that
+# fails is dropped and the next call reconnects (the failed call is not
+# retried, it may have been posted).
+class ServiceClient:
+    def __init__(self, host=None, port=None, timeout=None):
+        self.host = host or SERVICE_HOST
+        self.port = port or SERVICE_PORT
+        self.timeout = timeout or SERVICE_TIMEOUT
+        self.local = threading.local()
+        self.ids = itertools.count(1)
+
+    @classmethod
+    def from_address(cls, address):
+        host, _, port = address.rpartition(":")
+        return cls(host or None, int(port))
+
+    def _stream(self):
+        stream = getattr(self.local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stream = sock.makefile("rwb")
+            self.local.sock, self.local.stream = sock, stream
+        return stream
+
+    def _drop(self):
+        stream = getattr(self.local, "stream", None)
+        if stream is not None:
+            self.local.stream = None
+            stream.close()
+            self.local.sock.close()
+
+    def call(self, op, *args, **kwargs):
+        request = {"id": next(self.ids), "op": op, "args": _encode(args)}
+        if kwargs:
+            request["kwargs"] = _encode(kwargs)
+        try:
+            stream = self._stream()
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+        except OSError:
+            self._drop()
+            raise
+        if not line:
+            self._drop()
+            raise ConnectionError("service closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise ServiceError(reply["error"])
+        return _decode(reply["result"])
+
+    def __getattr__(self, name):
+        if name not in BATCHED_OPS and name not in WRITE_OPS and name not in READ_OPS:
+            raise AttributeError(name)
+        def remote(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        remote.__name__ = name  # TaskRunner/metrics label
+        return remote
+
+    def ChangeFeed(self):
+        return RemoteFeed(self)
+
+    def stats(self):
+        return self.call("stats")
+
+    # closes this thread's connection
+    def close(self):
+        self._drop()
+
+
+# backend.ChangeFeed served by the service
+class RemoteFeed:
+    def __init__(self, client):
+        self.client = client
+        self.id = os.urandom(8).hex()
+
+    def poll(self):
+        return self.client.call("feed_poll", self.id)
+
+    def close(self):
+        self.client.call("feed_close", self.id)
+
+
+# === Load generator ===
+# Each simulated teller loops over LOAD_MIX until time is up, optionally
+# pausing a random think time between requests. Latency is per operation as
+# the teller sees it (a new account is two requests: number, then insert).
+# Errors are failed calls and accounts that weren't created; a declined
+# withdrawal is a normal answer.
+LOAD_MIX = (("deposit", 35), ("withdraw", 25), ("transfer", 10), ("get_account", 20),
+            ("get_transactions_page", 5), ("create_account", 5))
+LOAD_WRITES = {"deposit", "withdraw", "transfer", "create_account"}
+
+
+def _load_request(kind, rng, accounts):
+    account_no = rng.choice(accounts)
+    amount = backend.Money(rng.randint(100, 50_000))
+    if kind in ("deposit", "withdraw"):
+        return "add_transaction", (account_no, kind, amount, "load")
+    if kind == "transfer":
+        return "transfer", (account_no, rng.choice(accounts), amount, "load")
+    if kind == "get_account":
+        return "get_account", (account_no,)
+    if kind == "get_transactions_page":
+        return "get_transactions_page", (None, 20, True, account_no)
+    return "create_account", ("Load Teller", "", "", amount)
+
+
+async def _service_teller(n, host, port, accounts, deadline, think, samples):
+    rng = random.Random(n)
+    kinds, weights = zip(*LOAD_MIX)
+    reader, writer = await asyncio.open_connection(host, port, limit=SERVICE_MAX_LINE)
+    ids = itertools.count(1)
+
+    async def call(op, args):
+        writer.write(json.dumps({"id": next(ids), "op": op, "args": _encode(args)}).encode() + b"\n")
+        reply = json.loads(await reader.readline())
+        if "error" in reply:
+            raise ServiceError(reply["error"])
+        return reply["result"]
+
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            op, args = _load_request(kind, rng, accounts)
+            start = time.perf_counter()
+            try:
+                if op == "create_account":
+                    args = (await call("generate_account_no", ()),) + args
+                failed = await call(op, args) is False  # create_account's failure
+            except ServiceError:
+                failed = True
+            samples.append((kind, time.perf_counter() - start, failed))
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+    finally:
+        writer.close()
+
+
+async def _service_load(host, port, tellers, seconds, think):
+    samples = []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(_service_teller(n, host, port, accounts=_LOAD_ACCOUNTS, deadline=deadline,
+                                           think=think, samples=samples) for n in range(tellers)))
+    return samples, time.perf_counter() - start
+
+
+# The same load with a thread per teller calling backend.py directly, each
+# on its own connection - what separate workstations do today.
+def _direct_load(tellers, seconds, think):
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    kinds, weights = zip(*LOAD_MIX)
+
+    def teller(n):
+        rng = random.Random(n)
+        local = []
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            op, args = _load_request(kind, rng, _LOAD_ACCOUNTS)
+            start = time.perf_counter()
+            if op == "create_account":
+                args = (backend.generate_account_no(),) + args
+            ok, result = _call(op, args, {})
+            local.append((kind, time.perf_counter() - start, not ok or result is False))
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=teller, args=(n,)) for n in range(tellers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+_LOAD_ACCOUNTS = []
+
+
+def _print_load(samples, seconds):
+    print(f"{len(samples):,} requests in {seconds:.1f}s: {len(samples) / seconds:,.0f} req/s, "
+          f"{sum(failed for _, _, failed in samples):,} errors")
+    print(f"{'':<24}{'count':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    groups = [("all", samples),
+              ("writes", [s for s in samples if s[0] in LOAD_WRITES]),
+              ("reads", [s for s in samples if s[0] not in LOAD_WRITES])]
+    groups += [(kind, [s for s in samples if s[0] == kind]) for kind, _ in LOAD_MIX]
+    for name, group in groups:
+        lat = sorted(s[1] * 1000 for s in group)
+        if lat:
+            print(f"{name:<24}{len(lat):>9,}{backend._percentile(lat, 0.5):>9.2f}"
+                  f"{backend._percentile(lat, 0.95):>9.2f}{backend._percentile(lat, 0.99):>9.2f}{lat[-1]:>9.1f}")
+
+
+def _start_server(db, readers, batch_max):
+    cmd = [sys.executable, os.path.abspath(__file__), "--db", db, "serve", "--port", "0"]
+    if readers:
+        cmd += ["--readers", str(readers)]
+    if batch_max:
+        cmd += ["--batch", str(batch_max)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()  # "serving <db> on host:port"
+    if not line:
+        proc.wait()
+        raise ServiceError("service failed to start")
+    return proc, line.rsplit(" ", 1)[1].strip()
+
+
+def cmd_load(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = args.db
+        if db is None and (args.direct or not args.address):
+            import bench
+            db = os.path.join(tmpdir, "load.db")
+            bench.generate_dataset(db, args.accounts, args.transactions)
+        if db is not None:
+            backend.close_pool()
+            backend.SQLITE_DB = db
+            backend.init_db()
+        proc = None
+        address = args.address
+        if not args.direct and not address:
+            proc, address = _start_server(db, args.readers, args.batch)
+        try:
+            client = ServiceClient.from_address(address) if not args.direct else backend
+            _LOAD_ACCOUNTS[:] = [row[1] for row in client.get_accounts_page(None, args.sample)]
+            mode = "direct (thread per teller)" if args.direct else f"service at {address}"
+            print(f"{args.tellers} tellers, {args.seconds:g}s, think {args.think * 1000:g} ms, {mode}")
+            if args.direct:
+                samples, seconds = _direct_load(args.tellers, args.seconds, args.think)
+            else:
+                samples, seconds = asyncio.run(_service_load(*address.rsplit(":", 1), args.tellers,
+                                                             args.seconds, args.think))
+            _print_load(samples, seconds)
+            if not args.direct:
+                stats = client.stats()
+                if stats["batches"]:
+                    print(f"service: {stats['batches']:,} write batches, {stats['batched'] / stats['batches']:.1f} "
+                          f"requests per commit on average, largest {stats['max_batch']}")
+                client.close()
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+            backend.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bank service API")
+    parser.add_argument("--db", help="SQLite database file (default: bank.db; load: a generated one)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="run the service until interrupted")
+    p.add_argument("--host", default=SERVICE_HOST)
+    p.add_argument("--port", type=int, default=SERVICE_PORT, help="0 = any free port")
+    p.add_argument("--readers", type=int, default=SERVICE_READERS, help="threads serving reads")
+    p.add_argument("--batch", type=int, default=SERVICE_BATCH_MAX, help="most writes per commit")
+    p.add_argument("--linger", type=float, default=SERVICE_LINGER, help="seconds to wait for more writes")
+    p = sub.add_parser("load", help="simulate many tellers and report requests/s and latency")
+    p.add_argument("--address", help="host:port of a running service (default: start one)")
+    p.add_argument("--direct", action="store_true", help="call backend.py from a thread per teller instead")
+    p.add_argument("--tellers", type=int, default=200)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--think", type=float, default=0.0, help="mean pause between a teller's requests, seconds")
+    p.add_argument("--sample", type=int, default=1000, help="accounts the tellers pick from")
+    p.add_argument("--accounts", type=int, default=10_000, help="size of the generated dataset")
+    p.add_argument("--transactions", type=int, default=100_000)
+    p.add_argument("--readers", type=int, help="service read threads")
+    p.add_argument("--batch", type=int, help="service writes per commit")
+    args = parser.parse_args()
+    if args.command == "load":
+        cmd_load(args)
+        sys.exit(0)
+    if args.db:
+        backend.SQLITE_DB = args.db
+    backend.init_db()
+    try:
+        asyncio.run(serve(args.host, args.port, args.readers, args.batch, args.linger))
+    except KeyboardInterrupt:
+        pass
+    backend.shutdown_audit()
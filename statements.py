@@ -0,0 +1,187 @@
+# Month-end statements for every account, built in parallel.
+#
+#   python statements.py 2026-09                       # bank.db -> statements/2026-09/
+#   python statements.py 2026-09 --db big.db --workers 8 --shards 64
+#
+# Accounts are split into shards by id range and each shard is built by a
+# worker process on its own read-only connection. A worker streams the
+# shard's accounts joined to their transactions in (account_no, id) order and
+# writes statements to shard-NNNN.txt.part as it goes; the file is renamed to
+# shard-NNNN.txt once the shard is complete. The shard boundaries are saved in
+# manifest.json, so after a crash the same command skips finished shards and
+# rebuilds only the rest.
+#
+# Balances: closing = current balance - net of everything posted after the
+# month, opening = closing - net of the month. Both come from the same read
+# transaction, so a shard is consistent even while tellers keep posting.
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import backend
+from backend import Money
+
+STATEMENT_SHARDS = 32
+STATEMENT_WORKERS = os.cpu_count() or 2
+# The first transaction id of the month comes from backend.first_id_at();
+# the search starts this much earlier and timestamps are still checked row
+# by row.
+ID_SEARCH_SLACK = datetime.timedelta(days=1)
+
+
+def month_bounds(month):
+    start = datetime.date.fromisoformat(month + "-01")
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start.isoformat(), end.isoformat()
+
+
+def _connect_ro(db):
+    conn = sqlite3.connect(f"file:{db}?mode=ro", uri=True, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.execute("PRAGMA query_only = ON;")
+    conn.execute("PRAGMA cache_size = -64000;")
+    conn.execute("PRAGMA mmap_size = 268435456;")
+    return conn
+
+
+def _signed(ttype, amount):
+    return -amount if ttype == "withdraw" else amount
+
+
+def _write_statement(f, account, start, end, lines):
+    account_no, name, balance = account
+    after = sum(_signed(t[1], t[2]) for t in lines if t[3] >= end)
+    month = [t for t in lines if t[3] < end]
+    closing = Money(balance - after)
+    running = Money(closing - sum(_signed(t[1], t[2]) for t in month))
+    last_day = datetime.date.fromisoformat(end) - datetime.timedelta(days=1)
+    f.write(f"==== Statement {account_no}  {start} to {last_day} ====\n")
+    f.write(f"Name: {name}\n")
+    f.write(f"Opening balance: {running}\n")
+    for tx_id, ttype, amount, ts, note in month:
+        running += _signed(ttype, amount)
+        f.write(f"  {ts[:19]}  #{tx_id:<10} {ttype:<9}{str(_signed(ttype, amount)):>14}{str(running):>16}  {note or ''}\n")
+    f.write(f"Closing balance: {closing}\n\n")
+
+
+# Worker: build one shard. Returns (shard, accounts, transactions, seconds).
+def build_shard(db, out_dir, month, shard, lo, hi, first_id):
+    t0 = time.perf_counter()
+    start, end = month_bounds(month)
+    final = os.path.join(out_dir, f"shard-{shard:04d}.txt")
+    part = final + ".part"
+    conn = _connect_ro(db)
+    cur = conn.cursor()
+    cur.execute("BEGIN;")  # one snapshot for the whole shard
+    cur.execute("""SELECT a.account_no, a.name, a.balance, t.id, t.type, t.amount, t.timestamp, t.note
+                   FROM accounts a
+                   LEFT JOIN transactions t ON t.account_no = a.account_no AND t.id >= ?
+                   WHERE a.id >= ? AND a.id < ?
+                   ORDER BY a.account_no, t.id;""", (first_id, lo, hi))
+    accounts = transactions = 0
+    with open(part, "w", encoding="utf-8") as f:
+        current, lines = None, []
+        for account_no, name, balance, tx_id, ttype, amount, ts, note in cur:
+            if current is None or current[0] != account_no:
+                if current is not None:
+                    _write_statement(f, current, start, end, lines)
+                    accounts += 1
+                current, lines = (account_no, name, balance), []
+            if tx_id is not None and ts >= start:
+                lines.append((tx_id, ttype, amount, ts, note))
+                transactions += ts < end
+        if current is not None:
+            _write_statement(f, current, start, end, lines)
+            accounts += 1
+        f.flush()
+        os.fsync(f.fileno())
+    conn.close()
+    os.replace(part, final)
+    return shard, accounts, transactions, time.perf_counter() - t0
+
+
+# Shard boundaries are fixed the first time a month is run, so a resumed run
+# builds exactly the same files. -> manifest dict
+def _load_manifest(db, out_dir, month, shards):
+    path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest["month"] == month:
+            return manifest
+    conn = _connect_ro(db)
+    cur = conn.cursor()
+    cur.execute("SELECT (SELECT MIN(id) FROM accounts), (SELECT MAX(id) FROM accounts);")  # two seeks, not a scan
+    lo, hi = cur.fetchone()
+    lo, hi = (lo or 1), (hi or 0) + 1
+    start, _ = month_bounds(month)
+    since = (datetime.datetime.fromisoformat(start) - ID_SEARCH_SLACK).isoformat()
+    first_id = backend.first_id_at(cur, "transactions", since)
+    conn.close()
+    step = max(1, -(-(hi - lo) // shards))
+    ranges = [(a, min(a + step, hi)) for a in range(lo, hi, step)]
+    manifest = {"month": month, "db": os.path.abspath(db), "first_id": first_id, "shards": ranges,
+                "created": datetime.datetime.utcnow().isoformat()}
+    tmp = path + ".part"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+    return manifest
+
+
+# Build all statements for month ("YYYY-MM") into out_dir/<month>/.
+# progress(done_shards, total_shards, accounts_so_far) is called after each
+# shard. Returns a summary dict.
+def generate_statements(month, db=None, out_dir="statements", shards=None, workers=None, progress=None):
+    db = db or backend.SQLITE_DB
+    out_dir = os.path.join(out_dir, month)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(db, out_dir, month, shards or STATEMENT_SHARDS)
+    todo = [(i, lo, hi) for i, (lo, hi) in enumerate(manifest["shards"])
+            if not os.path.exists(os.path.join(out_dir, f"shard-{i:04d}.txt"))]
+    total = len(manifest["shards"])
+    done = total - len(todo)
+    summary = {"month": month, "shards": total, "skipped": done, "accounts": 0, "transactions": 0,
+               "errors": [], "seconds": 0.0}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or STATEMENT_WORKERS) as pool:
+        futures = {pool.submit(build_shard, db, out_dir, month, i, lo, hi, manifest["first_id"]): i
+                   for i, lo, hi in todo}
+        for fut in as_completed(futures):
+            try:
+                _, accounts, transactions, _ = fut.result()
+                summary["accounts"] += accounts
+                summary["transactions"] += transactions
+            except Exception as e:
+                print("statement shard error:", futures[fut], e)
+                summary["errors"].append(futures[fut])
+            done += 1
+            if progress:
+                progress(done, total, summary["accounts"])
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+def _print_progress(done, total, accounts):
+    print(f"\r{done}/{total} shards, {accounts:,} accounts", end="", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Month-end statement batch")
+    parser.add_argument("month", help="YYYY-MM")
+    parser.add_argument("--db", help="SQLite database (default: bank.db)")
+    parser.add_argument("--out", default="statements", help="output directory")
+    parser.add_argument("--shards", type=int, default=STATEMENT_SHARDS)
+    parser.add_argument("--workers", type=int, default=STATEMENT_WORKERS)
+    args = parser.parse_args()
+    summary = generate_statements(args.month, args.db, args.out, args.shards, args.workers, _print_progress)
+    print()
+    print(f"{summary['month']}: {summary['accounts']:,} statements, {summary['transactions']:,} transactions "
+          f"in {summary['seconds']:.1f}s ({summary['skipped']} shards already done)")
+    if summary["errors"]:
+        print("failed shards (run again to retry):", summary["errors"])
+        sys.exit(1)
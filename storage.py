@@ -0,0 +1,669 @@
+# Ledger stores for tests, simulations and benchmarks (bench.py engines).
+#
+#   SQLiteEngine  - adapter over the backend.py functions
+#   MySQLEngine   - its own core tables on MySQL through mysql-connector
+#   MemoryEngine  - pure Python, no I/O; for simulations and what-if load runs
+#
+# This is not a pluggable storage layer for the app: frontend.py and
+# service.py call backend directly, and nothing selects an engine for them.
+# The interface covers the core ledger only (admins, accounts, transactions,
+# loans and audit). MySQLEngine and MemoryEngine implement just that, without
+# MIGRATIONS, rollups, change_log, account search or velocity limits.
+#
+# Every engine returns the same shapes as backend.py: rows are tuples in the
+# backend's column order, money is backend.Money, writes return True/False or
+# (ok, msg) with the same messages. tests/test_storage_conformance.py runs
+# the same checks against each engine.
+import array
+import datetime
+import threading
+from abc import ABC, abstractmethod
+
+import backend
+from backend import Money, to_money, hash_password
+
+
+class StorageEngine(ABC):
+    name = "base"
+
+    @abstractmethod
+    def authenticate_admin(self, username, password):
+        ...
+
+    @abstractmethod
+    def create_admin(self, username, password, fullname=""):
+        ...
+
+    @abstractmethod
+    def create_account(self, account_no, name, email="", phone="", initial_balance=0):
+        ...
+
+    # -> [(id, account_no, name, email, phone, balance, created_at)]
+    @abstractmethod
+    def get_accounts(self):
+        ...
+
+    @abstractmethod
+    def update_account(self, acc_id, name=None, email=None, phone=None):
+        ...
+
+    @abstractmethod
+    def delete_account(self, acc_id):
+        ...
+
+    # -> (ok, msg)
+    @abstractmethod
+    def add_transaction(self, account_no, ttype, amount, note=""):
+        ...
+
+    # -> (ok, msg)
+    @abstractmethod
+    def transfer(self, from_no, to_no, amount, note=""):
+        ...
+
+    # -> [(id, account_no, type, amount, timestamp, note)], newest first
+    @abstractmethod
+    def get_transactions(self, limit=100, account_no=None):
+        ...
+
+    @abstractmethod
+    def create_loan(self, account_no, amount):
+        ...
+
+    @abstractmethod
+    def update_loan_status(self, loan_id, status):
+        ...
+
+    # -> [(id, account_no, amount, status, created_at, updated_at)], newest first
+    @abstractmethod
+    def get_loans(self, status=None):
+        ...
+
+    @abstractmethod
+    def log_action(self, admin, action):
+        ...
+
+    # -> [(id, admin, action, timestamp)], newest first
+    @abstractmethod
+    def get_audit_logs(self, limit=100):
+        ...
+
+    @abstractmethod
+    def total_deposits(self):
+        ...
+
+    @abstractmethod
+    def total_withdraws(self):
+        ...
+
+    def close(self):
+        pass
+
+
+# === SQLite ===
+# Thin wrapper over backend.py, so results can be compared with the app's
+# own code path. backend keeps its connection pool in module globals, so only one SQLite
+# database can be active per process.
+class SQLiteEngine(StorageEngine):
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        if path is not None and path != backend.SQLITE_DB:
+            backend.close_pool()
+            backend.SQLITE_DB = path
+        backend.USE_MYSQL = False
+        backend.init_db()
+
+    def authenticate_admin(self, username, password):
+        return backend.authenticate_admin(username, password)
+
+    def create_admin(self, username, password, fullname=""):
+        return backend.create_admin(username, password, fullname)
+
+    def create_account(self, account_no, name, email="", phone="", initial_balance=0):
+        return backend.create_account(account_no, name, email, phone, initial_balance)
+
+    def get_accounts(self):
+        return backend.get_accounts()
+
+    def update_account(self, acc_id, name=None, email=None, phone=None):
+        return backend.update_account(acc_id, name, email, phone)
+
+    def delete_account(self, acc_id):
+        return backend.delete_account(acc_id)
+
+    def add_transaction(self, account_no, ttype, amount, note=""):
+        return backend.add_transaction(account_no, ttype, amount, note)
+
+    def transfer(self, from_no, to_no, amount, note=""):
+        return backend.transfer(from_no, to_no, amount, note)
+
+    def get_transactions(self, limit=100, account_no=None):
+        return backend.get_transactions(limit, account_no)
+
+    def create_loan(self, account_no, amount):
+        return backend.create_loan(account_no, amount)
+
+    def update_loan_status(self, loan_id, status):
+        return backend.update_loan_status(loan_id, status)
+
+    def get_loans(self, status=None):
+        return backend.get_loans(status)
+
+    def log_action(self, admin, action):
+        backend.log_action(admin, action)
+
+    def get_audit_logs(self, limit=100):
+        backend.flush_audit()
+        return backend.get_audit_logs(limit)
+
+    def total_deposits(self):
+        return backend.total_deposits()
+
+    def total_withdraws(self):
+        return backend.total_withdraws()
+
+    def close(self):
+        backend.flush_audit()
+        backend.close_pool()
+
+
+# === MySQL ===
+# Its own copy of the core tables (not backend's schema or migrations), with
+# money as BIGINT minor units. Uses prepared cursors, which take the same "?"
+# placeholders as sqlite3.
+MYSQL_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS admins (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(64) UNIQUE,
+        password_hash CHAR(64),
+        fullname VARCHAR(255)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS accounts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        account_no VARCHAR(32) UNIQUE,
+        name VARCHAR(255),
+        email VARCHAR(255),
+        phone VARCHAR(64),
+        balance BIGINT NOT NULL DEFAULT 0,
+        created_at VARCHAR(32)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        account_no VARCHAR(32),
+        type VARCHAR(16),
+        amount BIGINT NOT NULL,
+        timestamp VARCHAR(32),
+        note VARCHAR(255),
+        INDEX idx_transactions_account (account_no, id),
+        INDEX idx_transactions_type (type, amount)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS loans (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        account_no VARCHAR(32),
+        amount BIGINT NOT NULL,
+        status VARCHAR(16),
+        created_at VARCHAR(32),
+        updated_at VARCHAR(32),
+        INDEX idx_loans_status (status, id)
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE IF NOT EXISTS audit_logs (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        admin VARCHAR(64),
+        action TEXT,
+        timestamp VARCHAR(32),
+        INDEX idx_audit_admin (admin, id)
+    ) ENGINE=InnoDB""",
+]
+
+# column positions holding money, per table, for converting fetched rows
+_MYSQL_MONEY_COLS = {"accounts": (5,), "transactions": (3,), "loans": (2,)}
+
+
+class MySQLEngine(StorageEngine):
+    name = "mysql"
+
+    def __init__(self, config=None, pool_size=None):
+        from mysql.connector import pooling
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name=f"engine{id(self)}",
+            pool_size=pool_size or backend.MYSQL_POOL_SIZE,
+            **(config or backend.MYSQL_CONFIG)
+        )
+        conn = self.pool.get_connection()
+        try:
+            cur = conn.cursor()
+            for sql in MYSQL_SCHEMA:
+                cur.execute(sql)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _query(self, sql, params=(), table=None):
+        conn = self.pool.get_connection()
+        try:
+            cur = conn.cursor(prepared=True)
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        finally:
+            conn.close()
+        cols = _MYSQL_MONEY_COLS.get(table)
+        if not cols:
+            return rows
+        return [tuple(Money(v) if i in cols else v for i, v in enumerate(r)) for r in rows]
+
+    # run fn(cur) in one transaction; fn returns (ok, result) and a False
+    # ok rolls the transaction back
+    def _write(self, fn, fail=False):
+        conn = self.pool.get_connection()
+        try:
+            conn.start_transaction()
+            cur = conn.cursor(prepared=True)
+            ok, result = fn(cur)
+            if ok:
+                conn.commit()
+            else:
+                conn.rollback()
+            return result
+        except Exception as e:
+            print("mysql engine error:", e)
+            conn.rollback()
+            return fail
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _audit(cur, admin, action):
+        cur.execute("INSERT INTO audit_logs (admin, action, timestamp) VALUES (?, ?, ?)",
+                    (admin, action, datetime.datetime.utcnow().isoformat()))
+
+    def authenticate_admin(self, username, password):
+        rows = self._query("SELECT password_hash FROM admins WHERE username = ?", (username,))
+        return bool(rows) and rows[0][0] == hash_password(password)
+
+    def create_admin(self, username, password, fullname=""):
+        def op(cur):
+            cur.execute("INSERT INTO admins (username, password_hash, fullname) VALUES (?, ?, ?)",
+                        (username, hash_password(password), fullname))
+            return True, True
+        return self._write(op)
+
+    def create_account(self, account_no, name, email="", phone="", initial_balance=0):
+        def op(cur):
+            cur.execute("""INSERT INTO accounts (account_no, name, email, phone, balance, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        (account_no, name, email, phone, int(to_money(initial_balance)),
+                         datetime.datetime.utcnow().isoformat()))
+            self._audit(cur, "system", f"Create account {account_no}")
+            return True, True
+        return self._write(op)
+
+    def get_accounts(self):
+        return self._query("SELECT id, account_no, name, email, phone, balance, created_at FROM accounts",
+                           table="accounts")
+
+    def update_account(self, acc_id, name=None, email=None, phone=None):
+        def op(cur):
+            cur.execute("SELECT account_no, name, email, phone FROM accounts WHERE id = ? FOR UPDATE", (acc_id,))
+            r = cur.fetchone()
+            if not r:
+                return False, False
+            cur.execute("UPDATE accounts SET name = ?, email = ?, phone = ? WHERE id = ?",
+                        (name if name is not None else r[1], email if email is not None else r[2],
+                         phone if phone is not None else r[3], acc_id))
+            self._audit(cur, "system", f"Update account {r[0]}")
+            return True, True
+        return self._write(op)
+
+    def delete_account(self, acc_id):
+        def op(cur):
+            cur.execute("SELECT account_no FROM accounts WHERE id = ? FOR UPDATE", (acc_id,))
+            r = cur.fetchone()
+            if not r:
+                return False, False
+            cur.execute("DELETE FROM accounts WHERE id = ?", (acc_id,))
+            self._audit(cur, "system", f"Delete account {r[0]}")
+            return True, True
+        return self._write(op)
+
+    @staticmethod
+    def _change_balance(cur, account_no, delta):
+        if delta < 0:
+            cur.execute("UPDATE accounts SET balance = balance + ? WHERE account_no = ? AND balance >= ?",
+                        (delta, account_no, -delta))
+        else:
+            cur.execute("UPDATE accounts SET balance = balance + ? WHERE account_no = ?", (delta, account_no))
+        if cur.rowcount == 1:
+            return None
+        cur.execute("SELECT 1 FROM accounts WHERE account_no = ?", (account_no,))
+        return "Insufficient funds" if cur.fetchall() else "Account not found"
+
+    def add_transaction(self, account_no, ttype, amount, note=""):
+        if ttype not in ("deposit", "withdraw"):
+            return False, "Invalid type"
+        amount = backend._positive_money(amount)
+        if amount is None:
+            return False, "Invalid amount"
+
+        def op(cur):
+            failure = self._change_balance(cur, account_no, amount if ttype == "deposit" else -amount)
+            if failure:
+                return False, (False, failure)
+            cur.execute("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)",
+                        (account_no, ttype, int(amount), datetime.datetime.utcnow().isoformat(), note))
+            self._audit(cur, "system", f"{ttype} {amount} on {account_no}")
+            return True, (True, "OK")
+        return self._write(op, fail=(False, "Database error"))
+
+    def transfer(self, from_no, to_no, amount, note=""):
+        if from_no == to_no:
+            return False, "Cannot transfer to the same account"
+        amount = backend._positive_money(amount)
+        if amount is None:
+            return False, "Invalid amount"
+
+        def op(cur):
+            # lock rows in account_no order so opposite transfers can't deadlock
+            for account_no in sorted((from_no, to_no)):
+                failure = self._change_balance(cur, account_no, -amount if account_no == from_no else amount)
+                if failure:
+                    return False, (False, failure)
+            now = datetime.datetime.utcnow().isoformat()
+            for account_no, delta in ((from_no, -amount), (to_no, amount)):
+                cur.execute("INSERT INTO transactions (account_no, type, amount, timestamp, note) VALUES (?, ?, ?, ?, ?)",
+                            (account_no, "transfer", int(delta), now, note))
+            self._audit(cur, "system", f"transfer {amount} from {from_no} to {to_no}")
+            return True, (True, "OK")
+        return self._write(op, fail=(False, "Database error"))
+
+    def get_transactions(self, limit=100, account_no=None):
+        if account_no is not None:
+            return self._query("SELECT id, account_no, type, amount, timestamp, note FROM transactions "
+                               "WHERE account_no = ? ORDER BY id DESC LIMIT ?", (account_no, limit), "transactions")
+        return self._query("SELECT id, account_no, type, amount, timestamp, note FROM transactions "
+                           "ORDER BY id DESC LIMIT ?", (limit,), "transactions")
+
+    def create_loan(self, account_no, amount):
+        amount = to_money(amount)
+
+        def op(cur):
+            now = datetime.datetime.utcnow().isoformat()
+            cur.execute("INSERT INTO loans (account_no, amount, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        (account_no, int(amount), "pending", now, now))
+            self._audit(cur, "system", f"Loan request {amount} for {account_no}")
+            return True, True
+        return self._write(op)
+
+    def update_loan_status(self, loan_id, status):
+        if status not in backend.LOAN_STATUSES:
+            raise ValueError("Invalid loan status")
+
+        def op(cur):
+            cur.execute("UPDATE loans SET status = ?, updated_at = ? WHERE id = ?",
+                        (status, datetime.datetime.utcnow().isoformat(), loan_id))
+            cur.execute("SELECT 1 FROM loans WHERE id = ?", (loan_id,))
+            if not cur.fetchall():
+                return False, False
+            self._audit(cur, "system", f"Loan {loan_id} status -> {status}")
+            return True, True
+        return self._write(op)
+
+    def get_loans(self, status=None):
+        if status is not None:
+            return self._query("SELECT id, account_no, amount, status, created_at, updated_at FROM loans "
+                               "WHERE status = ? ORDER BY id DESC", (status,), "loans")
+        return self._query("SELECT id, account_no, amount, status, created_at, updated_at FROM loans "
+                           "ORDER BY id DESC", (), "loans")
+
+    def log_action(self, admin, action):
+        def op(cur):
+            self._audit(cur, admin, action)
+            return True, None
+        self._write(op)
+
+    def get_audit_logs(self, limit=100):
+        return self._query("SELECT id, admin, action, timestamp FROM audit_logs ORDER BY id DESC LIMIT ?", (limit,))
+
+    def _total(self, ttype):
+        rows = self._query("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = ?", (ttype,))
+        return Money(int(rows[0][0]))
+
+    def total_deposits(self):
+        return self._total("deposit")
+
+    def total_withdraws(self):
+        return self._total("withdraw")
+
+
+# === In-memory ===
+# Accounts and loans are __slots__ records indexed by dicts; transactions and
+# audit rows are stored column-wise (one array/list per field, row id =
+# position + 1), so millions of rows stay compact and appends are O(1). A single lock makes
+# each call atomic, which gives the same guarantees as BEGIN IMMEDIATE.
+class _Account:
+    __slots__ = ("id", "account_no", "name", "email", "phone", "balance", "created_at")
+
+    def row(self):
+        return (self.id, self.account_no, self.name, self.email, self.phone, Money(self.balance), self.created_at)
+
+
+class _Loan:
+    __slots__ = ("id", "account_no", "amount", "status", "created_at", "updated_at")
+
+    def row(self):
+        return (self.id, self.account_no, Money(self.amount), self.status, self.created_at, self.updated_at)
+
+
+_TX_TYPES = ("deposit", "withdraw", "transfer")
+_TX_CODES = {t: i for i, t in enumerate(_TX_TYPES)}
+
+
+class MemoryEngine(StorageEngine):
+    name = "memory"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.admins = {}            # username -> (password_hash, fullname)
+        self.accounts = {}          # id -> _Account
+        self.by_no = {}             # account_no -> _Account
+        self.next_account_id = 1
+        self.loans = {}             # id -> _Loan
+        self.next_loan_id = 1
+        # transactions, one array per column
+        self.tx_account = []        # account_no strings (shared with the _Account)
+        self.tx_type = array.array("b")
+        self.tx_amount = array.array("q")
+        self.tx_ts = []             # ISO strings; formatting on read costs more than storing
+        self.tx_note = []
+        self.tx_by_account = {}     # account_no -> array of row positions
+        self.totals = [0] * len(_TX_TYPES)
+        # audit log, one list per column
+        self.audit_admin = []
+        self.audit_action = []
+        self.audit_ts = []
+        self.create_admin("Admin", "Admin123", "Administrator")
+
+    def _audit(self, admin, action):
+        self.audit_admin.append(admin)
+        self.audit_action.append(action)
+        self.audit_ts.append(datetime.datetime.utcnow().isoformat())
+
+    def authenticate_admin(self, username, password):
+        admin = self.admins.get(username)
+        return admin is not None and admin[0] == hash_password(password)
+
+    def create_admin(self, username, password, fullname=""):
+        with self.lock:
+            if username in self.admins:
+                return False
+            self.admins[username] = (hash_password(password), fullname)
+            return True
+
+    def create_account(self, account_no, name, email="", phone="", initial_balance=0):
+        try:
+            balance = to_money(initial_balance)
+        except ValueError:
+            return False
+        with self.lock:
+            if account_no in self.by_no:
+                return False
+            acc = _Account()
+            acc.id = self.next_account_id
+            self.next_account_id += 1
+            acc.account_no = account_no
+            acc.name = name
+            acc.email = email
+            acc.phone = phone
+            acc.balance = int(balance)
+            acc.created_at = datetime.datetime.utcnow().isoformat()
+            self.accounts[acc.id] = acc
+            self.by_no[account_no] = acc
+            self._audit("system", f"Create account {account_no}")
+            return True
+
+    def get_accounts(self):
+        with self.lock:
+            return [acc.row() for acc in self.accounts.values()]
+
+    def update_account(self, acc_id, name=None, email=None, phone=None):
+        with self.lock:
+            acc = self.accounts.get(acc_id)
+            if acc is None:
+                return False
+            if name is not None:
+                acc.name = name
+            if email is not None:
+                acc.email = email
+            if phone is not None:
+                acc.phone = phone
+            self._audit("system", f"Update account {acc.account_no}")
+            return True
+
+    def delete_account(self, acc_id):
+        with self.lock:
+            acc = self.accounts.pop(acc_id, None)
+            if acc is None:
+                return False
+            del self.by_no[acc.account_no]
+            self._audit("system", f"Delete account {acc.account_no}")
+            return True
+
+    def _append_tx(self, account_no, ttype, amount, ts, note):
+        pos = len(self.tx_type)
+        self.tx_account.append(account_no)
+        self.tx_type.append(_TX_CODES[ttype])
+        self.tx_amount.append(amount)
+        self.tx_ts.append(ts)
+        self.tx_note.append(note)
+        idx = self.tx_by_account.get(account_no)
+        if idx is None:
+            idx = self.tx_by_account[account_no] = array.array("q")
+        idx.append(pos)
+        self.totals[_TX_CODES[ttype]] += amount
+
+    def add_transaction(self, account_no, ttype, amount, note=""):
+        if ttype not in ("deposit", "withdraw"):
+            return False, "Invalid type"
+        amount = backend._positive_money(amount)
+        if amount is None:
+            return False, "Invalid amount"
+        amount = int(amount)
+        with self.lock:
+            acc = self.by_no.get(account_no)
+            if acc is None:
+                return False, "Account not found"
+            if ttype == "withdraw":
+                if acc.balance < amount:
+                    return False, "Insufficient funds"
+                acc.balance -= amount
+            else:
+                acc.balance += amount
+            self._append_tx(account_no, ttype, amount, datetime.datetime.utcnow().isoformat(), note)
+            self._audit("system", f"{ttype} {Money(amount)} on {account_no}")
+            return True, "OK"
+
+    def transfer(self, from_no, to_no, amount, note=""):
+        if from_no == to_no:
+            return False, "Cannot transfer to the same account"
+        amount = backend._positive_money(amount)
+        if amount is None:
+            return False, "Invalid amount"
+        amount = int(amount)
+        with self.lock:
+            src = self.by_no.get(from_no)
+            dst = self.by_no.get(to_no)
+            # report failures in account_no order, like the SQL engines
+            for account_no in sorted((from_no, to_no)):
+                if account_no == from_no and src is not None and src.balance >= amount:
+                    continue
+                if account_no == to_no and dst is not None:
+                    continue
+                acc = src if account_no == from_no else dst
+                return False, "Account not found" if acc is None else "Insufficient funds"
+            src.balance -= amount
+            dst.balance += amount
+            now = datetime.datetime.utcnow().isoformat()
+            self._append_tx(from_no, "transfer", -amount, now, note)
+            self._append_tx(to_no, "transfer", amount, now, note)
+            self._audit("system", f"transfer {Money(amount)} from {from_no} to {to_no}")
+            return True, "OK"
+
+    def _tx_row(self, pos):
+        return (pos + 1, self.tx_account[pos], _TX_TYPES[self.tx_type[pos]], Money(self.tx_amount[pos]),
+                self.tx_ts[pos], self.tx_note[pos])
+
+    def get_transactions(self, limit=100, account_no=None):
+        with self.lock:
+            if account_no is not None:
+                positions = self.tx_by_account.get(account_no, ())
+                return [self._tx_row(p) for p in reversed(positions[-limit:] if limit else positions[:0])]
+            n = len(self.tx_type)
+            return [self._tx_row(p) for p in range(n - 1, max(-1, n - 1 - limit), -1)]
+
+    def create_loan(self, account_no, amount):
+        amount = to_money(amount)
+        with self.lock:
+            loan = _Loan()
+            loan.id = self.next_loan_id
+            self.next_loan_id += 1
+            loan.account_no = account_no
+            loan.amount = int(amount)
+            loan.status = "pending"
+            loan.created_at = loan.updated_at = datetime.datetime.utcnow().isoformat()
+            self.loans[loan.id] = loan
+            self._audit("system", f"Loan request {amount} for {account_no}")
+            return True
+
+    def update_loan_status(self, loan_id, status):
+        if status not in backend.LOAN_STATUSES:
+            raise ValueError("Invalid loan status")
+        with self.lock:
+            loan = self.loans.get(loan_id)
+            if loan is None:
+                return False
+            loan.status = status
+            loan.updated_at = datetime.datetime.utcnow().isoformat()
+            self._audit("system", f"Loan {loan_id} status -> {status}")
+            return True
+
+    def get_loans(self, status=None):
+        with self.lock:
+            return [loan.row() for loan in reversed(self.loans.values())
+                    if status is None or loan.status == status]
+
+    def log_action(self, admin, action):
+        with self.lock:
+            self._audit(admin, action)
+
+    def get_audit_logs(self, limit=100):
+        with self.lock:
+            n = len(self.audit_ts)
+            return [(p + 1, self.audit_admin[p], self.audit_action[p], self.audit_ts[p])
+                    for p in range(n - 1, max(-1, n - 1 - limit), -1)]
+
+    def total_deposits(self):
+        return Money(self.totals[_TX_CODES["deposit"]])
+
+    def total_withdraws(self):
+        return Money(self.totals[_TX_CODES["withdraw"]])
+
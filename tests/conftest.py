@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend
+
+
+# A fresh, migrated database in a temp directory; bank.db is never touched.
+@pytest.fixture
+def db(tmp_path):
+    saved = backend.SQLITE_DB
+    backend.close_pool()
+    backend.SQLITE_DB = str(tmp_path / "bank.db")
+    backend.clear_account_cache()
+    backend.set_velocity_rules([])
+    backend.init_db()
+    yield backend.SQLITE_DB
+    backend.shutdown_audit()
+    backend.set_velocity_rules([])
+    backend.close_pool()
+    backend.SQLITE_DB = saved
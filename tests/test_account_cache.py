@@ -0,0 +1,45 @@
+import sqlite3
+import threading
+
+import backend
+
+
+def _accounts(n=2):
+    nos = backend.allocate_account_nos(n)
+    for no in nos:
+        backend.create_account(no, "Juan Cruz", "", "", 100)
+    return nos
+
+
+def _in_thread(fn, *args):
+    t = threading.Thread(target=fn, args=args)
+    t.start()
+    t.join()
+
+
+def test_hit_survives_an_unrelated_commit_from_another_thread(db):
+    a, b = _accounts()
+    backend.get_account(a)
+    hits = backend.account_cache_stats()["hits"]
+    _in_thread(backend.add_transaction, b, "deposit", 5)
+    _in_thread(backend.get_account, a)  # a thread new to the cache
+    assert backend.get_account(a)[5] == backend.to_money(100)
+    assert backend.account_cache_stats()["hits"] == hits + 2
+
+
+def test_commit_from_another_process_drops_only_that_row(db):
+    a, b = _accounts()
+    backend.get_account(a)
+    backend.get_account(b)
+    other = sqlite3.connect(db)  # stands in for another app instance
+    with other:
+        other.execute("UPDATE accounts SET balance = balance + 500 WHERE account_no = ?;", (b,))
+        other.execute("INSERT INTO transactions (account_no, type, amount, timestamp, note) "
+                      "VALUES (?, 'deposit', 500, '2026-01-01T00:00:00', '');", (b,))
+        other.execute("UPDATE accounts SET name = 'Maria' WHERE account_no = ?;", (a,))
+    other.close()
+    assert backend.get_account(b)[5] == backend.to_money(105)
+    assert backend.get_account(a)[2] == "Maria"
+    hits = backend.account_cache_stats()["hits"]
+    backend.get_account(a)
+    assert backend.account_cache_stats()["hits"] == hits + 1
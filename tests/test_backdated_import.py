@@ -0,0 +1,58 @@
+import backend
+import statements
+
+
+# History rows from 2020, imported after today's transactions: they get the
+# highest ids, so timestamps no longer rise with id.
+def _import_history(tmp_path, account_no, n=20):
+    path = tmp_path / "history.csv"
+    lines = ["account_no,type,amount,timestamp,note"]
+    lines += [f"{account_no},deposit,1,2020-01-{d % 28 + 1:02d}T10:00:00,old" for d in range(n)]
+    path.write_text("\n".join(lines) + "\n")
+    summary = backend.import_transactions(str(path), apply=False)
+    assert summary["imported"] == n
+
+
+def test_first_id_at_ignores_back_dated_ids(db, tmp_path):
+    no = backend.generate_account_no()
+    backend.create_account(no, "Juan Cruz", "", "", 1000)
+    backend.add_transaction(no, "withdraw", 1)
+    _import_history(tmp_path, no)
+    conn = backend.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT MIN(id) FROM transactions WHERE timestamp >= '2026';")
+        expected = cur.fetchone()[0]
+        assert backend.first_id_at(cur, "transactions", "2021-01-01") == expected
+        assert backend.first_id_at(cur, "transactions", "2019-01-01") == 1
+    finally:
+        conn.close()
+
+
+def test_velocity_warm_up_sees_rows_before_an_import(db, tmp_path):
+    backend.set_velocity_rules([("withdraw", 3600, 2, None)])
+    no = backend.generate_account_no()
+    backend.create_account(no, "Juan Cruz", "", "", 1000)
+    assert backend.add_transaction(no, "withdraw", 1)[0]
+    assert backend.add_transaction(no, "withdraw", 1)[0]
+    _import_history(tmp_path, no)
+    backend._velocity.reset()  # a fresh process warms up from the database
+    ok, msg = backend.add_transaction(no, "withdraw", 1)
+    assert not ok and msg.startswith("Velocity limit")
+
+
+def test_statement_month_uses_rows_before_an_import(db, tmp_path):
+    no = backend.generate_account_no()
+    backend.create_account(no, "Juan Cruz", "", "", 1000)
+    backend.add_transaction(no, "deposit", 5)
+    _import_history(tmp_path, no)
+    month = backend.datetime.datetime.utcnow().strftime("%Y-%m")
+    manifest = statements._load_manifest(db, str(tmp_path), month, 1)
+    conn = backend.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM transactions WHERE note = '' AND type = 'deposit';")
+        deposit_id = cur.fetchone()[0]
+    finally:
+        conn.close()
+    assert manifest["first_id"] <= deposit_id
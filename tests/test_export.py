@@ -0,0 +1,19 @@
+import pytest
+
+import backend
+
+
+@pytest.mark.parametrize("name", ["accounts.csv", "accounts.jsonl.gz"])
+def test_failed_export_leaves_no_part_file(db, tmp_path, monkeypatch, name):
+    real = backend.iter_table
+
+    def broken(table, chunk=None):
+        yield from real(table, chunk)
+        raise OSError("disk full")
+    backend.create_account(backend.generate_account_no(), "Juan Cruz", "", "", 100)
+    monkeypatch.setattr(backend, "iter_table", broken)
+    out = tmp_path / "out"
+    out.mkdir()
+    with pytest.raises(OSError):
+        backend.export_table("accounts", str(out / name))
+    assert list(out.iterdir()) == []
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+import backend
+
+
+def _loan():
+    no = backend.generate_account_no()
+    backend.create_account(no, "Juan Cruz", "", "", 1000)
+    backend.create_loan(no, 5000, 500, 12)
+    return backend.get_loans()[0][0]
+
+
+def test_status_change_moves_rollup(db):
+    loan_id = _loan()
+    assert backend.update_loan_status(loan_id, "approved")
+    assert backend.get_report_summary()["loans"] == {"approved": 1}
+
+
+def test_unchanged_status_leaves_rollups(db):
+    loan_id = _loan()
+    assert backend.update_loan_status(loan_id, "pending")
+    assert backend.get_report_summary()["loans"] == {"pending": 1}
+
+
+def test_unknown_status_is_rejected(db):
+    loan_id = _loan()
+    with pytest.raises(ValueError):
+        backend.update_loan_status(loan_id, "forgiven")
+    assert backend.get_loans()[0][3] == "pending"
+
+
+def test_concurrent_changes_move_the_rollup_once(db):
+    loan_id = _loan()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def approve():
+        barrier.wait()
+        try:
+            results.append(backend.update_loan_status(loan_id, "approved"))
+        except Exception as e:  # e.g. SQLITE_BUSY upgrading a read to a write
+            results.append(e)
+    threads = [threading.Thread(target=approve) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [True] * 8
+    assert backend.get_report_summary()["loans"] == {"approved": 1}
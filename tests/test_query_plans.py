@@ -0,0 +1,126 @@
+# Every statement the backend runs for a teller operation must be answered
+# from an index. The SQL is taken from the connections while the operation
+# runs, so the test follows the code, and each distinct statement goes
+# through EXPLAIN QUERY PLAN. A SCAN fails unless the statement has no WHERE
+# and stops at a LIMIT in index order (no temp b-tree sort), e.g. "newest
+# 100 rows"; with a filter the same plan can read the whole table.
+import re
+import sqlite3
+
+import pytest
+
+import backend
+
+# Statements that read a whole table by design: (operation, table, why)
+FULL_READS = {
+    ("get_loans()", "loans"): "returns every loan",
+    ("get_report_summary", "rollups"): "a few dozen counter rows",
+}
+
+
+def _seed():
+    nos = backend.allocate_account_nos(3)
+    for n, no in enumerate(nos):
+        backend.create_account(no, f"Juan Cruz {n}", f"juan{n}@example.com", "0917", 1000)
+    backend.add_transaction(nos[0], "deposit", 50)
+    backend.transfer(nos[0], nos[1], 25)
+    backend.create_loan(nos[0], 5000, 500, 12)
+    return nos
+
+
+OPERATIONS = {
+    "authenticate_admin": lambda nos: backend.authenticate_admin("Admin", "Admin123"),
+    "log_action": lambda nos: backend.log_action("Admin", "login"),
+    "get_account": lambda nos: (backend.clear_account_cache(), backend.get_account(nos[0])),
+    "get_account_by_id": lambda nos: (backend.clear_account_cache(), backend.get_account_by_id(2)),
+    "create_account": lambda nos: backend.create_account(backend.generate_account_no(), "Maria", "", "", 10),
+    "update_account": lambda nos: backend.update_account(2, name="Maria Santos", phone="0918"),
+    "delete_account": lambda nos: backend.delete_account(3),
+    "deposit": lambda nos: backend.add_transaction(nos[0], "deposit", 10),
+    "withdraw": lambda nos: backend.add_transaction(nos[0], "withdraw", 10),
+    "overdraft": lambda nos: backend.add_transaction(nos[2], "withdraw", 10**6),
+    "transfer": lambda nos: backend.transfer(nos[0], nos[1], 5),
+    "velocity": lambda nos: (backend.set_velocity_rules([("withdraw", 3600, 10, None)]),
+                             backend.add_transaction(nos[0], "withdraw", 1)),
+    "add_transactions_bulk": lambda nos: backend.add_transactions_bulk(
+        [(nos[0], "deposit", 5), (nos[1], "withdraw", 1)]),
+    "get_transactions()": lambda nos: backend.get_transactions(),
+    "get_transactions(account_no)": lambda nos: backend.get_transactions(account_no=nos[0]),
+    "create_loan": lambda nos: backend.create_loan(nos[1], 2000, 300, 6),
+    "update_loan_status": lambda nos: backend.update_loan_status(1, "approved"),
+    "get_loans()": lambda nos: backend.get_loans(),
+    "get_loans(status)": lambda nos: backend.get_loans("pending"),
+    "get_loan_schedule": lambda nos: backend.get_loan_schedule(1),
+    "get_audit_logs": lambda nos: backend.get_audit_logs(),
+    "get_accounts_page": lambda nos: (backend.get_accounts_page(), backend.get_accounts_page(1),
+                                      backend.get_accounts_page(3, backward=True),
+                                      backend.get_accounts_page(backward=True)),
+    "get_transactions_page": lambda nos: (backend.get_transactions_page(backward=True),
+                                          backend.get_transactions_page(2, backward=True),
+                                          backend.get_transactions_page(1, account_no=nos[0]),
+                                          backend.get_transactions_page(backward=True, account_no=nos[0])),
+    "get_loans_page": lambda nos: (backend.get_loans_page(), backend.get_loans_page(status="pending"),
+                                   backend.get_loans_page(5, backward=True, status="pending")),
+    "get_audit_logs_page": lambda nos: (backend.get_audit_logs_page(backward=True),
+                                        backend.get_audit_logs_page(backward=True, admin="system"),
+                                        backend.get_audit_logs_page(1, admin="system")),
+    "search_accounts": lambda nos: (backend.search_accounts("juan cr"), backend.search_accounts(nos[1])),
+    "get_report_summary": lambda nos: backend.get_report_summary(),
+    "total_deposits": lambda nos: (backend.total_deposits(), backend.total_withdraws()),
+    "change_feed": lambda nos: _poll_twice(nos),
+}
+
+
+def _poll_twice(nos):
+    feed = backend.ChangeFeed()
+    feed.poll()
+    backend.add_transaction(nos[0], "deposit", 1)
+    backend.update_account(1, email="new@example.com")
+    feed.poll()
+    feed.close()
+
+
+def _full_scans(conn, sql):
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    if (re.search(r"\bLIMIT\b", sql, re.I) and not re.search(r"\bWHERE\b", sql, re.I)
+            and not any("TEMP B-TREE" in step for step in plan)):
+        return []
+    # "SCAN (subquery-1)" walks a subquery's result, whose own plan is listed too
+    return [step for step in plan
+            if step.startswith("SCAN ") and not step.startswith("SCAN (")
+            and "VIRTUAL TABLE" not in step and "CONSTANT ROW" not in step]
+
+
+@pytest.mark.parametrize("name", sorted(OPERATIONS))
+def test_operation_uses_indexes(db, monkeypatch, name):
+    nos = _seed()
+    statements = set()
+    open_sqlite = backend._open_sqlite
+
+    def traced():
+        conn = open_sqlite()
+        conn.set_trace_callback(statements.add)
+        return conn
+
+    monkeypatch.setattr(backend, "_open_sqlite", traced)
+    backend.close_pool()
+    OPERATIONS[name](nos)
+    backend.close_pool()
+
+    # FTS5 reads its own shadow tables ('main'.'accounts_fts_...') and the
+    # trace shows those statements too; they aren't ours to index
+    queries = [sql for sql in statements
+               if re.match(r"\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE|WITH)\b", sql, re.I)
+               and "'main'." not in sql]
+    assert queries, f"{name} ran no SQL"
+    conn = sqlite3.connect(db)
+    try:
+        failures = []
+        for sql in sorted(queries):
+            for step in _full_scans(conn, sql):
+                table = step.split()[1]
+                if (name, table) not in FULL_READS:
+                    failures.append(f"{step}: {sql}")
+    finally:
+        conn.close()
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+import backend
+import service
+
+
+def test_close_answers_queued_writes(db):
+    no = backend.generate_account_no()
+    backend.create_account(no, "Juan Cruz", "", "", 0)
+
+    async def run():
+        svc = await service.BankService("127.0.0.1", 0, linger=0.01).start()
+        calls = [asyncio.create_task(svc.call("add_transaction", (no, "deposit", 1)))
+                 for _ in range(50)]
+        await asyncio.sleep(0)  # all 50 are queued, none has run yet
+        await svc.close()
+        with pytest.raises(service.ServiceError):
+            await svc.call("add_transaction", (no, "deposit", 1))
+        return await asyncio.wait_for(asyncio.gather(*calls), 5)
+
+    assert len(asyncio.run(run())) == 50
+    backend.clear_account_cache()
+    assert backend.get_account(no)[5] == backend.to_money(50)
+
+
+def test_reset_velocity_stats_goes_to_the_writer():
+    assert "reset_velocity_stats" in service.WRITE_OPS
+    assert "reset_velocity_stats" not in service.READ_OPS
@@ -0,0 +1,147 @@
+# Behaviour every storage engine must share. The checks only create uniquely
+# named rows and compare totals before/after, so they also work on a
+# non-empty store. MySQL runs only when BANK_TEST_MYSQL_DATABASE names a
+# scratch database on the MYSQL_CONFIG server.
+import itertools
+import os
+import threading
+import time
+
+import pytest
+
+import backend
+import storage
+from backend import Money
+
+_ids = itertools.count()
+
+
+@pytest.fixture(params=["sqlite", "memory", "mysql"])
+def engine(request):
+    if request.param == "sqlite":
+        engine = storage.SQLiteEngine(request.getfixturevalue("db"))
+    elif request.param == "memory":
+        engine = storage.MemoryEngine()
+    else:
+        database = os.environ.get("BANK_TEST_MYSQL_DATABASE")
+        if not database:
+            pytest.skip("BANK_TEST_MYSQL_DATABASE not set")
+        pytest.importorskip("mysql.connector")
+        engine = storage.MySQLEngine(dict(backend.MYSQL_CONFIG, database=database))
+    yield engine
+    engine.close()
+
+
+def _tag():
+    return f"{int(time.time() * 1000) % 10**9:09d}{next(_ids)}"
+
+
+# two accounts, a with 100.00 and b with 0
+def _accounts(engine):
+    tag = _tag()
+    a, b = f"CF{tag}A", f"CF{tag}B"
+    assert engine.create_account(a, "Alice", "a@x", "1", 100) is True
+    assert engine.create_account(b, "Bob") is True
+    return a, b
+
+
+def _row(engine, account_no):
+    return next(r for r in engine.get_accounts() if r[1] == account_no)
+
+
+def test_engines_implement_the_interface():
+    with pytest.raises(TypeError):
+        storage.StorageEngine()
+
+
+def test_admins(engine):
+    admin = f"cf{_tag()}"
+    assert engine.create_admin(admin, "pw", "Conformance") is True
+    assert engine.create_admin(admin, "pw") is False
+    assert engine.authenticate_admin(admin, "pw") is True
+    assert engine.authenticate_admin(admin, "nope") is False
+    assert engine.authenticate_admin(admin + "x", "pw") is False
+
+
+def test_accounts(engine):
+    a, _ = _accounts(engine)
+    assert engine.create_account(a, "Again") is False
+    row = _row(engine, a)
+    assert row[1:6] == (a, "Alice", "a@x", "1", Money(10000))
+    assert type(row[5]) is Money
+
+
+def test_ledger(engine):
+    dep0, wd0 = engine.total_deposits(), engine.total_withdraws()
+    a, b = _accounts(engine)
+    missing = a[:-1] + "X"
+    assert engine.add_transaction(a, "deposit", "50.25") == (True, "OK")
+    assert engine.add_transaction(a, "withdraw", 0.25) == (True, "OK")
+    assert engine.add_transaction(b, "withdraw", 1) == (False, "Insufficient funds")
+    assert engine.add_transaction(missing, "deposit", 1) == (False, "Account not found")
+    assert engine.add_transaction(a, "steal", 1) == (False, "Invalid type")
+    assert engine.add_transaction(a, "deposit", -5) == (False, "Invalid amount")
+    assert engine.transfer(a, b, 25) == (True, "OK")
+    assert engine.transfer(a, a, 1) == (False, "Cannot transfer to the same account")
+    assert engine.transfer(b, a, 1000) == (False, "Insufficient funds")
+    assert engine.transfer(a, missing, 1) == (False, "Account not found")
+    assert (_row(engine, a)[5], _row(engine, b)[5]) == (Money(12500), Money(2500))
+    assert engine.total_deposits() - dep0 == Money(5025)
+    assert engine.total_withdraws() - wd0 == Money(25)
+
+
+def test_transactions_newest_first(engine):
+    a, b = _accounts(engine)
+    engine.add_transaction(a, "deposit", "50.25")
+    engine.add_transaction(a, "withdraw", 0.25)
+    engine.transfer(a, b, 25)
+    rows = engine.get_transactions(10, account_no=a)
+    assert [(r[1], r[2], r[3]) for r in rows] == [
+        (a, "transfer", Money(-2500)), (a, "withdraw", Money(25)), (a, "deposit", Money(5025))]
+    assert len(engine.get_transactions(2, account_no=a)) == 2
+    rows = engine.get_transactions(1)
+    assert (rows[0][1], rows[0][3]) == (b, Money(2500))
+
+
+def test_update_and_delete_account(engine):
+    _, b = _accounts(engine)
+    acc_id = _row(engine, b)[0]
+    assert engine.update_account(acc_id, phone="999") is True
+    assert _row(engine, b)[4] == "999"
+    assert engine.update_account(-1, name="x") is False
+    assert engine.delete_account(acc_id) is True
+    assert b not in {r[1] for r in engine.get_accounts()}
+    assert engine.delete_account(acc_id) is False
+
+
+def test_loans(engine):
+    a, _ = _accounts(engine)
+    assert engine.create_loan(a, "1500.50") is True
+    loan = next(r for r in engine.get_loans("pending") if r[1] == a)
+    assert loan[1:4] == (a, Money(150050), "pending")
+    assert engine.update_loan_status(loan[0], "approved") is True
+    assert any(r[0] == loan[0] for r in engine.get_loans("approved"))
+    assert engine.update_loan_status(-1, "paid") is False
+    with pytest.raises(ValueError):
+        engine.update_loan_status(loan[0], "forgiven")
+
+
+def test_audit(engine):
+    admin = f"cf{_tag()}"
+    engine.log_action(admin, "conformance check")
+    row = engine.get_audit_logs(1)
+    assert row[0][1:3] == (admin, "conformance check")
+
+
+def test_concurrent_deposits(engine):
+    _, b = _accounts(engine)
+
+    def worker():
+        for _ in range(50):
+            engine.add_transaction(b, "deposit", "0.01")
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _row(engine, b)[5] == Money(200)
@@ -0,0 +1,57 @@
+import sqlite3
+
+import backend
+
+
+def _account(balance=1000):
+    no = backend.generate_account_no()
+    backend.create_account(no, "Juan Cruz", "", "", balance)
+    return no
+
+
+def test_bulk_rows_count_against_the_limit(db):
+    backend.set_velocity_rules([("withdraw", 3600, 3, None)])
+    no = _account()
+    assert backend.add_transaction(no, "withdraw", 1)[0]
+    results = backend.add_transactions_bulk([(no, "withdraw", 1)] * 4)
+    assert [ok for ok, _ in results] == [True, True, False, False]
+    assert results[2][1].startswith("Velocity limit")
+    backend.clear_account_cache()
+    assert backend.get_account(no)[5] == backend.to_money(997)
+
+
+def test_bulk_total_cap_sees_earlier_rows_in_the_chunk(db):
+    backend.set_velocity_rules([("deposit", 3600, None, 100)])
+    no = _account()
+    results = backend.add_transactions_bulk([(no, "deposit", 60), (no, "deposit", 60), (no, "deposit", 40)])
+    assert [ok for ok, _ in results] == [True, False, True]
+
+
+def test_history_rows_are_not_checked(db):
+    backend.set_velocity_rules([("withdraw", 3600, 1, None)])
+    no = _account()
+    conn = backend.get_conn()
+    try:
+        results = backend._post_bulk_chunk(conn, [(no, "withdraw", 1)] * 3, imported=True, apply=False)
+    finally:
+        conn.close()
+    assert all(ok for ok, _ in results)
+
+
+def test_retried_chunk_counts_rejections_once(db, monkeypatch):
+    backend.set_velocity_rules([("withdraw", 3600, 1, None)])
+    no = _account()
+    real = backend._log_many
+    calls = []
+
+    def busy_once(conn, rows):
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        real(conn, rows)
+    monkeypatch.setattr(backend, "_log_many", busy_once)
+    monkeypatch.setattr(backend.time, "sleep", lambda s: None)
+    results = backend.add_transactions_bulk([(no, "withdraw", 1)] * 3)
+    assert [ok for ok, _ in results] == [True, False, False]
+    stats = backend.velocity_stats()
+    assert (stats["checks"], stats["rejections"]) == (3, 2)